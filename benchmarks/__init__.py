@@ -0,0 +1,5 @@
+"""
+Benchmarks for scanning, sizing and deleting build artifacts.
+
+Run `python -m benchmarks --help` from the repository root.
+"""
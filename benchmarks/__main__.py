@@ -0,0 +1,206 @@
+"""
+Time the scan, size and delete phases on a synthetic monorepo.
+
+Results are written as JSON and can be compared against a stored baseline:
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, fields
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from remover import DirectRemover
+from scanner import Artifact, DotnetScanner, NodeScanner, stream_tree
+from scanner.sizing import size_artifacts
+
+from .fake_dotnet import write_fake_dotnet
+from .tree import TreeSpec, TreeStats, generate_tree
+
+RESULTS_VERSION = 1
+PHASES = ("scan", "size", "scan_and_size", "delete")
+
+T = TypeVar("T")
+
+
+def _parse_bool(value: str) -> bool:
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Not a boolean: {value}")
+
+
+def _timed(times: Dict[str, List[float]], phase: str, func: Callable[[], T]) -> T:
+    start = time.perf_counter()
+    result = func()
+    times[phase].append(time.perf_counter() - start)
+    return result
+
+
+@contextlib.contextmanager
+def _fake_dotnet_on_path(
+    bin_dir: Path, startup: float, per_project: float
+) -> Iterator[None]:
+    write_fake_dotnet(bin_dir, startup, per_project)
+    old_path = os.environ.get("PATH", "")
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{old_path}"
+    try:
+        yield
+    finally:
+        os.environ["PATH"] = old_path
+
+
+def _scan(root: Path, calculate_size: bool) -> List[Artifact]:
+    scanners = [NodeScanner(), DotnetScanner()]
+    return list(stream_tree(root, scanners, calculate_size=calculate_size))
+
+
+def _delete(artifacts: List[Artifact]) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = DirectRemover(confirm=False).remove([a.path for a in artifacts])
+    if not result.success:
+        raise RuntimeError(f"Could not delete {result.failed}")
+
+
+def run(
+    spec: TreeSpec, repeat: int, dotnet_startup: float, dotnet_per_project: float
+) -> Dict[str, Any]:
+    """Run every phase repeat times on fresh trees and return the results."""
+    times: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    stats = TreeStats()
+    found = 0
+    with tempfile.TemporaryDirectory(prefix="src-clean-bench-") as temp_dir:
+        with _fake_dotnet_on_path(
+            Path(temp_dir) / "bin", dotnet_startup, dotnet_per_project
+        ):
+            for run_index in range(repeat):
+                root = Path(temp_dir) / f"tree{run_index}"
+                stats = generate_tree(root, spec)
+                artifacts = _timed(times, "scan", partial(_scan, root, False))
+                _timed(times, "size", partial(size_artifacts, artifacts))
+                sized = _timed(times, "scan_and_size", partial(_scan, root, True))
+                _timed(times, "delete", partial(_delete, sized))
+                found = len(artifacts)
+                shutil.rmtree(root)
+
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "spec": asdict(spec),
+        "dotnet": {"startup": dotnet_startup, "per_project": dotnet_per_project},
+        "tree": asdict(stats),
+        "artifacts_found": found,
+        "phases": {
+            phase: {
+                "runs": runs,
+                "min": min(runs),
+                "median": statistics.median(runs),
+            }
+            for phase, runs in times.items()
+        },
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> bool:
+    """Print the median of each phase against the baseline.
+
+    Returns False if any phase is slower than the baseline by more than
+    tolerance (a fraction, e.g. 0.1 for 10%).
+    """
+    if baseline.get("spec") != results["spec"]:
+        print("Warning: the baseline was recorded with a different tree spec")
+    ok = True
+    print(f"{'phase':<15}{'baseline':>12}{'current':>12}{'change':>10}")
+    for phase in PHASES:
+        before = baseline.get("phases", {}).get(phase, {}).get("median")
+        after = results["phases"][phase]["median"]
+        if not before:
+            print(f"{phase:<15}{'-':>12}{after:>11.3f}s{'':>10}")
+            continue
+        change = after / before - 1
+        marker = ""
+        if change > tolerance:
+            marker = "  slower"
+            ok = False
+        print(f"{phase:<15}{before:>11.3f}s{after:>11.3f}s{change:>+9.1%}{marker}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of `python -m benchmarks`."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark src-clean on a reproducible synthetic monorepo.",
+    )
+    defaults = TreeSpec()
+    for spec_field in fields(TreeSpec):
+        default = getattr(defaults, spec_field.name)
+        parser.add_argument(
+            f"--{spec_field.name.replace('_', '-')}",
+            type=_parse_bool if isinstance(default, bool) else type(default),
+            default=default,
+            help=f"(default: {default})",
+        )
+    parser.add_argument(
+        "--dotnet-startup",
+        type=float,
+        default=0.2,
+        help="Seconds each fake dotnet msbuild call takes to start (default: 0.2)",
+    )
+    parser.add_argument(
+        "--dotnet-per-project",
+        type=float,
+        default=0.05,
+        help="Seconds the fake dotnet spends per project (default: 0.05)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per phase (default: 3)"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results in this file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown against the baseline (default: 0.1 = 10%%)",
+    )
+    args = parser.parse_args(argv)
+    spec = TreeSpec(**{f.name: getattr(args, f.name) for f in fields(TreeSpec)})
+
+    results = run(spec, args.repeat, args.dotnet_startup, args.dotnet_per_project)
+    print(
+        f"Tree: {results['tree']['files']} files, "
+        f"{results['artifacts_found']} artifacts"
+    )
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+    else:
+        for phase, result in results["phases"].items():
+            print(f"{phase:<15}{result['median']:>11.3f}s (min {result['min']:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
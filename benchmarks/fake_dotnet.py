@@ -0,0 +1,44 @@
+"""
+A stand-in for the dotnet CLI with configurable latency.
+"""
+
+import sys
+from pathlib import Path
+
+_SCRIPT = """#!{python}
+import json, sys, time
+import xml.etree.ElementTree as ET
+
+args = sys.argv[1:]
+if args == ["--version"]:
+    print("8.0.100")
+    sys.exit(0)
+
+time.sleep({startup!r})
+paths = {{"BaseOutputPath": "bin/", "BaseIntermediateOutputPath": "obj/"}}
+if any(a.startswith("-getItem:") for a in args):
+    projects = [i.get("Include") for i in ET.parse(args[1]).iter("_SrcCleanProject")]
+    time.sleep({per_project!r} * len(projects))
+    items = [dict(Identity=p, **paths) for p in projects]
+    print(json.dumps({{"Items": {{"SrcCleanResult": items}}}}))
+else:
+    time.sleep({per_project!r})
+    print(json.dumps({{"Properties": paths}}))
+"""
+
+
+def write_fake_dotnet(bin_dir: Path, startup: float, per_project: float) -> Path:
+    """Write a fake `dotnet` into bin_dir and return its path.
+
+    Every msbuild invocation sleeps for startup seconds plus per_project
+    seconds for each project it evaluates, mimicking SDK start-up and
+    evaluation cost. Put bin_dir first on PATH to use it.
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    dotnet = bin_dir / "dotnet"
+    dotnet.write_text(
+        _SCRIPT.format(python=sys.executable, startup=startup, per_project=per_project),
+        encoding="utf-8",
+    )
+    dotnet.chmod(0o755)
+    return dotnet
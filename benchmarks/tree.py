@@ -0,0 +1,132 @@
+"""
+Reproducible synthetic monorepos for benchmarks.
+"""
+
+import os
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+# Imported by project files that the static evaluator cannot resolve, so that
+# they are evaluated by (the fake) dotnet msbuild instead.
+_MSBUILD_ONLY = """  <Choose>
+    <When Condition="'$(Configuration)' == 'Debug'">
+      <PropertyGroup><Optimize>false</Optimize></PropertyGroup>
+    </When>
+  </Choose>
+"""
+
+
+@dataclass
+class TreeSpec:  # pylint: disable=too-many-instance-attributes
+    """Shape of a synthetic monorepo."""
+
+    seed: int = 0
+    node_projects: int = 20
+    node_depth: int = 3
+    node_fanout: int = 4
+    files_per_package: int = 5
+    max_file_size: int = 4096
+    hardlink_fraction: float = 0.2
+    """Fraction of node_modules files hard-linked to a shared store (pnpm)."""
+    symlinks: bool = True
+    """Add node_modules/.bin links and a symlinked workspace package."""
+    dotnet_projects: int = 10
+    msbuild_fraction: float = 0.5
+    """Fraction of .NET projects that only `dotnet msbuild` can evaluate."""
+    output_files: int = 20
+
+
+@dataclass
+class TreeStats:
+    """What a generated tree contains."""
+
+    artifacts: int = 0
+    files: int = 0
+    bytes: int = 0
+
+
+class _Generator:
+    """Writes one tree; all randomness comes from the spec's seed."""
+
+    def __init__(self, root: Path, spec: TreeSpec) -> None:
+        self.root = root
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.stats = TreeStats()
+        self.store: List[Path] = []
+
+    def write_file(self, path: Path) -> None:
+        """Write a random file, or hard-link one from the store."""
+        size = self.rng.randint(1, self.spec.max_file_size)
+        if self.store and self.rng.random() < self.spec.hardlink_fraction:
+            os.link(self.rng.choice(self.store), path)
+        else:
+            path.write_bytes(self.rng.randbytes(size))
+            self.stats.bytes += size
+        self.stats.files += 1
+
+    def package(self, directory: Path, depth: int) -> None:
+        """Write a package with its own nested node_modules."""
+        directory.mkdir(parents=True)
+        (directory / "package.json").write_text("{}", encoding="utf-8")
+        for i in range(self.spec.files_per_package):
+            self.write_file(directory / f"file{i}.js")
+        if depth >= self.spec.node_depth:
+            return
+        for i in range(self.spec.node_fanout):
+            self.package(directory / "node_modules" / f"dep{depth}-{i}", depth + 1)
+
+    def node_project(self, index: int) -> None:
+        """Write a Node.js project and its node_modules."""
+        project = self.root / "web" / f"app{index}"
+        (project / "src").mkdir(parents=True)
+        (project / "package.json").write_text("{}", encoding="utf-8")
+        (project / "src" / "index.js").write_text("", encoding="utf-8")
+        modules = project / "node_modules"
+        for i in range(self.spec.node_fanout):
+            self.package(modules / f"pkg{i}", 1)
+        if self.spec.symlinks:
+            (modules / ".bin").mkdir()
+            (modules / ".bin" / "tool").symlink_to(modules / "pkg0" / "file0.js")
+            if index > 0:
+                (modules / "workspace-sibling").symlink_to(
+                    self.root / "web" / f"app{index - 1}", target_is_directory=True
+                )
+        self.stats.artifacts += 1
+
+    def dotnet_project(self, index: int) -> None:
+        """Write a .NET project with populated bin and obj folders."""
+        project = self.root / "dotnet" / f"Lib{index}"
+        project.mkdir(parents=True)
+        body = _MSBUILD_ONLY if self.rng.random() < self.spec.msbuild_fraction else ""
+        (project / f"Lib{index}.csproj").write_text(
+            f'<Project Sdk="Microsoft.NET.Sdk">\n{body}</Project>\n', encoding="utf-8"
+        )
+        for output in ("bin/Debug/net8.0", "obj/Debug/net8.0"):
+            (project / output).mkdir(parents=True)
+            for i in range(self.spec.output_files):
+                self.write_file(project / output / f"Lib{index}.{i}.dll")
+        self.stats.artifacts += 2
+
+    def generate(self) -> TreeStats:
+        """Write the whole tree."""
+        if self.spec.hardlink_fraction > 0:
+            store = self.root / "store"
+            store.mkdir(parents=True)
+            for i in range(max(1, self.spec.files_per_package)):
+                path = store / f"blob{i}"
+                path.write_bytes(self.rng.randbytes(self.spec.max_file_size))
+                self.store.append(path)
+        for i in range(self.spec.node_projects):
+            self.node_project(i)
+        for i in range(self.spec.dotnet_projects):
+            self.dotnet_project(i)
+        return self.stats
+
+
+def generate_tree(root: Path, spec: TreeSpec) -> TreeStats:
+    """Create the tree described by spec below root (which must not exist)."""
+    root.mkdir(parents=True)
+    return _Generator(root, spec).generate()
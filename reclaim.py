@@ -0,0 +1,129 @@
+"""
+Free a target amount of disk space with as little work as possible.
+"""
+
+import heapq
+import math
+import re
+import shutil
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from scanner import Artifact
+from scanner.sizing import Sizer
+
+RANKINGS = ("size", "stale")
+
+# Lock files whose mtime tells when a project's dependencies last changed.
+LOCKFILES = (
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "bun.lock",
+    "bun.lockb",
+    "packages.lock.json",
+)
+
+_SIZE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([kmgtp]?)(?:i?b)?", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4, "p": 1024**5}
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as "50G", "1.5 TiB" or "4096" into bytes.
+
+    Units are binary: K, KB and KiB all mean 1024 bytes.
+    """
+    match = _SIZE_PATTERN.fullmatch(text.strip())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def free_bytes(path: Path) -> int:
+    """Return the bytes available to unprivileged users on path's filesystem."""
+    # f_bavail * f_frsize from os.statvfs on POSIX
+    return shutil.disk_usage(path).free
+
+
+def target_free_bytes(
+    path: Path, free: Optional[int] = None, until_free: Optional[float] = None
+) -> int:
+    """Return how many bytes must be available on path's filesystem.
+
+    free asks for that many more bytes than are available now, until_free
+    for that percentage of the filesystem to be available. With both, the
+    larger target wins.
+    """
+    usage = shutil.disk_usage(path)
+    target = usage.free
+    if free is not None:
+        target = max(target, usage.free + free)
+    if until_free is not None:
+        target = max(target, math.ceil(usage.total * until_free / 100))
+    return target
+
+
+def last_change(artifact: Artifact) -> float:
+    """Return when the project owning artifact last changed its dependencies.
+
+    That is the newest mtime of its project file and the lock files next to
+    it. Artifacts of unknown projects fall back to their own mtime.
+    """
+    candidates = [artifact.path]
+    if artifact.project is not None:
+        candidates = [artifact.project]
+        candidates += [artifact.project.parent / name for name in LOCKFILES]
+    mtimes = []
+    for candidate in candidates:
+        try:
+            mtimes.append(candidate.stat().st_mtime)
+        except OSError:
+            continue
+    return max(mtimes, default=0.0)
+
+
+class ReclaimQueue:
+    """Artifacts ranked for removal, largest or stalest first.
+
+    Ranking by size needs sized artifacts. Ranking by staleness does not; with
+    a sizer, artifacts are then only sized once they are taken from the queue,
+    so artifacts that are never needed are never sized.
+    """
+
+    def __init__(
+        self,
+        artifacts: Iterable[Artifact],
+        ranking: str = "size",
+        sizer: Optional[Sizer] = None,
+    ) -> None:
+        if ranking not in RANKINGS:
+            raise ValueError(f"Unknown ranking: {ranking}")
+        self._sizer = sizer
+        self._heap: List[Tuple[float, str, Artifact]] = []
+        for artifact in artifacts:
+            if ranking == "size":
+                key = -float(artifact.reclaimable_bytes)
+            else:
+                key = last_change(artifact)
+            # The path breaks ties, so artifacts themselves are never compared
+            self._heap.append((key, str(artifact.path), artifact))
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def take(self, needed: int) -> List[Artifact]:
+        """Take the next artifacts whose removal should free needed bytes.
+
+        Returns fewer bytes' worth when the queue runs out.
+        """
+        taken: List[Artifact] = []
+        expected = 0
+        while self._heap and expected < needed:
+            artifact = heapq.heappop(self._heap)[2]
+            if self._sizer is not None:
+                artifact = self._sizer.size(artifact)
+            taken.append(artifact)
+            expected += artifact.reclaimable_bytes
+        return taken
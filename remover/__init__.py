@@ -2,8 +2,37 @@
 Build artifact removers.
 """
 
-from .base_delete import BaseRemover
-from .direct_delete import DirectRemover
-from .rm_output import ScriptRemover
+from typing import TYPE_CHECKING
 
-__all__ = ["BaseRemover", "DirectRemover", "ScriptRemover"]
+from scanner.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base_delete import BaseRemover
+    from .direct_delete import DirectRemover
+    from .rm_output import ScriptRemover
+    from .staging import StagingRemover, find_staging_dirs, purge
+    from .tree_delete import ParallelDeleter
+
+# Module of each export; exports are imported on first use (see `scanner`).
+_MODULES = {
+    "BaseRemover": ".base_delete",
+    "DirectRemover": ".direct_delete",
+    "ParallelDeleter": ".tree_delete",
+    "ScriptRemover": ".rm_output",
+    "StagingRemover": ".staging",
+    "find_staging_dirs": ".staging",
+    "purge": ".staging",
+}
+
+__all__ = [
+    "BaseRemover",
+    "DirectRemover",
+    "ParallelDeleter",
+    "ScriptRemover",
+    "StagingRemover",
+    "find_staging_dirs",
+    "purge",
+]
+
+
+__getattr__ = lazy_exports(__name__, _MODULES)
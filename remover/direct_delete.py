@@ -2,39 +2,66 @@
 Directly remove build artifacts from the filesystem.
 """
 
-import shutil
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, List, Optional, Tuple
+
+from scanner.stats import RunStats
 
 from .base_delete import BaseRemover, RemovalResult
+from .tree_delete import ParallelDeleter
 
 
 class DirectRemover(BaseRemover):
-    """Removes artifacts directly from the filesystem."""
+    """Removes artifacts directly from the filesystem.
+
+    Confirmed artifacts are removed in the background by a `ParallelDeleter`
+    of at most jobs threads while the next one is being confirmed. Without
+    confirm, every artifact is removed without asking. The work done is
+    reported to stats.
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        confirm: bool = True,
+        stats: Optional[RunStats] = None,
+    ) -> None:
+        self.jobs = jobs
+        self.confirm = confirm
+        self.stats = RunStats(enabled=False) if stats is None else stats
+        self._deleter = ParallelDeleter(jobs, self.stats)
+
+    def _dispose(self, artifact: Path) -> "Future[None]":
+        """Start getting rid of one confirmed artifact."""
+        return self._deleter.submit(artifact)
 
     def remove(self, artifacts: Iterable[Path]) -> RemovalResult:
         print("\nDeleting artifacts...")
         result = RemovalResult(success=True)
+        pending: List[Tuple[Path, "Future[None]"]] = []
         for artifact in artifacts:
             try:
-                response = input(f"  Remove {artifact}? [y/N] ").lower().strip()
-                if response != "y":
-                    print(f"  Skipping {artifact}...")
-                    result.skipped.append(artifact)
-                    continue
+                if self.confirm:
+                    response = input(f"  Remove {artifact}? [y/N] ").lower().strip()
+                    if response != "y":
+                        print(f"  Skipping {artifact}...")
+                        result.skipped.append(artifact)
+                        continue
 
                 print(f"  Removing {artifact}...")
-                if artifact.is_dir():
-                    shutil.rmtree(artifact)
-                else:
-                    artifact.unlink()
-                result.removed.append(artifact)
-            except (OSError, PermissionError) as e:
-                print(f"  Error removing {artifact}: {e}")
-                result.failed.append(artifact)
-                result.success = False
+                pending.append((artifact, self._dispose(artifact)))
             except EOFError:
                 print("\nInterrupted.")
                 result.success = False
                 break
+
+        for artifact, future in pending:
+            try:
+                future.result()
+                result.removed.append(artifact)
+            except OSError as e:
+                print(f"  Error removing {artifact}: {e}")
+                result.failed.append(artifact)
+                result.success = False
         return result
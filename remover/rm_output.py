@@ -3,19 +3,69 @@ Generate a shell script to remove build artifacts.
 """
 
 import os
+import shlex
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, List, Optional
 
 from .base_delete import BaseRemover, RemovalResult
 
+# Runs a single xargs for the whole script, fed through a FIFO: every path is
+# written to it by a command of its own, so a shell reading the script starts
+# deleting while the scan is still running. (A pipeline would only start once
+# the shell had read all of it.)
+_PARALLEL_START = '''\
+fifo_dir=$(mktemp -d) || exit 1
+mkfifo "$fifo_dir/paths" || exit 1
+xargs -0 -n 1 -P {jobs} rm -rf < "$fifo_dir/paths" &
+exec 3> "$fifo_dir/paths"'''
+
+_PARALLEL_END = '''\
+exec 3>&-
+wait
+rm -r "$fifo_dir"'''
+
+
+def quote(path: Path) -> str:
+    """Quote path as a single shell word.
+
+    POSIX shells get single quotes, which keep $, backticks, double quotes
+    and even newlines literal. Windows gets the double quotes its shells
+    understand.
+    """
+    if os.name == "nt":
+        return f'"{path}"'
+    return shlex.quote(str(path))
+
 
 class ScriptRemover(BaseRemover):
-    """Prints shell commands to remove artifacts to stdout."""
+    """Prints shell commands to remove artifacts to stdout.
+
+    With sort=False each command is printed as soon as its artifact arrives,
+    so the script can be consumed while the scan is still running. With jobs,
+    a POSIX script removes up to jobs artifacts at the same time: every path
+    is written NUL-delimited to one `xargs -0 -P jobs rm -rf` running for the
+    whole script.
+    """
+
+    def __init__(self, sort: bool = True, jobs: Optional[int] = None) -> None:
+        self.sort = sort
+        self.jobs = jobs
 
     def remove(self, artifacts: Iterable[Path]) -> RemovalResult:
-        sorted_artifacts = sorted(list(artifacts))
+        if self.sort:
+            artifacts = sorted(list(artifacts))
+        parallel = self.jobs is not None and os.name != "nt"
         if os.name != "nt":
-            print("#!/bin/sh")
-        for artifact in sorted_artifacts:
-            print(f'rm -rf "{artifact}"')
-        return RemovalResult(success=True, removed=sorted_artifacts)
+            print("#!/bin/sh", flush=not self.sort)
+        removed: List[Path] = []
+        for artifact in artifacts:
+            if parallel and not removed:
+                print(_PARALLEL_START.format(jobs=self.jobs), flush=not self.sort)
+            removed.append(artifact)
+            if parallel:
+                print(f"printf '%s\\0' {quote(artifact)} >&3", flush=not self.sort)
+            else:
+                print(f"rm -rf {quote(artifact)}", flush=not self.sort)
+        if parallel and removed:
+            print(_PARALLEL_END, flush=not self.sort)
+        return RemovalResult(success=True, removed=removed)
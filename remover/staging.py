@@ -0,0 +1,149 @@
+"""
+Rename-then-purge removal of build artifacts.
+"""
+
+import os
+import tempfile
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from scanner.stats import RunStats
+
+from .base_delete import RemovalResult
+from .direct_delete import DirectRemover
+from .tree_delete import ParallelDeleter
+
+# Hidden directory that staged artifacts are moved into until they are purged.
+# The scanners' walker skips directories with this name.
+STAGING_DIR_NAME = ".src-clean-trash"
+
+# Version control metadata never contains staging directories.
+_PURGE_SKIP_DIRS = frozenset({".git", ".hg", ".svn", ".bzr", ".jj", "_darcs", "CVS"})
+
+
+def stage(artifact: Path, root: Path) -> Path:
+    """Atomically move artifact into a staging directory; return its new path.
+
+    The staging directory below root is used when possible. If the artifact
+    is on another filesystem (or root's staging directory cannot be created),
+    the artifact is staged next to itself instead, which is always a rename
+    within one filesystem unless the artifact is a mount point.
+    """
+    candidates = [root / STAGING_DIR_NAME]
+    if artifact.parent != root:
+        candidates.append(artifact.parent / STAGING_DIR_NAME)
+
+    error: Optional[OSError] = None
+    for staging_dir in candidates:
+        try:
+            staging_dir.mkdir(exist_ok=True)
+            # A private slot keeps the artifact's name readable and unique
+            slot = Path(tempfile.mkdtemp(prefix=f"{artifact.name}-", dir=staging_dir))
+        except OSError as e:
+            error = e
+            continue
+        target = slot / artifact.name
+        try:
+            os.rename(artifact, target)
+            return target
+        except OSError as e:
+            slot.rmdir()
+            error = e
+    assert error is not None
+    raise error
+
+
+class StagingRemover(DirectRemover):
+    """Moves artifacts into staging directories instead of deleting them.
+
+    Each confirmed artifact disappears from its project with a single rename,
+    however large it is. The staged trees are deleted later by `purge`; the
+    staging directories used are collected in staging_dirs. Renames are
+    timed as a "stage" phase of stats. With several roots, an artifact is
+    staged below the innermost root that contains it.
+    """
+
+    def __init__(
+        self,
+        root: Union[Path, Sequence[Path]],
+        jobs: Optional[int] = None,
+        confirm: bool = True,
+        stats: Optional[RunStats] = None,
+    ) -> None:
+        super().__init__(jobs, confirm, stats)
+        self.roots = [root] if isinstance(root, Path) else list(root)
+        self.staging_dirs: Set[Path] = set()
+
+    def _root_of(self, artifact: Path) -> Path:
+        containing = [root for root in self.roots if root in artifact.parents]
+        return max(
+            containing, key=lambda root: len(root.parts), default=artifact.parent
+        )
+
+    def _dispose(self, artifact: Path) -> "Future[None]":
+        future: "Future[None]" = Future()
+        try:
+            with self.stats.phase("stage"):
+                staged = stage(artifact, self._root_of(artifact))
+        except OSError as e:
+            future.set_exception(e)
+        else:
+            self.staging_dirs.add(staged.parent.parent)
+            future.set_result(None)
+        return future
+
+
+def find_staging_dirs(root: Path) -> List[Path]:
+    """Find the staging directories at or below root."""
+    if root.name == STAGING_DIR_NAME:
+        return [root]
+    found: List[Path] = []
+    for directory, dirnames, _ in os.walk(root):
+        if STAGING_DIR_NAME in dirnames:
+            found.append(Path(directory) / STAGING_DIR_NAME)
+        dirnames[:] = [
+            name
+            for name in dirnames
+            if name != STAGING_DIR_NAME and name not in _PURGE_SKIP_DIRS
+        ]
+    return found
+
+
+def purge(
+    staging_dirs: Iterable[Path],
+    jobs: Optional[int] = None,
+    stats: Optional[RunStats] = None,
+) -> RemovalResult:
+    """Delete everything staged in staging_dirs, then the directories themselves.
+
+    A staging directory that is not empty afterwards (because something in it
+    could not be deleted, or another run staged into it meanwhile) is kept.
+    """
+    deleter = ParallelDeleter(jobs, stats)
+    result = RemovalResult(success=True)
+    for staging_dir in staging_dirs:
+        try:
+            slots = list(staging_dir.iterdir())
+        except FileNotFoundError:
+            continue
+        except OSError:
+            result.failed.append(staging_dir)
+            result.success = False
+            continue
+
+        pending: List[Tuple[Path, "Future[None]"]] = [
+            (slot, deleter.submit(slot)) for slot in slots
+        ]
+        for slot, future in pending:
+            try:
+                future.result()
+                result.removed.append(slot)
+            except OSError:
+                result.failed.append(slot)
+                result.success = False
+        try:
+            staging_dir.rmdir()
+        except OSError:
+            pass
+    return result
@@ -0,0 +1,188 @@
+"""
+Parallel deletion engine for directory trees.
+"""
+
+import os
+import shutil
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional
+
+from scanner.stats import RunStats
+
+# Deletion is dominated by metadata latency, so use more threads than cores.
+DEFAULT_DELETE_JOBS = min(32, (os.cpu_count() or 1) + 4)
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+# fd-relative removal needs openat/unlinkat/fdopendir; Windows has none of them.
+_HAS_DIR_FD = os.scandir in os.supports_fd and all(
+    func in os.supports_dir_fd for func in (os.open, os.unlink, os.rmdir)
+)
+
+
+def _located(error: OSError, path: str) -> OSError:
+    """Errors from dir_fd calls only name the entry; report the full path."""
+    return OSError(error.errno, error.strerror, path)
+
+
+class _TreeRemoval:
+    """Removal of one directory tree, possibly spread over several threads."""
+
+    def __init__(self, slots: threading.Semaphore, stats: RunStats) -> None:
+        self._slots = slots
+        self._stats = stats
+        self._lock = threading.Lock()
+        self.errors: List[OSError] = []
+
+    def _record(self, error: OSError) -> None:
+        with self._lock:
+            self.errors.append(error)
+
+    def clear(self, dir_fd: int, path: str) -> None:
+        """Remove everything inside the open directory dir_fd."""
+        # Read the whole listing before removing anything, like shutil.rmtree:
+        # changing a directory while it is being read may skip entries
+        try:
+            with os.scandir(dir_fd) as it:
+                entries = list(it)
+        except OSError as e:
+            self._record(_located(e, path))
+            return
+
+        subdirs: List[str] = []
+        removed = 0
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            if is_dir:
+                subdirs.append(entry.name)
+                continue
+            try:
+                os.unlink(entry.name, dir_fd=dir_fd)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self._record(_located(e, os.path.join(path, entry.name)))
+        self._stats.add("files_removed", removed)
+
+        # Hand subtrees to helper threads while there are free slots and
+        # remove the rest inline, so the thread count stays bounded.
+        helpers: List[threading.Thread] = []
+        for name in subdirs:
+            if self._slots.acquire(blocking=False):
+                helper = threading.Thread(
+                    target=self._remove_dir_in_slot, args=(dir_fd, name, path)
+                )
+                helper.start()
+                helpers.append(helper)
+            else:
+                self.remove_dir(dir_fd, name, path)
+        for helper in helpers:
+            helper.join()
+
+    def _remove_dir_in_slot(self, parent_fd: int, name: str, parent: str) -> None:
+        try:
+            self.remove_dir(parent_fd, name, parent)
+        finally:
+            self._slots.release()
+
+    def remove_dir(self, parent_fd: int, name: str, parent: str) -> None:
+        """Remove the directory name inside the open directory parent_fd."""
+        path = os.path.join(parent, name)
+        try:
+            # O_NOFOLLOW: never descend through a symlink swapped in mid-walk
+            dir_fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            self._record(_located(e, path))
+            return
+        try:
+            self.clear(dir_fd, path)
+        finally:
+            os.close(dir_fd)
+        try:
+            os.rmdir(name, dir_fd=parent_fd)
+            self._stats.add("directories_removed")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self._record(_located(e, path))
+
+
+def rmtree(
+    path: Path,
+    slots: Optional[threading.Semaphore] = None,
+    stats: Optional[RunStats] = None,
+) -> None:
+    """Remove a directory tree using file-descriptor-relative operations.
+
+    Entries are opened, unlinked and removed relative to their parent
+    directory's descriptor, so no path is resolved more than once and
+    symlinks are never followed. Subdirectories are handed to helper threads
+    while slots has free permits and removed inline otherwise. The whole tree
+    is attempted before the first error met is raised. Removed files and
+    directories are counted in stats.
+    """
+    if not _HAS_DIR_FD:
+        shutil.rmtree(path)
+        return
+
+    if slots is None:
+        slots = threading.Semaphore(DEFAULT_DELETE_JOBS - 1)
+    if stats is None:
+        stats = RunStats(enabled=False)
+    removal = _TreeRemoval(slots, stats)
+    dir_fd = os.open(path, _DIR_FLAGS)
+    try:
+        removal.clear(dir_fd, str(path))
+    finally:
+        os.close(dir_fd)
+    if removal.errors:
+        raise removal.errors[0]
+    os.rmdir(path)
+    stats.add("directories_removed")
+
+
+class ParallelDeleter:
+    """Removes artifacts on a bounded number of threads.
+
+    Up to jobs artifacts are removed at the same time, and threads that are
+    not busy with an artifact of their own help remove the subtrees of large
+    ones. `submit` blocks while every thread is busy. Each removal is timed
+    as a "delete" phase of stats.
+    """
+
+    def __init__(
+        self, jobs: Optional[int] = None, stats: Optional[RunStats] = None
+    ) -> None:
+        self.jobs = jobs or DEFAULT_DELETE_JOBS
+        self.stats = RunStats(enabled=False) if stats is None else stats
+        self._slots = threading.Semaphore(self.jobs)
+
+    def submit(self, path: Path) -> "Future[None]":
+        """Start removing path; the future raises OSError if it failed."""
+        future: "Future[None]" = Future()
+        self._slots.acquire()  # pylint: disable=consider-using-with
+        threading.Thread(target=self._remove, args=(path, future)).start()
+        return future
+
+    def _remove(self, path: Path, future: "Future[None]") -> None:
+        try:
+            with self.stats.phase("delete"):
+                if path.is_dir() and not path.is_symlink():
+                    rmtree(path, self._slots, self.stats)
+                else:
+                    path.unlink()
+                    self.stats.add("files_removed")
+        except OSError as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+        finally:
+            self._slots.release()
@@ -0,0 +1,156 @@
+"""
+Machine-readable reports of the artifacts found.
+"""
+
+import json
+import math
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, TextIO
+
+from scanner import Artifact
+from scanner.sizing import DiskUsage
+
+FORMATS = ("text", "json", "ndjson")
+# Bumped whenever a record field changes meaning or is removed.
+REPORT_VERSION = 2
+
+
+class Totals:
+    """Running totals of the artifacts reported.
+
+    Error bounds of independent estimates add up in quadrature, so the total
+    error is the square root of the summed variances.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.estimated = 0
+        self.size_bytes = 0
+        self.reclaimable_bytes = 0
+        self._size_variance = 0.0
+        self._reclaimable_variance = 0.0
+
+    def add(self, artifact: Artifact) -> None:
+        """Count artifact towards the totals."""
+        self.count += 1
+        self.size_bytes += artifact.size_bytes
+        self.reclaimable_bytes += artifact.reclaimable_bytes
+        error = artifact.size_error
+        if error is not None:
+            self.estimated += 1
+            self._size_variance += error.apparent * error.apparent
+            self._reclaimable_variance += error.reclaimable * error.reclaimable
+
+    def size_error(self, disk_usage: bool = False) -> Optional[int]:
+        """Return the error bound of the total size, or None if it is exact.
+
+        With disk_usage, the bound of the reclaimable total is returned.
+        """
+        if not self.estimated:
+            return None
+        variance = self._reclaimable_variance if disk_usage else self._size_variance
+        return round(math.sqrt(variance))
+
+
+def artifact_record(
+    artifact: Artifact, elapsed: float, sized: bool = True
+) -> Dict[str, Any]:
+    """Return the report record of one artifact.
+
+    Sizes are exact byte counts; their error bounds are null unless the size
+    was estimated. Without sized, every size field is null. elapsed is the
+    number of seconds into the scan at which the artifact was ready.
+    """
+    error = artifact.size_error if sized else None
+    return {
+        "record": "artifact",
+        "path": str(artifact.path),
+        "type": artifact.type,
+        "project": None if artifact.project is None else str(artifact.project),
+        "size_bytes": artifact.size_bytes if sized else None,
+        "reclaimable_bytes": artifact.reclaimable_bytes if sized else None,
+        "size_error_bytes": None if error is None else error.apparent,
+        "reclaimable_error_bytes": None if error is None else error.reclaimable,
+        "elapsed_seconds": round(elapsed, 6),
+    }
+
+
+def artifact_from_record(record: Dict[str, Any]) -> Artifact:
+    """Rebuild the artifact an artifact record describes."""
+    error = None
+    if record.get("size_error_bytes") is not None:
+        error = DiskUsage(record["size_error_bytes"], record["reclaimable_error_bytes"])
+    return Artifact(
+        path=Path(record["path"]),
+        type=record["type"],
+        size_bytes=record.get("size_bytes") or 0,
+        reclaimable_bytes=record.get("reclaimable_bytes") or 0,
+        project=None if record.get("project") is None else Path(record["project"]),
+        size_error=error,
+    )
+
+
+def summary_record(
+    roots: Sequence[Path], totals: Totals, elapsed: float, sized: bool = True
+) -> Dict[str, Any]:
+    """Return the record that closes a report."""
+    return {
+        "record": "summary",
+        "version": REPORT_VERSION,
+        "host": socket.gethostname(),
+        "roots": [str(root) for root in roots],
+        "artifacts": totals.count,
+        "estimated": totals.estimated,
+        "size_bytes": totals.size_bytes if sized else None,
+        "reclaimable_bytes": totals.reclaimable_bytes if sized else None,
+        "size_error_bytes": totals.size_error() if sized else None,
+        "reclaimable_error_bytes": totals.size_error(True) if sized else None,
+        "elapsed_seconds": round(elapsed, 6),
+    }
+
+
+class RecordWriter:
+    """Writes report records to a stream as they are produced.
+
+    "ndjson" writes one JSON object per line, flushed at once. "json" writes
+    a single document, {"artifacts": [...], "summary": {...}}, but still
+    streams each artifact as it arrives instead of buffering the list.
+    """
+
+    def __init__(self, output_format: str, stream: Optional[TextIO] = None) -> None:
+        if output_format not in ("json", "ndjson"):
+            raise ValueError(f"Unknown record format: {output_format}")
+        self.output_format = output_format
+        self.stream = sys.stdout if stream is None else stream
+        self.start = time.perf_counter()
+        self._count = 0
+
+    def elapsed(self) -> float:
+        """Return the seconds since the writer was created."""
+        return time.perf_counter() - self.start
+
+    def artifact(self, record: Dict[str, Any]) -> None:
+        """Write one artifact record."""
+        if self.output_format == "ndjson":
+            self._write_line(record)
+            return
+        prefix = '{"artifacts": [\n  ' if not self._count else ",\n  "
+        self.stream.write(prefix + json.dumps(record))
+        self.stream.flush()
+        self._count += 1
+
+    def finish(self, summary: Dict[str, Any]) -> None:
+        """Write the summary record, which ends the report."""
+        if self.output_format == "ndjson":
+            self._write_line(summary)
+            return
+        opening = '{"artifacts": [' if not self._count else "\n"
+        self.stream.write(f'{opening}], "summary": {json.dumps(summary)}}}\n')
+        self.stream.flush()
+
+    def _write_line(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.stream.flush()
@@ -2,8 +2,48 @@
 Build artifact scanners.
 """
 
-from .node import NodeScanner
-from .dotnet import DotnetScanner
-from .base_scanner import Artifact, BaseScanner
+from typing import TYPE_CHECKING
 
-__all__ = ["NodeScanner", "DotnetScanner", "BaseScanner", "Artifact"]
+from .lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base_scanner import Artifact, BaseScanner
+    from .dotnet import DotnetScanner
+    from .dotnet_cache import DotnetPropertyCache
+    from .index import ScanIndex
+    from .node import NodeScanner
+    from .rules import RuleScanner
+    from .stats import RunStats
+    from .walker import scan_tree, stream_tree
+
+# Module of each export. Exports are imported on first use, so a run only
+# loads the scanners it selects (the .NET scanner and the SQLite index are
+# the expensive ones).
+_MODULES = {
+    "NodeScanner": ".node",
+    "DotnetScanner": ".dotnet",
+    "RuleScanner": ".rules",
+    "BaseScanner": ".base_scanner",
+    "Artifact": ".base_scanner",
+    "DotnetPropertyCache": ".dotnet_cache",
+    "ScanIndex": ".index",
+    "RunStats": ".stats",
+    "scan_tree": ".walker",
+    "stream_tree": ".walker",
+}
+
+__all__ = [
+    "NodeScanner",
+    "DotnetScanner",
+    "RuleScanner",
+    "BaseScanner",
+    "Artifact",
+    "DotnetPropertyCache",
+    "ScanIndex",
+    "RunStats",
+    "scan_tree",
+    "stream_tree",
+]
+
+
+__getattr__ = lazy_exports(__name__, _MODULES)
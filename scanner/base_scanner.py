@@ -3,9 +3,12 @@ Base scanner interface.
 """
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Set
+from typing import TYPE_CHECKING, FrozenSet, Iterator, List, Optional, Set
+
+if TYPE_CHECKING:
+    from .sizing import DiskUsage
 
 
 @dataclass(frozen=True)
@@ -15,27 +18,76 @@ class Artifact:
     path: Path
     type: str
     size_bytes: int = 0
-
-
-def get_dir_size(path: Path) -> int:
-    """Calculate the total size of a directory in bytes."""
-    total_size = 0
-    try:
-        for p in path.rglob("*"):
-            if p.is_file():
-                total_size += p.stat().st_size
-    except (OSError, PermissionError):
-        # If we can't access some files, we'll return what we could find
-        pass
-    return total_size
+    reclaimable_bytes: int = 0
+    # Project file (e.g. package.json) the artifact was built from, if known
+    project: Optional[Path] = field(default=None, compare=False)
+    # Error bounds of the sizes above if they were estimated, None if exact
+    size_error: Optional["DiskUsage"] = field(default=None, compare=False)
+    # Artifacts inside this one that were found and sized before it; its
+    # sizes leave them out (see `scanner.containment.collapse`)
+    nested: FrozenSet[Path] = field(default=frozenset(), compare=False)
 
 
 class BaseScanner(ABC):
-    """Base class for all build artifact scanners."""
+    """Base class for all build artifact scanners.
+
+    Scanners do not walk the filesystem themselves. The shared traversal in
+    `scanner.walker` visits every directory once and hands its entries to each
+    registered scanner through `visit_directory`. Sizing of the detected
+    artifacts is done afterwards by `scanner.sizing`.
+    """
 
     @abstractmethod
+    def visit_directory(
+        self,
+        directory: Path,
+        dirnames: List[str],
+        filenames: List[str],
+    ) -> Set[Artifact]:
+        """
+        Inspect a single directory visited by the shared traversal.
+        Returns the Artifacts detected from this directory's entries.
+        """
+
+    def reads_file(self, name: str) -> bool:  # pylint: disable=unused-argument
+        """
+        Return True if the contents of files called name can change what the
+        scanner reports, not just whether such a file exists. The watch daemon
+        visits directories again when such a file in them is rewritten.
+        """
+        return False
+
+    def deferred_directories(self) -> Set[Path]:
+        """
+        Return the directories below which artifacts may still be reported
+        for directories visited already (by `finish_scan`). The walk holds
+        back what it found below them, so that an artifact reported late can
+        take the place of the artifacts found inside it.
+        """
+        return set()
+
+    def finish_scan(self) -> Set[Artifact]:
+        """
+        Called once the traversal has visited every directory.
+        Returns Artifacts whose detection was deferred until the end of the walk.
+        """
+        return set()
+
     def scan(self, root_path: Path, calculate_size: bool = True) -> Set[Artifact]:
         """
         Scan for build artifacts in the given root path.
         Returns a set of Artifacts to be removed.
         """
+        return set(self.iter_scan(root_path, calculate_size=calculate_size))
+
+    def iter_scan(
+        self, root_path: Path, calculate_size: bool = True
+    ) -> Iterator[Artifact]:
+        """
+        Scan for build artifacts in the given root path.
+        Yields Artifacts as soon as they are found (and sized).
+        """
+        # Imported here to avoid a circular import with the walker module.
+        from .walker import stream_tree  # pylint: disable=import-outside-toplevel
+
+        return stream_tree(root_path, [self], calculate_size=calculate_size)
@@ -0,0 +1,21 @@
+"""
+Location of the per-user cache directory.
+"""
+
+import os
+from pathlib import Path
+
+
+def user_cache_dir() -> Path:
+    """Return the directory for src-clean's persistent caches.
+
+    Follows the XDG base directory spec ($XDG_CACHE_HOME, defaulting to
+    ~/.cache) and uses %LOCALAPPDATA% on Windows.
+    """
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    elif os.environ.get("XDG_CACHE_HOME"):
+        base = Path(os.environ["XDG_CACHE_HOME"])
+    else:
+        base = Path.home() / ".cache"
+    return base / "src-clean"
@@ -0,0 +1,123 @@
+"""
+Keeping only top-level artifacts when artifacts are nested.
+"""
+
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from .sizing import DiskUsage
+
+if TYPE_CHECKING:
+    from .base_scanner import Artifact
+
+
+class _Node:
+    __slots__ = ("children", "member")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.member = False
+
+
+class PathTrie:
+    """Set of paths none of which lies inside another, as a trie of components.
+
+    Adding a path inside a member is refused; adding a path that contains
+    members replaces them. Both take time proportional to the depth of the
+    path (plus the members replaced), however many paths there are.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, Path):
+            return False
+        node: Optional[_Node] = self._root
+        for part in path.parts:
+            if node is None:
+                return False
+            node = node.children.get(part)
+        return node is not None and node.member
+
+    def covers(self, path: Path) -> bool:
+        """Return True if path or one of its parents is a member."""
+        node = self._root
+        for part in path.parts:
+            if node.member:
+                return True
+            child = node.children.get(part)
+            if child is None:
+                return False
+            node = child
+        return node.member
+
+    def add(self, path: Path) -> Optional[List[Path]]:
+        """Add path, returning the members it replaces.
+
+        Returns None, leaving the trie unchanged, if path is covered already.
+        """
+        if self.covers(path):
+            return None
+        node = self._root
+        for part in path.parts:
+            node = node.children.setdefault(part, _Node())
+        replaced: List[Path] = []
+        stack = [(path, node)]
+        while stack:
+            parent, current = stack.pop()
+            for part, child in current.children.items():
+                if child.member:
+                    replaced.append(parent / part)
+                else:
+                    stack.append((parent / part, child))
+        node.children = {}
+        node.member = True
+        return replaced
+
+
+def _add_errors(
+    total: Optional[DiskUsage], error: Optional[DiskUsage]
+) -> Optional[DiskUsage]:
+    """Add error bounds; the sum is a conservative bound of the total."""
+    if total is None or error is None:
+        return total or error
+    return DiskUsage(
+        total.apparent + error.apparent, total.reclaimable + error.reclaimable
+    )
+
+
+def collapse(artifacts: Iterable["Artifact"]) -> List["Artifact"]:
+    """Keep only the top-level artifacts, sorted by path.
+
+    Artifacts inside another one are dropped, since removing the outer one
+    removes them too. The sizes of those listed in the `nested` paths of
+    the artifact they are in were measured apart from it, so they are added
+    to the top-level artifact; the others are part of its size already.
+    Sorting by path puts every artifact right after the ones containing it,
+    so a single sweep finds them.
+    """
+    kept: List["Artifact"] = []
+    # The top-level artifact being built and the chain of artifacts down
+    # to the last one seen inside it
+    chain: List["Artifact"] = []
+    for artifact in sorted(artifacts, key=lambda a: a.path.parts):
+        if chain and chain[-1].path == artifact.path:
+            continue
+        while chain and chain[-1].path not in artifact.path.parents:
+            chain.pop()
+        if not chain:
+            kept.append(artifact)
+            chain.append(artifact)
+            continue
+        if artifact.path in chain[-1].nested:
+            top = kept[-1]
+            kept[-1] = replace(
+                top,
+                size_bytes=top.size_bytes + artifact.size_bytes,
+                reclaimable_bytes=top.reclaimable_bytes + artifact.reclaimable_bytes,
+                size_error=_add_errors(top.size_error, artifact.size_error),
+            )
+        chain.append(artifact)
+    return [replace(a, nested=frozenset()) if a.nested else a for a in kept]
@@ -0,0 +1,10 @@
+"""
+Names and defaults the command line needs before any scanner is loaded.
+"""
+
+# Ecosystems of the rule-driven scanner, in the order of its rules
+# (`scanner.rules.RULES` must cover exactly these).
+ECOSYSTEMS = ("rust", "maven", "gradle", "python", "cmake")
+
+# Seconds one .NET project may take to evaluate before it is given up on.
+DEFAULT_EVALUATION_TIMEOUT = 120.0
@@ -5,73 +5,549 @@ Scanner for .NET build artifacts.
 import json
 import os
 import subprocess
+import sys
+import tempfile
+from itertools import chain
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Set
+from typing import Dict, List, Optional, Set
 
-from .base_scanner import Artifact, BaseScanner, get_dir_size
+from .base_scanner import Artifact, BaseScanner
+from .dotnet_cache import EVALUATION_INPUTS, DotnetPropertyCache
+from .dotnet_layout import (
+    SOLUTION_EXTENSIONS,
+    LayoutGroup,
+    LayoutKey,
+    LayoutKeys,
+    OutputLayout,
+    solution_projects,
+)
+from .defaults import DEFAULT_EVALUATION_TIMEOUT
+from .dotnet_sdk import SdkProbe, find_global_json
+from .msbuild_static import RESOLVED_PROPERTIES, StaticEvaluator
+from .stats import RunStats
 
+PROJECT_EXTENSIONS = (".csproj", ".fsproj", ".vbproj")
+OUTPUT_PROPERTIES = RESOLVED_PROPERTIES
+EVALUATION_MODES = ("auto", "static", "msbuild")
+# Projects evaluated by one dotnet process. Smaller batches spread better over
+# the workers; larger ones pay the SDK start-up cost less often.
+BATCH_SIZE = 8
 
-class DotnetScanner(BaseScanner):
-    """Scanner for .NET bin and obj folders."""
+_REPORT_METADATA = "\n".join(f"        <{p}>$({p})</{p}>" for p in OUTPUT_PROPERTIES)
 
-    def __init__(self) -> None:
-        self._is_available = self._check_dotnet_tool()
+# Imported into every evaluated project (through the standard
+# CustomAfterMicrosoftCommonTargets hook) to report its output paths as item
+# metadata, so that one MSBuild run can evaluate many projects.
+_REPORT_TARGETS = f"""<Project>
+  <Target Name="_SrcCleanReportPaths" Returns="@(_SrcCleanPaths)">
+    <ItemGroup>
+      <_SrcCleanPaths Include="$(MSBuildProjectFullPath)">
+{_REPORT_METADATA}
+      </_SrcCleanPaths>
+    </ItemGroup>
+  </Target>
+</Project>
+"""
 
-    def _check_dotnet_tool(self) -> bool:
-        """Check if the dotnet tool is available."""
-        try:
-            subprocess.run(
-                ["dotnet", "--version"],
-                capture_output=True,
-                check=True,
-            )
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+_BATCH_PROJECT = """<Project>
+  <ItemGroup>
+{items}
+  </ItemGroup>
+  <Target Name="SrcCleanEvaluate">
+    <MSBuild Projects="@(_SrcCleanProject)"
+             Targets="_SrcCleanReportPaths"
+             Properties={properties}
+             BuildInParallel="true"
+             ContinueOnError="true">
+      <Output TaskParameter="TargetOutputs" ItemName="SrcCleanResult" />
+    </MSBuild>
+  </Target>
+</Project>
+"""
+
+
+def _msbuild_escape(value: str) -> str:
+    """Escape characters that MSBuild treats specially in item specs."""
+    return "".join(f"%{ord(c):02X}" if c in "%*?@$;'" else c for c in value)
+
+
+def _normalize_msbuild_path(value: str) -> str:
+    """MSBuild may report Windows separators regardless of the platform."""
+    return value.replace("\\", os.sep) if os.sep != "\\" else value
+
+
+def _split(projects: List[Path], jobs: int) -> List[List[Path]]:
+    """Split projects into at most jobs batches of about BATCH_SIZE projects."""
+    count = min(jobs, -(-len(projects) // BATCH_SIZE))
+    return [projects[i::count] for i in range(count)]
+
+
+def _warn(project_file: Path, error: Exception) -> None:
+    if isinstance(error, subprocess.TimeoutExpired):
+        reason = f"timed out after {error.timeout:g}s"
+    elif isinstance(error, subprocess.CalledProcessError):
+        reason = f"dotnet msbuild exited with code {error.returncode}"
+    else:
+        reason = str(error)
+    print(f"Warning: could not evaluate {project_file}: {reason}", file=sys.stderr)
+
+
+class DotnetScanner(BaseScanner):  # pylint: disable=too-many-instance-attributes
+    """Scanner for .NET bin and obj folders.
+
+    Project files are first resolved by the static evaluator in
+    `scanner.msbuild_static`, which needs no SDK. Projects it cannot resolve
+    confidently are collected during the walk and evaluated together when it
+    finishes: several projects are resolved in a single `dotnet msbuild`
+    invocation, and only projects that the batch could not evaluate fall back
+    to a call of their own. Batches are handed to a pool of at most jobs
+    dotnet processes as soon as they fill up, so evaluation overlaps with the
+    rest of the walk, and the results of finished batches are reported as
+    the walk goes on. A project that fails or exceeds timeout seconds is
+    skipped with a warning on stderr; it does not abort the scan.
+
+    The walk does not wait for the batches, so it still descends into the
+    bin and obj directories of projects left to msbuild before they are
+    known to be artifacts. Waiting at every such project would serialize
+    the dotnet processes. The directories of pending projects, and the
+    output roots their layout groups reported elsewhere, are
+    `deferred_directories`, so what the walk finds inside their outputs is
+    held back and dropped once the outputs themselves are reported; only
+    the time spent walking them is lost.
+
+    Projects whose outputs are moved by a shared Directory.Build.props (a
+    common ArtifactsPath or output root) are grouped by layout (see
+    `scanner.dotnet_layout`): only LAYOUT_SAMPLES projects of a group are
+    evaluated, and if they agree their layout is applied to the rest. The
+    projects of a .sln or .slnx file are read as soon as the walk reaches
+    it, so their evaluation starts early; their artifacts are still only
+    reported once the walk reaches the project, so excluded directories
+    stay untouched.
+
+    The evaluation mode is one of EVALUATION_MODES: "auto" (static with an
+    msbuild fallback), "static" (never start the SDK) or "msbuild" (always
+    ask the SDK). The SDK is only probed once a project needs it. With a
+    cache, msbuild results and the SDK probe are reused across runs for as
+    long as the project, its evaluation inputs and the SDK are unchanged.
 
-    def scan(self, root_path: Path, calculate_size: bool = True) -> Set[Artifact]:
-        """Scan for build artifacts in the given root path."""
-        if not self._is_available:
+    Every dotnet process started is timed as a "dotnet_msbuild" phase of
+    stats, so the phase's calls are the number of processes started.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        evaluation: str = "auto",
+        cache: Optional[DotnetPropertyCache] = None,
+        jobs: Optional[int] = None,
+        timeout: float = DEFAULT_EVALUATION_TIMEOUT,
+        stats: Optional[RunStats] = None,
+    ) -> None:
+        if evaluation not in EVALUATION_MODES:
+            raise ValueError(f"Unknown evaluation mode: {evaluation}")
+        if jobs is not None and jobs < 1:
+            raise ValueError(f"jobs must be at least 1, got {jobs}")
+        self._evaluation = evaluation
+        self._cache = cache
+        self._jobs = jobs or os.cpu_count() or 1
+        self._timeout = timeout
+        self._stats = RunStats(enabled=False) if stats is None else stats
+        self._static = StaticEvaluator()
+        self._sdk = SdkProbe(
+            None if cache is None else cache.path.with_name("dotnet-sdk.json"),
+            self._stats,
+        )
+        self._pending: List[Path] = []
+        self._keys: Dict[Path, str] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._batches: Dict["Future[Dict[Path, Dict[str, str]]]", List[Path]] = {}
+        self._layout_keys = LayoutKeys()
+        self._groups: Dict[LayoutKey, LayoutGroup] = {}
+        self._sample_groups: Dict[Path, LayoutGroup] = {}
+        # Projects seen so far, those reached by the walk, and the artifacts
+        # of projects read from a solution before the walk reached them
+        self._visited: Set[Path] = set()
+        self._walked: Set[Path] = set()
+        self._held: Dict[Path, Set[Artifact]] = {}
+
+    def _sdk_version(self, project_file: Path) -> Optional[str]:
+        """Return the SDK version, or None if the SDK is not to be used."""
+        if self._evaluation == "static":
+            return None
+        sdk = self._sdk.get(project_file.parent)
+        return None if sdk is None else sdk.version
+
+    def visit_directory(
+        self,
+        directory: Path,
+        dirnames: List[str],
+        filenames: List[str],
+    ) -> Set[Artifact]:
+        solutions = [file for file in filenames if file.endswith(SOLUTION_EXTENSIONS)]
+        for file in solutions:
+            self._visit_solution(directory / file)
+
+        artifacts: Set[Artifact] = set()
+        for file in filenames:
+            if not file.endswith(PROJECT_EXTENSIONS):
+                continue
+            project_file = directory / file
+            self._walked.add(project_file)
+            if project_file in self._visited:
+                artifacts.update(self._held.pop(project_file, set()))
+            else:
+                artifacts.update(self._visit_project(project_file))
+        artifacts.update(self._collect_finished())
+
+        # Start evaluating the projects of a solution while the walk goes on
+        if len(self._pending) >= BATCH_SIZE or (solutions and self._pending):
+            self._submit(self._pending)
+            self._pending = []
+        return artifacts
+
+    def reads_file(self, name: str) -> bool:
+        suffixes = (*PROJECT_EXTENSIONS, *SOLUTION_EXTENSIONS, ".props", ".targets")
+        return name.endswith(suffixes) or name in EVALUATION_INPUTS
+
+    def deferred_directories(self) -> Set[Path]:
+        # Queued and submitted projects, and members of groups whose samples
+        # have not agreed yet, are reported later
+        projects = [*self._pending, *chain.from_iterable(self._batches.values())]
+        directories = {project_file.parent for project_file in projects}
+        for group in self._groups.values():
+            if group.members:
+                directories.update(member.parent for member in group.members)
+                directories.update(group.roots())
+        return directories
+
+    def _visit_solution(self, solution: Path) -> None:
+        """Visit the projects of a solution that lie below its directory."""
+        self._stats.add("solutions_read")
+        for project_file in solution_projects(solution):
+            if (
+                project_file.name.endswith(PROJECT_EXTENSIONS)
+                and project_file not in self._visited
+                and solution.parent in project_file.parents
+                and project_file.is_file()
+            ):
+                self._held[project_file] = self._visit_project(project_file)
+
+    def _visit_project(self, project_file: Path) -> Set[Artifact]:
+        """Resolve a project now if possible, or queue it for evaluation."""
+        self._visited.add(project_file)
+        props = None
+        if self._evaluation != "msbuild":
+            props = self._static.evaluate(project_file)
+        if props is not None:
+            self._stats.add("projects_resolved_without_msbuild")
+            return self._artifacts_from_properties(project_file, props)
+        sdk_version = self._sdk_version(project_file)
+        if sdk_version is None:
             return set()
 
+        key = self._layout_keys.key(project_file)
+        group = None if key is None else self._groups.setdefault(key, LayoutGroup())
+        if group is not None:
+            layout = group.layout
+            if layout is not None:
+                self._stats.add("projects_resolved_by_layout")
+                return self._artifacts_from_layout(project_file, layout)
+            if not group.wants_sample():
+                group.members.append(project_file)
+                return set()
+            group.samples.append(project_file)
+            self._sample_groups[project_file] = group
+
+        props = self._cached_properties(project_file, sdk_version)
+        if props is not None:
+            self._stats.add("projects_resolved_without_msbuild")
+            return self._artifacts_from_properties(project_file, props)
+        self._pending.append(project_file)
+        return set()
+
+    def _collect_finished(self) -> Set[Artifact]:
+        """Report the projects of the batches that finished during the walk."""
+        finished = [future for future in self._batches if future.done()]
+        if not finished:
+            return set()
+        evaluated: Dict[Path, Dict[str, str]] = {}
+        for future in finished:
+            del self._batches[future]
+            evaluated.update(self._batch_result(future))
+
         artifacts: Set[Artifact] = set()
-        for root, _, files in os.walk(root_path):
-            current_path = Path(root)
-            for file in files:
-                if file.endswith((".csproj", ".fsproj", ".vbproj")):
-                    artifacts.update(
-                        self._scan_dotnet(current_path / file, calculate_size)
-                    )
+        for project_file, props in evaluated.items():
+            found = self._artifacts_from_properties(project_file, props)
+            if project_file in self._walked:
+                artifacts.update(found)
+            else:
+                self._held[project_file] = found
+        # Samples may have agreed on the layout of the rest of their group
+        for group in self._groups.values():
+            layout = group.layout
+            if layout is None or not group.members:
+                continue
+            for project_file in group.members:
+                self._stats.add("projects_resolved_by_layout")
+                found = self._artifacts_from_layout(project_file, layout)
+                if project_file in self._walked:
+                    artifacts.update(found)
+                else:
+                    self._held[project_file] = found
+            group.members = []
         return artifacts
 
-    def _scan_dotnet(
-        self, project_file: Path, calculate_size: bool = True
-    ) -> Set[Artifact]:
+    def finish_scan(self) -> Set[Artifact]:
+        # The outputs of the projects evaluated here have been walked already
+        # (see the class docstring); the walk drops what it found inside them
+        projects, self._pending = self._pending, []
+        artifacts = self._walked_artifacts(self._evaluate_pending(projects))
+        artifacts.update(self._finish_groups())
+
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._executor = None
+        self._keys = {}
+        self._layout_keys = LayoutKeys()
+        self._groups = {}
+        self._sample_groups = {}
+        self._visited = set()
+        self._walked = set()
+        self._held = {}
+        # The files may change before the next scan (the watch daemon scans
+        # the directories it is told about again and again)
+        self._static.clear()
+        if self._cache:
+            self._cache.forget_files()
+            self._cache.save()
+        return artifacts
+
+    def _walked_artifacts(self, evaluated: Dict[Path, Dict[str, str]]) -> Set[Artifact]:
+        """Return the artifacts of the evaluated projects the walk reached."""
+        artifacts: Set[Artifact] = set()
+        for project_file, props in evaluated.items():
+            # Samples record their layout even if they are not reported
+            found = self._artifacts_from_properties(project_file, props)
+            if project_file in self._walked:
+                artifacts.update(found)
+        return artifacts
+
+    def _finish_groups(self) -> Set[Artifact]:
+        """Apply shared layouts, evaluating members of groups without one."""
         artifacts: Set[Artifact] = set()
+        unresolved: List[Path] = []
+        for group in self._groups.values():
+            layout = group.layout
+            for project_file in group.members:
+                if layout is None:
+                    unresolved.append(project_file)
+                elif project_file in self._walked:
+                    self._stats.add("projects_resolved_by_layout")
+                    artifacts.update(self._artifacts_from_layout(project_file, layout))
 
-        # Get both BaseOutputPath and BaseIntermediateOutputPath in a single call
-        result = subprocess.run(
-            [
-                "dotnet",
-                "msbuild",
-                str(project_file),
-                "-getProperty:BaseOutputPath,BaseIntermediateOutputPath",
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
+        # The samples disagreed or failed, so evaluate every member after all
+        projects: List[Path] = []
+        cached: Dict[Path, Dict[str, str]] = {}
+        for project_file in unresolved:
+            props = None
+            sdk_version = self._sdk_version(project_file)
+            if sdk_version is not None:
+                props = self._cached_properties(project_file, sdk_version)
+            if props is None:
+                projects.append(project_file)
+            else:
+                self._stats.add("projects_resolved_without_msbuild")
+                cached[project_file] = props
+        artifacts.update(self._walked_artifacts(cached))
+        artifacts.update(self._walked_artifacts(self._evaluate_pending(projects)))
+        return artifacts
+
+    def _evaluate_pending(self, projects: List[Path]) -> Dict[Path, Dict[str, str]]:
+        """Evaluate projects and wait for every batch submitted so far."""
+        # Spread the projects over the idle workers
+        for batch in _split(projects, self._jobs):
+            self._submit(batch)
+
+        evaluated: Dict[Path, Dict[str, str]] = {}
+        for future in self._batches:
+            evaluated.update(self._batch_result(future))
+        self._batches = {}
+        return evaluated
+
+    def _batch_result(
+        self, future: "Future[Dict[Path, Dict[str, str]]]"
+    ) -> Dict[Path, Dict[str, str]]:
+        """Wait for a batch and cache what it evaluated."""
+        evaluated = future.result()
+        for project_file, props in evaluated.items():
+            key = self._keys.get(project_file)
+            if self._cache and key:
+                self._cache.put(key, props)
+        return evaluated
+
+    def _cached_properties(
+        self, project_file: Path, sdk_version: str
+    ) -> Optional[Dict[str, str]]:
+        """Return the msbuild result cached by an earlier run, if still valid."""
+        if self._cache is None:
+            return None
+        key = self._cache.key(project_file, sdk_version)
+        if key is None:
+            return None
+        props = self._cache.get(key)
+        if props is None:
+            self._keys[project_file] = key
+        return props
+
+    def _submit(self, projects: List[Path]) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._jobs, thread_name_prefix="src-clean-msbuild"
+            )
+        # dotnet runs the SDK pinned by the global.json of its working
+        # directory, so a batch only holds projects that pin the same one
+        by_global_json: Dict[Optional[Path], List[Path]] = {}
+        for project_file in projects:
+            global_json = find_global_json(project_file.parent)
+            by_global_json.setdefault(global_json, []).append(project_file)
+        for batch in by_global_json.values():
+            future = self._executor.submit(self._evaluate_projects, batch)
+            self._batches[future] = batch
+
+    def _evaluate_projects(self, projects: List[Path]) -> Dict[Path, Dict[str, str]]:
+        """Evaluate projects, skipping those that cannot be evaluated."""
+        evaluated = self._evaluate_batch(projects) if len(projects) > 1 else {}
+        for project_file in projects:
+            if project_file in evaluated:
+                continue
+            try:
+                evaluated[project_file] = self._evaluate_project(project_file)
+            except (subprocess.SubprocessError, OSError, ValueError) as e:
+                _warn(project_file, e)
+        return evaluated
+
+    def _evaluate_batch(self, projects: List[Path]) -> Dict[Path, Dict[str, str]]:
+        """Evaluate the output paths of many projects in one dotnet process.
+
+        Returns the properties of every project that could be evaluated. A
+        project missing from the result must be evaluated on its own.
+        """
+        # Only needed when the SDK runs, and slow to import (it pulls in urllib)
+        from xml.sax.saxutils import (  # pylint: disable=import-outside-toplevel
+            quoteattr,
         )
 
+        with tempfile.TemporaryDirectory(prefix="src-clean-") as temp_dir:
+            targets_file = Path(temp_dir) / "report-paths.targets"
+            targets_file.write_text(_REPORT_TARGETS, encoding="utf-8")
+            items = "\n".join(
+                f"    <_SrcCleanProject Include={quoteattr(_msbuild_escape(str(p)))} />"
+                for p in projects
+            )
+            properties = quoteattr(
+                "CustomAfterMicrosoftCommonTargets="
+                + _msbuild_escape(str(targets_file))
+            )
+            batch_file = Path(temp_dir) / "batch.proj"
+            batch_file.write_text(
+                _BATCH_PROJECT.format(items=items, properties=properties),
+                encoding="utf-8",
+            )
+
+            try:
+                with self._stats.phase("dotnet_msbuild"):
+                    result = subprocess.run(
+                        [
+                            "dotnet",
+                            "msbuild",
+                            str(batch_file),
+                            "-nologo",
+                            "-t:SrcCleanEvaluate",
+                            "-getItem:SrcCleanResult",
+                        ],
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                        timeout=self._timeout * len(projects),
+                        cwd=projects[0].parent,
+                    )
+                data = json.loads(result.stdout)
+            except (subprocess.SubprocessError, OSError, ValueError):
+                return {}
+
+        evaluated: Dict[Path, Dict[str, str]] = {}
+        for item in data.get("Items", {}).get("SrcCleanResult", []):
+            identity = item.get("Identity")
+            if identity:
+                evaluated[Path(identity)] = {
+                    key: item.get(key, "") for key in OUTPUT_PROPERTIES
+                }
+        return evaluated
+
+    def _evaluate_project(self, project_file: Path) -> Dict[str, str]:
+        # Get both BaseOutputPath and BaseIntermediateOutputPath in a single call
+        with self._stats.phase("dotnet_msbuild"):
+            result = subprocess.run(
+                [
+                    "dotnet",
+                    "msbuild",
+                    str(project_file),
+                    "-getProperty:" + ",".join(OUTPUT_PROPERTIES),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=self._timeout,
+                cwd=project_file.parent,
+            )
+
         # When multiple properties are requested, msbuild returns a JSON object
         data = json.loads(result.stdout)
-        props = data.get("Properties", {})
+        props: Dict[str, str] = data.get("Properties", {})
+        return props
+
+    def _output_paths(self, project_file: Path, props: Dict[str, str]) -> Set[Path]:
+        """Return the outermost output directories set by the properties."""
+        keys = ["BaseOutputPath", "BaseIntermediateOutputPath", "OutputPath"]
+        if props.get("UseArtifactsOutput", "").lower() == "true":
+            keys.append("ArtifactsPath")
 
-        for key in ["BaseOutputPath", "BaseIntermediateOutputPath"]:
+        project_dir = project_file.parent.resolve()
+        paths: Set[Path] = set()
+        for key in keys:
             val = props.get(key)
             if val:
-                path = (project_file.parent / val).resolve()
-                if path.exists() and path.is_dir():
-                    size = get_dir_size(path) if calculate_size else 0
-                    artifacts.add(Artifact(path=path, type=".NET", size_bytes=size))
+                path = (project_file.parent / _normalize_msbuild_path(val)).resolve()
+                # Never report the project directory or one of its parents
+                if path == project_dir or path in project_dir.parents:
+                    continue
+                paths.add(path)
 
-        return artifacts
+        # OutputPath usually lives inside BaseOutputPath; keep the outermost
+        return {
+            path for path in paths if not any(other in path.parents for other in paths)
+        }
+
+    def _artifacts_from_properties(
+        self, project_file: Path, props: Dict[str, str]
+    ) -> Set[Artifact]:
+        paths = self._output_paths(project_file, props)
+        group = self._sample_groups.get(project_file)
+        if group is not None:
+            group.record(
+                project_file, OutputLayout.of(project_file.parent.resolve(), paths)
+            )
+        return {
+            Artifact(path=path, type=".NET", project=project_file)
+            for path in paths
+            if path.is_dir()
+        }
+
+    def _artifacts_from_layout(
+        self, project_file: Path, layout: OutputLayout
+    ) -> Set[Artifact]:
+        return {
+            Artifact(path=path, type=".NET", project=project_file)
+            for path in layout.paths(project_file.parent.resolve())
+            if path.is_dir()
+        }
@@ -0,0 +1,123 @@
+"""
+Persistent cache of dotnet msbuild evaluation results.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from .cache_dir import user_cache_dir
+
+# Files that change how MSBuild evaluates the projects below them.
+EVALUATION_INPUTS = [
+    "Directory.Build.props",
+    "Directory.Build.targets",
+    "global.json",
+    "NuGet.config",
+    "nuget.config",
+    "NuGet.Config",
+]
+
+DEFAULT_MAX_ENTRIES = 4096
+_FORMAT_VERSION = 1
+
+
+class DotnetPropertyCache:
+    """LRU cache of msbuild-evaluated project properties, persisted as JSON.
+
+    Entries are keyed on the SDK version and on the content hashes of the
+    project file and of every EVALUATION_INPUTS file in its directory or
+    above, so editing any of them invalidates the entry automatically.
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.path = path or user_cache_dir() / "dotnet-properties.json"
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._file_hashes: Dict[Path, Optional[str]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == _FORMAT_VERSION:
+            self._entries.update(data.get("entries", {}))
+
+    def save(self) -> None:
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": _FORMAT_VERSION, "entries": self._entries}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_file = self.path.with_name(self.path.name + ".tmp")
+                temp_file.write_text(json.dumps(data), encoding="utf-8")
+                os.replace(temp_file, self.path)
+            except OSError:
+                return  # The projects are simply evaluated again next time
+            self._dirty = False
+
+    def _hash_file(self, path: Path) -> Optional[str]:
+        """Return the content hash of path, or None if it does not exist."""
+        with self._lock:
+            if path in self._file_hashes:
+                return self._file_hashes[path]
+        try:
+            digest: Optional[str] = hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            digest = None
+        with self._lock:
+            self._file_hashes[path] = digest
+        return digest
+
+    def forget_files(self) -> None:
+        """Forget the file hashes, so that the next keys hash the files again."""
+        with self._lock:
+            self._file_hashes.clear()
+
+    def key(self, project_file: Path, sdk_version: str) -> Optional[str]:
+        """Return the cache key of a project, or None if it cannot be read."""
+        project_hash = self._hash_file(project_file)
+        if project_hash is None:
+            return None
+        key = hashlib.sha256()
+        key.update(f"{sdk_version}\0{project_file}\0{project_hash}\0".encode())
+        for directory in [project_file.parent, *project_file.parent.parents]:
+            for name in EVALUATION_INPUTS:
+                digest = self._hash_file(directory / name)
+                if digest is not None:
+                    key.update(f"{directory / name}\0{digest}\0".encode())
+        return key.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Return the cached properties for key, marking it recently used.
+
+        A hit alone does not make the cache dirty, so runs served entirely
+        from the cache do not rewrite it; the new order is saved with the
+        next change.
+        """
+        with self._lock:
+            props = self._entries.get(key)
+            if props is not None:
+                self._entries.move_to_end(key)
+            return props
+
+    def put(self, key: str, props: Dict[str, str]) -> None:
+        """Store properties for key, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = props
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
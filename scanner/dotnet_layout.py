@@ -0,0 +1,171 @@
+"""
+Solution files and output layouts shared by many .NET projects.
+"""
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path, PurePath
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from .dotnet_cache import EVALUATION_INPUTS
+
+SOLUTION_EXTENSIONS = (".sln", ".slnx")
+# Projects evaluated per layout before the layout is trusted for the others.
+LAYOUT_SAMPLES = 2
+
+# Project("{type guid}") = "name", "relative\path.csproj", "{project guid}"
+_SLN_PROJECT = re.compile(r'^\s*Project\("[^"]*"\)\s*=\s*"[^"]*"\s*,\s*"([^"]+)"', re.M)
+# Anything that may move build outputs: the output properties themselves or
+# an import that could set them.
+_LAYOUT_SETTINGS = re.compile(
+    r"<Import\b|\b(?:ArtifactsPath|UseArtifactsOutput|BaseOutputPath|"
+    r"BaseIntermediateOutputPath|OutputPath|OutDir|IntermediateOutputPath)\b"
+)
+_SDK_REFERENCE = re.compile(r"""\bSdk(?:\s+Name)?\s*=\s*["']([^"']*)""")
+
+LayoutKey = Tuple[str, ...]
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        return path.read_text(encoding="utf-8-sig", errors="replace")
+    except OSError:
+        return None
+
+
+def solution_projects(solution: Path) -> List[Path]:
+    """Return the projects listed in a .sln or .slnx file.
+
+    Paths are joined to the solution's directory and normalized but not
+    resolved, so they match the paths of a walk. Solution folders and
+    unreadable solutions yield nothing.
+    """
+    relative: List[str] = []
+    if solution.suffix == ".slnx":
+        try:
+            root = ET.parse(solution).getroot()
+        except (OSError, ET.ParseError):
+            return []
+        relative = [
+            element.get("Path", "")
+            for element in root.iter()
+            if element.tag.rsplit("}", 1)[-1] == "Project"
+        ]
+    else:
+        text = _read_text(solution)
+        if text is None:
+            return []
+        relative = _SLN_PROJECT.findall(text)
+
+    projects: List[Path] = []
+    for value in relative:
+        if not value:
+            continue
+        path = os.path.normpath(solution.parent / value.replace("\\", "/"))
+        projects.append(Path(path))
+    return projects
+
+
+class OutputLayout(NamedTuple):
+    """Output directories of a project, independent of where it lives.
+
+    Directories inside the project directory are kept relative to it, the
+    others (a shared ArtifactsPath or output root) as absolute paths.
+    """
+
+    relative: FrozenSet[PurePath]
+    absolute: FrozenSet[Path]
+
+    @classmethod
+    def of(cls, project_dir: Path, paths: Set[Path]) -> "OutputLayout":
+        """Return the layout of the resolved output paths of a project."""
+        relative: Set[PurePath] = set()
+        absolute: Set[Path] = set()
+        for path in paths:
+            if project_dir in path.parents:
+                relative.add(PurePath(path.relative_to(project_dir)))
+            else:
+                absolute.add(path)
+        return cls(frozenset(relative), frozenset(absolute))
+
+    def paths(self, project_dir: Path) -> Set[Path]:
+        """Return the output paths of a project in project_dir."""
+        return {project_dir / path for path in self.relative} | set(self.absolute)
+
+
+class LayoutGroup:
+    """Projects expected to share one output layout.
+
+    The first LAYOUT_SAMPLES projects are evaluated. Once they all agree,
+    the layout applies to every other member without evaluating it.
+    """
+
+    def __init__(self) -> None:
+        self.samples: List[Path] = []
+        self.members: List[Path] = []
+        self._layouts: Dict[Path, OutputLayout] = {}
+
+    def wants_sample(self) -> bool:
+        """Return True if another project should be evaluated."""
+        return len(self.samples) < LAYOUT_SAMPLES
+
+    def record(self, project_file: Path, layout: OutputLayout) -> None:
+        """Record the evaluated layout of a sample."""
+        self._layouts[project_file] = layout
+
+    def roots(self) -> Set[Path]:
+        """Return the outputs outside their project the samples reported."""
+        return {path for layout in self._layouts.values() for path in layout.absolute}
+
+    @property
+    def layout(self) -> Optional[OutputLayout]:
+        """The shared layout, or None until every sample agreed on it."""
+        layouts = set(self._layouts.values())
+        if len(self._layouts) < LAYOUT_SAMPLES or len(layouts) != 1:
+            return None
+        return layouts.pop()
+
+
+class LayoutKeys:
+    """Groups projects by the files that decide where their outputs go.
+
+    Projects share a key when they reference the same SDKs, do not set or
+    import anything that could move their outputs themselves, and sit below
+    the same EVALUATION_INPUTS files, at least one of which does (such as a
+    Directory.Build.props setting ArtifactsPath). Projects with the default
+    per-project bin and obj, or with settings of their own, get no key.
+    """
+
+    def __init__(self) -> None:
+        self._inputs: Dict[Path, Tuple[Tuple[str, ...], bool]] = {}
+
+    def _directory_inputs(self, directory: Path) -> Tuple[Tuple[str, ...], bool]:
+        """Return the inputs applying to directory and whether any moves outputs."""
+        if directory in self._inputs:
+            return self._inputs[directory]
+        if directory.parent == directory:
+            inputs: Tuple[str, ...] = ()
+            moves_outputs = False
+        else:
+            inputs, moves_outputs = self._directory_inputs(directory.parent)
+        for name in EVALUATION_INPUTS:
+            path = directory / name
+            if not path.is_file():
+                continue
+            inputs = (*inputs, str(path))
+            if name.startswith("Directory.Build."):
+                text = _read_text(path) or ""
+                moves_outputs = moves_outputs or bool(_LAYOUT_SETTINGS.search(text))
+        self._inputs[directory] = (inputs, moves_outputs)
+        return inputs, moves_outputs
+
+    def key(self, project_file: Path) -> Optional[LayoutKey]:
+        """Return the layout key of a project, or None if it has its own."""
+        text = _read_text(project_file)
+        if text is None or _LAYOUT_SETTINGS.search(text):
+            return None
+        inputs, moves_outputs = self._directory_inputs(project_file.parent)
+        if not moves_outputs:
+            return None
+        return (*sorted(set(_SDK_REFERENCE.findall(text))), "\0", *inputs)
@@ -0,0 +1,142 @@
+"""
+Lazy, persistently cached probe of the installed dotnet SDK.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .stats import RunStats
+
+_FORMAT_VERSION = 2
+
+
+class SdkInfo(NamedTuple):
+    """The dotnet SDK that evaluates projects."""
+
+    # Resolved path of the dotnet binary; empty if it was not found on PATH
+    path: str
+    version: str
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def find_global_json(directory: Path) -> Optional[Path]:
+    """Return the global.json that selects the SDK in directory, if any."""
+    for candidate in [directory, *directory.parents]:
+        if (candidate / "global.json").is_file():
+            return candidate / "global.json"
+    return None
+
+
+class SdkProbe:
+    """Finds out once, on first use, whether and which dotnet SDK is installed.
+
+    Running `dotnet --version` costs about a second of SDK start-up, so the
+    probe only runs when a project actually needs the SDK. With a cache
+    file, the result is reused across runs for as long as the resolved
+    dotnet binary, its mtime, the mtime of its sdk directory (which changes
+    when an SDK is installed or removed) and the global.json that applies
+    stay the same. The SDK is probed once per global.json, from the
+    directory of the project, since dotnet picks the SDK that the
+    global.json of its working directory pins. Probes run are timed as
+    "dotnet_msbuild" phases of stats.
+    """
+
+    def __init__(
+        self, cache_file: Optional[Path] = None, stats: Optional[RunStats] = None
+    ) -> None:
+        self.cache_file = cache_file
+        self._stats = RunStats(enabled=False) if stats is None else stats
+        self._lock = threading.Lock()
+        self._sdks: Dict[Optional[Path], Optional[SdkInfo]] = {}
+
+    def get(self, directory: Path) -> Optional[SdkInfo]:
+        """Return the SDK used in directory, or None if dotnet is not available."""
+        global_json = find_global_json(directory)
+        with self._lock:
+            if global_json not in self._sdks:
+                self._sdks[global_json] = self._probe(global_json, directory)
+            return self._sdks[global_json]
+
+    def _fingerprint(
+        self, binary: Path, global_json: Optional[Path]
+    ) -> Optional[List[Optional[int]]]:
+        mtime = _mtime_ns(binary)
+        if mtime is None:
+            return None
+        return [
+            mtime,
+            _mtime_ns(binary.parent / "sdk"),
+            None if global_json is None else _mtime_ns(global_json),
+        ]
+
+    def _probe(self, global_json: Optional[Path], directory: Path) -> Optional[SdkInfo]:
+        found = shutil.which("dotnet")
+        if found is None or self.cache_file is None:
+            # Without a binary to fingerprint, ask whatever "dotnet" runs
+            return self._run_probe(found or "", directory)
+        binary = Path(found).resolve()
+        fingerprint = self._fingerprint(binary, global_json)
+        # Trees pinning different SDKs get entries of their own
+        name = f"{binary}\0{'' if global_json is None else global_json}"
+        entries = self._load()
+        entry = entries.get(name)
+        if entry is not None and entry.get("fingerprint") == fingerprint:
+            self._stats.add("sdk_probes_cached")
+            version = entry.get("version")
+            return None if version is None else SdkInfo(str(binary), str(version))
+
+        sdk = self._run_probe(str(binary), directory)
+        if fingerprint is not None:
+            entries[name] = {
+                "fingerprint": fingerprint,
+                "version": None if sdk is None else sdk.version,
+            }
+            self._save(entries)
+        return sdk
+
+    def _run_probe(self, binary: str, directory: Path) -> Optional[SdkInfo]:
+        try:
+            with self._stats.phase("dotnet_msbuild"):
+                result = subprocess.run(
+                    ["dotnet", "--version"],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                    cwd=directory,
+                )
+        except (subprocess.CalledProcessError, OSError):
+            return None
+        return SdkInfo(binary, str(result.stdout or "").strip())
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        assert self.cache_file is not None
+        try:
+            data = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != _FORMAT_VERSION:
+            return {}
+        entries: Dict[str, Dict[str, object]] = data.get("entries", {})
+        return entries
+
+    def _save(self, entries: Dict[str, Dict[str, object]]) -> None:
+        assert self.cache_file is not None
+        data = {"version": _FORMAT_VERSION, "entries": entries}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            temp_file.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(temp_file, self.cache_file)
+        except OSError:
+            pass  # The probe simply runs again next time
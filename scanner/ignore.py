@@ -0,0 +1,179 @@
+"""
+Ignore files and exclude patterns that prune the traversal.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# Name of the per-directory ignore file, in gitignore syntax.
+IGNORE_FILE = ".srccleanignore"
+
+_TRAILING_SPACES = re.compile(r"(?<!\\) +$")
+
+
+def _translate_class(pattern: str, start: int) -> Tuple[str, int]:
+    """Translate the character class at start; return it and where it ends."""
+    end = pattern.find("]", start + 2)
+    if end == -1:
+        return re.escape("["), start
+    body = pattern[start + 1 : end].replace("\\", "\\\\")
+    if body.startswith("!"):
+        body = "^" + body[1:]
+    return f"(?!/)[{body}]", end
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob (without "!" and slashes at the ends)."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+            if pattern.startswith("**/", i):
+                # Zero or more directories
+                regex += "(?:.*/)?"
+                i += 3
+                continue
+            if i + 2 == len(pattern):
+                regex += ".*"
+                i += 2
+                continue
+        if char == "*":
+            regex += "[^/]*"
+            while pattern.startswith("*", i + 1):
+                i += 1
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            translated, i = _translate_class(pattern, i)
+            regex += translated
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def compile_pattern(line: str) -> Optional[Tuple[str, bool]]:
+    """Compile one line of gitignore syntax to (regex, negated).
+
+    The regex matches paths relative to the directory of the ignore file,
+    with "/" as separator. Returns None for blank lines and comments.
+    """
+    line = _TRAILING_SPACES.sub("", line.rstrip("\r\n"))
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    # Only directories are matched, so a trailing slash changes nothing
+    line = line.rstrip("/")
+    if not line:
+        return None
+    # A slash at the start or in the middle anchors the pattern to the
+    # directory of the ignore file; otherwise it matches at any depth.
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = _translate(line)
+    return (regex if anchored else f"(?:.*/)?{regex}"), negated
+
+
+class IgnoreRules:
+    """The compiled patterns of one ignore file (or of --exclude options).
+
+    Patterns are matched against paths relative to base. As in gitignore, the
+    last matching pattern decides, and "!" patterns re-include what earlier
+    ones excluded. Without "!" patterns, all of them are combined into a
+    single regex.
+    """
+
+    def __init__(self, base: Path, patterns: Iterable[str]) -> None:
+        self.base = base
+        self._prefix = os.path.join(str(base), "")
+        self._rules: List[Tuple["re.Pattern[str]", bool]] = []
+        for pattern in patterns:
+            compiled = compile_pattern(pattern)
+            if compiled is not None:
+                self._rules.append((re.compile(compiled[0]), compiled[1]))
+        self._combined: Optional["re.Pattern[str]"] = None
+        if not any(negated for _, negated in self._rules):
+            self._combined = re.compile(
+                "|".join(f"(?:{rule.pattern})" for rule, _ in self._rules)
+            )
+
+    @classmethod
+    def from_file(cls, path: Path) -> "IgnoreRules":
+        """Read an ignore file; its patterns apply below its directory."""
+        with open(path, encoding="utf-8", errors="replace") as file:
+            return cls(path.parent, file)
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, path: Path) -> Optional[bool]:
+        """Return whether the directory path is ignored, or None if no match.
+
+        False means that a "!" pattern re-includes the directory.
+        """
+        text = str(path)
+        if not text.startswith(self._prefix):
+            return None
+        relative = text[len(self._prefix) :]
+        if os.sep != "/":
+            relative = relative.replace(os.sep, "/")
+        if self._combined is not None:
+            return True if self._combined.fullmatch(relative) else None
+        for rule, negated in reversed(self._rules):
+            if rule.fullmatch(relative):
+                return not negated
+        return None
+
+
+class IgnoreMatcher:
+    """The ignore rules that apply in one directory of the walk.
+
+    Rules of deeper ignore files take precedence over those of their
+    ancestors. Matchers are immutable, so subdirectories can share them.
+    """
+
+    def __init__(self, levels: Tuple[IgnoreRules, ...] = ()) -> None:
+        self._levels = levels
+
+    @classmethod
+    def for_directory(
+        cls, root: Path, directory: Path, exclude: Iterable[str] = ()
+    ) -> "IgnoreMatcher":
+        """Return the matcher a walk of root would use inside directory.
+
+        That is the exclude patterns of root and the ignore files of root and
+        of every directory down to (but not including) directory.
+        """
+        matcher = cls().child(IgnoreRules(root, exclude))
+        ancestors = [directory, *directory.parents]
+        for ancestor in reversed(ancestors[1 : ancestors.index(root) + 1]):
+            try:
+                matcher = matcher.child(IgnoreRules.from_file(ancestor / IGNORE_FILE))
+            except OSError:
+                continue
+        return matcher
+
+    def __bool__(self) -> bool:
+        return bool(self._levels)
+
+    def child(self, rules: IgnoreRules) -> "IgnoreMatcher":
+        """Return a matcher that also applies rules, ahead of these ones."""
+        if not rules:
+            return self
+        return IgnoreMatcher(self._levels + (rules,))
+
+    def ignores(self, directory: Path) -> bool:
+        """Return whether directory is excluded from the walk."""
+        for rules in reversed(self._levels):
+            result = rules.match(directory)
+            if result is not None:
+                return result
+        return False
@@ -0,0 +1,120 @@
+"""
+Persistent scan index for incremental re-scans.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from .cache_dir import user_cache_dir
+
+# A directory modified this recently may change again within the same
+# timestamp tick, so its record could not tell the two states apart.
+SETTLE_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    listing TEXT NOT NULL
+);
+-- Artifact sizes were recorded by earlier versions
+DROP TABLE IF EXISTS sizes;
+"""
+
+
+class Listing(NamedTuple):
+    """Entries of a directory as recorded by the index."""
+
+    dirnames: List[str]
+    filenames: List[str]
+    symlinks: List[str]
+
+
+class ScanIndex:
+    """SQLite index of directory listings from earlier runs.
+
+    Records are keyed on the directory path and validated against its device,
+    inode and mtime, so an unchanged directory can be listed from the index
+    instead of being read again. A directory's mtime only reflects changes
+    to its own entries, not to files rewritten in place or to anything
+    deeper, so artifact sizes are not recorded: they are measured every run.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or user_cache_dir() / "index.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Imported here so that runs without an index do not pay for it
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        self._lock = threading.Lock()
+        # Sizing threads share the connection; access is serialized by _lock.
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Write pending records to disk and close the index."""
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def clear(self) -> None:
+        """Forget every record, forcing a full rescan."""
+        with self._lock:
+            self._db.execute("DELETE FROM directories")
+
+    def _is_settled(self, st: os.stat_result) -> bool:
+        return time.time_ns() - st.st_mtime_ns > SETTLE_SECONDS * 1e9
+
+    def listing(self, directory: Path, st: os.stat_result) -> Optional[Listing]:
+        """Return the recorded listing of directory if it is still current."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT listing FROM directories "
+                "WHERE path = ? AND dev = ? AND ino = ? AND mtime_ns = ?",
+                (str(directory), st.st_dev, st.st_ino, st.st_mtime_ns),
+            ).fetchone()
+        if row is None:
+            return None
+        return Listing(*json.loads(row[0]))
+
+    def store_listing(
+        self, directory: Path, st: os.stat_result, listing: Listing
+    ) -> None:
+        """Record the listing of directory."""
+        if not self._is_settled(st):
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(directory),
+                    st.st_dev,
+                    st.st_ino,
+                    st.st_mtime_ns,
+                    json.dumps(listing),
+                ),
+            )
+
+    def verify(self) -> List[Path]:
+        """Return the recorded paths that no longer match the filesystem."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, dev, ino, mtime_ns FROM directories"
+            ).fetchall()
+
+        stale: List[Path] = []
+        for path, dev, ino, mtime_ns in rows:
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                stale.append(Path(path))
+                continue
+            if (st.st_dev, st.st_ino, st.st_mtime_ns) != (dev, ino, mtime_ns):
+                stale.append(Path(path))
+        return stale
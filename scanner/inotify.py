@@ -0,0 +1,143 @@
+"""
+Minimal binding of Linux inotify through ctypes.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+from types import TracebackType
+from typing import Any, List, NamedTuple, Optional, Type
+
+# Event masks from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+# struct inotify_event without its variable-length name
+_EVENT_HEADER = struct.Struct("iIII")
+# Room for many events; a single one needs at most the header + NAME_MAX + 1.
+_READ_SIZE = 64 * 1024
+
+
+class Event(NamedTuple):
+    """One inotify event; name is empty for events on the watched directory."""
+
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+def _load_libc() -> Optional[Any]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_init1.restype = ctypes.c_int
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_add_watch.restype = ctypes.c_int
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    libc.inotify_rm_watch.restype = ctypes.c_int
+    return libc
+
+
+_LIBC = _load_libc()
+
+
+def is_supported() -> bool:
+    """Return whether inotify is available on this system."""
+    return _LIBC is not None
+
+
+def _last_error(path: Optional[str] = None) -> OSError:
+    code = ctypes.get_errno()
+    return OSError(code, os.strerror(code), path)
+
+
+class Inotify:
+    """An inotify instance: directory watches and the events they produce.
+
+    Raises OSError (ENOSYS) where inotify is not available. Watching more
+    directories than fs.inotify.max_user_watches allows raises OSError with
+    ENOSPC from `add_watch`.
+    """
+
+    def __init__(self) -> None:
+        if _LIBC is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this system")
+        self._libc: Any = _LIBC
+        self._fd: int = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise _last_error()
+
+    def fileno(self) -> int:
+        """Return the file descriptor to wait on for events."""
+        return self._fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """Watch path for the events in mask; return the watch descriptor."""
+        wd: int = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise _last_error(path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        """Stop watching; a watch the kernel already dropped is ignored."""
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read(self, timeout: Optional[float] = None) -> List[Event]:
+        """Wait up to timeout seconds for events and return them."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+        events: List[Event] = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append(Event(wd, mask, cookie, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        """Close the instance, dropping every watch."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "Inotify":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,25 @@
+"""
+Lazily imported package exports.
+"""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict
+
+
+def lazy_exports(package: str, modules: Dict[str, str]) -> Callable[[str], Any]:
+    """Return a module `__getattr__` that imports exports on first use.
+
+    modules maps each exported name to the (relative) module defining it.
+    Once imported, an export is stored in the package like a normal import.
+    """
+
+    def __getattr__(name: str) -> Any:
+        module = modules.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
@@ -0,0 +1,588 @@
+"""
+Static evaluator for the MSBuild properties that locate .NET build outputs.
+
+This models just enough of MSBuild evaluation (property groups, conditions,
+Directory.Build.props/targets and a few property functions) to resolve the
+output paths of typical SDK-style projects without starting the .NET SDK.
+Anything it cannot model faithfully makes the project unresolvable, so the
+caller can fall back to `dotnet msbuild`.
+"""
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Properties reported for every project, in MSBuild casing.
+RESOLVED_PROPERTIES = [
+    "BaseOutputPath",
+    "BaseIntermediateOutputPath",
+    "OutputPath",
+    "ArtifactsPath",
+    "UseArtifactsOutput",
+]
+
+# Elements that never affect property evaluation.
+_IGNORED_ELEMENTS = {
+    "ItemGroup",
+    "ItemDefinitionGroup",
+    "Target",
+    "UsingTask",
+    "ProjectExtensions",
+    "Sdk",
+}
+
+_PROPERTY_NAME = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_\-]*)\s*$")
+_FUNCTION_CALL = re.compile(r"^\[MSBuild\]::(\w+)\((.*)\)$", re.IGNORECASE | re.DOTALL)
+_MAX_IMPORT_DEPTH = 16
+
+
+class Unresolvable(Exception):
+    """Raised when a project uses a construct the evaluator cannot model."""
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace used by legacy project files."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find_closing(text: str, start: int) -> int:
+    """Return the index of the parenthesis closing the one before start."""
+    depth = 1
+    quote = ""
+    for index in range(start, len(text)):
+        char = text[index]
+        if quote:
+            if char == quote:
+                quote = ""
+        elif char in "'`\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise Unresolvable(f"Unbalanced parentheses in {text!r}")
+
+
+def _split_arguments(text: str) -> List[str]:
+    """Split a property function argument list at top-level commas."""
+    args: List[str] = []
+    depth = 0
+    quote = ""
+    current = ""
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = ""
+        elif char in "'`\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            args.append(current.strip())
+            current = ""
+            continue
+        current += char
+    if current.strip():
+        args.append(current.strip())
+    return [
+        arg[1:-1] if arg[:1] in "'`\"" and arg[-1:] == arg[:1] else arg for arg in args
+    ]
+
+
+def _to_path(value: str) -> Path:
+    """Turn an MSBuild path value into a native path."""
+    return Path(value.replace("\\", os.sep) if os.sep != "\\" else value)
+
+
+def _find_file_above(start: Path, name: str) -> Optional[Path]:
+    """Find name in start or the closest of its ancestors."""
+    for directory in [start, *start.parents]:
+        candidate = directory / name
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _with_trailing_slash(value: str) -> str:
+    return value if not value or value.endswith(("/", "\\")) else value + os.sep
+
+
+class _Evaluation:
+    """State of a single project evaluation."""
+
+    def __init__(self, evaluator: "StaticEvaluator", project_file: Path) -> None:
+        self.evaluator = evaluator
+        self.project_file = project_file
+        # MSBuild property names are case-insensitive; None marks a property
+        # whose value could not be determined.
+        self.properties: Dict[str, Optional[str]] = {
+            name.lower(): value for name, value in os.environ.items()
+        }
+        self.this_file = project_file
+        self.depth = 0
+
+    def get(self, name: str) -> Optional[str]:
+        """Return a property value ("" when undefined, None when unknown)."""
+        lowered = name.lower()
+        if lowered.startswith("msbuildthisfile"):
+            return self._this_file_property(lowered)
+        if lowered.startswith("msbuild") and lowered not in self.properties:
+            # Reserved MSBuild properties (extension paths, versions, ...)
+            # have values we cannot know without the SDK.
+            return None
+        return self.properties.get(lowered, "")
+
+    def is_true(self, name: str) -> bool:
+        """Return whether a boolean property is set to true."""
+        value = self.get(name)
+        if value is None:
+            raise Unresolvable(f"Cannot determine {name}")
+        return value.lower() == "true"
+
+    def set(self, name: str, value: Optional[str]) -> None:
+        """Assign a property."""
+        self.properties[name.lower()] = value
+
+    def set_default(self, name: str, value: Optional[str]) -> None:
+        """Assign a property only if it is still empty."""
+        if self.get(name) == "":
+            self.set(name, value)
+
+    def _this_file_property(self, lowered: str) -> str:
+        this_file = self.this_file
+        values = {
+            "msbuildthisfile": this_file.name,
+            "msbuildthisfilename": this_file.stem,
+            "msbuildthisfileextension": this_file.suffix,
+            "msbuildthisfilefullpath": str(this_file),
+            "msbuildthisfiledirectory": _with_trailing_slash(str(this_file.parent)),
+        }
+        if lowered not in values:
+            raise Unresolvable(f"Unsupported property {lowered}")
+        return values[lowered]
+
+    # Expansion
+
+    def expand(self, text: str) -> Optional[str]:
+        """Expand property references in text; None if the result is unknown."""
+        if "@(" in text or "%(" in text:
+            return None
+        result = ""
+        index = 0
+        while True:
+            start = text.find("$(", index)
+            if start < 0:
+                return result + text[index:]
+            result += text[index:start]
+            end = _find_closing(text, start + 2)
+            value = self._expand_reference(text[start + 2 : end])
+            if value is None:
+                return None
+            result += value
+            index = end + 1
+
+    def _expand_reference(self, inner: str) -> Optional[str]:
+        match = _PROPERTY_NAME.match(inner)
+        if match:
+            return self.get(match.group(1))
+        call = _FUNCTION_CALL.match(inner.strip())
+        if call is None:
+            # Other property functions and string methods are not modelled
+            return None
+        function = self.evaluator.functions.get(call.group(1).lower())
+        if function is None:
+            return None
+        args: List[str] = []
+        for arg in _split_arguments(call.group(2)):
+            value = self.expand(arg)
+            if value is None:
+                return None
+            args.append(value)
+        return function(self, args)
+
+    def resolve_path(self, value: str) -> Path:
+        """Resolve a path relative to the file being evaluated."""
+        path = _to_path(value)
+        return path if path.is_absolute() else self.this_file.parent / path
+
+    # Conditions
+
+    def condition(self, element: ET.Element) -> bool:
+        """Evaluate the Condition attribute of an element."""
+        text = element.get("Condition")
+        if text is None or not text.strip():
+            return True
+        return _ConditionParser(self, text).parse()
+
+    # Elements
+
+    def evaluate_file(self, path: Path) -> None:
+        """Evaluate the properties and imports of a project or import file."""
+        if self.depth >= _MAX_IMPORT_DEPTH:
+            raise Unresolvable(f"Imports nested too deeply at {path}")
+        root = self.evaluator.parse(path)
+        previous = self.this_file
+        self.this_file = path
+        self.depth += 1
+        try:
+            self.evaluate_children(root)
+        finally:
+            self.this_file = previous
+            self.depth -= 1
+
+    def evaluate_children(self, parent: ET.Element) -> None:
+        """Evaluate the child elements of a Project or ImportGroup."""
+        for element in parent:
+            if not isinstance(element.tag, str):
+                continue  # comments and processing instructions
+            name = _local_name(element.tag)
+            if name in _IGNORED_ELEMENTS:
+                continue
+            if name == "PropertyGroup":
+                if self.condition(element):
+                    self._evaluate_property_group(element)
+            elif name == "Import":
+                self._evaluate_import(element)
+            elif name == "ImportGroup":
+                if self.condition(element):
+                    self.evaluate_children(element)
+            else:
+                raise Unresolvable(f"Unsupported element {name}")
+
+    def _evaluate_property_group(self, group: ET.Element) -> None:
+        for prop in group:
+            if not isinstance(prop.tag, str):
+                continue
+            if self.condition(prop):
+                value = self.expand((prop.text or "").strip())
+                self.set(_local_name(prop.tag), value)
+
+    def _evaluate_import(self, element: ET.Element) -> None:
+        if element.get("Sdk") is not None:
+            return  # SDK imports are modelled by the defaults in StaticEvaluator
+        if not self.condition(element):
+            return
+        project = self.expand(element.get("Project", ""))
+        if not project or any(c in project for c in "*?"):
+            raise Unresolvable(f"Unsupported import {element.get('Project')!r}")
+        path = self.resolve_path(project)
+        if not path.is_file():
+            raise Unresolvable(f"Missing import {path}")
+        self.evaluate_file(path)
+
+
+class _ConditionParser:
+    """Recursive-descent parser for MSBuild condition expressions."""
+
+    _TOKEN = re.compile(r"==|!=|<=|>=|<|>|!|\(|\)|,|[^\s=!<>(),']+")
+
+    def __init__(self, evaluation: _Evaluation, text: str) -> None:
+        self.evaluation = evaluation
+        self.text = text
+        self.tokens = self._tokenize(text)
+        self.position = 0
+
+    def _tokenize(self, text: str) -> List[str]:
+        tokens: List[str] = []
+        index = 0
+        while index < len(text):
+            if text[index].isspace():
+                index += 1
+                continue
+            if text.startswith("$(", index):
+                # Unquoted property reference; keep it as a single token
+                end = _find_closing(text, index + 2)
+                tokens.append(text[index : end + 1])
+                index = end + 1
+                continue
+            if text[index] == "'":
+                end = self._closing_quote(text, index + 1)
+                tokens.append(text[index : end + 1])
+                index = end + 1
+                continue
+            match = self._TOKEN.match(text, index)
+            if match is None:
+                raise Unresolvable(f"Cannot parse condition {text!r}")
+            tokens.append(match.group())
+            index = match.end()
+        return tokens
+
+    def _closing_quote(self, text: str, start: int) -> int:
+        """Find the quote ending a string, skipping over property references."""
+        index = start
+        while index < len(text):
+            if text.startswith("$(", index):
+                index = _find_closing(text, index + 2) + 1
+            elif text[index] == "'":
+                return index
+            else:
+                index += 1
+        raise Unresolvable(f"Unterminated string in condition {self.text!r}")
+
+    def _peek(self) -> str:
+        return self.tokens[self.position] if self.position < len(self.tokens) else ""
+
+    def _next(self) -> str:
+        token = self._peek()
+        if not token:
+            raise Unresolvable(f"Unexpected end of condition {self.text!r}")
+        self.position += 1
+        return token
+
+    def _expect(self, token: str) -> None:
+        if self._next() != token:
+            raise Unresolvable(f"Expected {token!r} in condition {self.text!r}")
+
+    def parse(self) -> bool:
+        """Evaluate the whole condition."""
+        result = self._or()
+        if self._peek():
+            raise Unresolvable(f"Trailing tokens in condition {self.text!r}")
+        return result
+
+    def _or(self) -> bool:
+        result = self._and()
+        while self._peek().lower() == "or":
+            self._next()
+            right = self._and()
+            result = result or right
+        return result
+
+    def _and(self) -> bool:
+        result = self._unary()
+        while self._peek().lower() == "and":
+            self._next()
+            right = self._unary()
+            result = result and right
+        return result
+
+    def _unary(self) -> bool:
+        if self._peek() == "!":
+            self._next()
+            return not self._unary()
+        return self._primary()
+
+    def _primary(self) -> bool:
+        token = self._next()
+        if token == "(":
+            result = self._or()
+            self._expect(")")
+            return result
+        if self._peek() == "(":
+            return self._function(token)
+
+        left = self._operand(token)
+        operator = self._peek()
+        if operator not in ("==", "!=", "<", ">", "<=", ">="):
+            return self._boolean(left)
+        self._next()
+        right = self._operand(self._next())
+        if operator == "==":
+            return left.lower() == right.lower()
+        if operator == "!=":
+            return left.lower() != right.lower()
+        try:
+            numbers = float(left), float(right)
+        except ValueError as e:
+            raise Unresolvable(f"Non-numeric comparison in {self.text!r}") from e
+        return {
+            "<": numbers[0] < numbers[1],
+            ">": numbers[0] > numbers[1],
+            "<=": numbers[0] <= numbers[1],
+            ">=": numbers[0] >= numbers[1],
+        }[operator]
+
+    def _operand(self, token: str) -> str:
+        if token.startswith("'") and token.endswith("'"):
+            token = token[1:-1]
+        value = self.evaluation.expand(token)
+        if value is None:
+            raise Unresolvable(f"Unknown value in condition {self.text!r}")
+        return value
+
+    def _boolean(self, value: str) -> bool:
+        lowered = value.lower()
+        if lowered in ("true", "on", "yes"):
+            return True
+        if lowered in ("false", "off", "no"):
+            return False
+        raise Unresolvable(f"Not a boolean in condition {self.text!r}")
+
+    def _function(self, name: str) -> bool:
+        self._expect("(")
+        argument = self._operand(self._next())
+        self._expect(")")
+        lowered = name.lower()
+        if lowered == "exists":
+            if not argument.strip():
+                return False
+            # Unlike imports, relative to the project even in imported files
+            path = _to_path(argument.strip())
+            if not path.is_absolute():
+                path = self.evaluation.project_file.parent / path
+            return path.exists()
+        if lowered == "hastrailingslash":
+            return argument.endswith(("/", "\\"))
+        raise Unresolvable(f"Unsupported condition function {name}")
+
+
+def _check_arguments(name: str, args: List[str], least: int, most: int = -1) -> None:
+    """Refuse calls with fewer than least or (unless -1) more than most args."""
+    if len(args) < least or most != -1 and len(args) > most:
+        raise Unresolvable(f"Wrong number of arguments to {name}: {len(args)}")
+
+
+def _get_path_of_file_above(evaluation: _Evaluation, args: List[str]) -> str:
+    _check_arguments("GetPathOfFileAbove", args, 1, 2)
+    start = args[1] if len(args) > 1 else str(evaluation.this_file.parent)
+    found = _find_file_above(evaluation.resolve_path(start), args[0])
+    return str(found) if found else ""
+
+
+def _get_directory_name_of_file_above(evaluation: _Evaluation, args: List[str]) -> str:
+    _check_arguments("GetDirectoryNameOfFileAbove", args, 2, 2)
+    found = _find_file_above(evaluation.resolve_path(args[0]), args[1])
+    return str(found.parent) if found else ""
+
+
+def _normalize_path(evaluation: _Evaluation, args: List[str]) -> str:
+    _check_arguments("NormalizePath", args, 1)
+    path = evaluation.project_file.parent
+    for part in args:
+        path = path / _to_path(part)
+    return os.path.normpath(path)
+
+
+def _normalize_directory(evaluation: _Evaluation, args: List[str]) -> str:
+    _check_arguments("NormalizeDirectory", args, 1)
+    return _with_trailing_slash(_normalize_path(evaluation, args))
+
+
+def _ensure_trailing_slash(_evaluation: _Evaluation, args: List[str]) -> str:
+    _check_arguments("EnsureTrailingSlash", args, 1, 1)
+    return _with_trailing_slash(args[0])
+
+
+class StaticEvaluator:
+    """Resolve the output paths of SDK-style projects without the .NET SDK.
+
+    Parsed project and import files are cached, so Directory.Build.props
+    files shared by many projects are only read once. Call `clear` when the
+    files may have changed since.
+    """
+
+    functions: Dict[str, Callable[[_Evaluation, List[str]], str]] = {
+        "getpathoffileabove": _get_path_of_file_above,
+        "getdirectorynameoffileabove": _get_directory_name_of_file_above,
+        "normalizepath": _normalize_path,
+        "normalizedirectory": _normalize_directory,
+        "ensuretrailingslash": _ensure_trailing_slash,
+    }
+
+    def __init__(self) -> None:
+        self._documents: Dict[Path, ET.Element] = {}
+
+    def parse(self, path: Path) -> ET.Element:
+        """Parse an MSBuild file, caching the result."""
+        if path not in self._documents:
+            try:
+                self._documents[path] = ET.parse(path).getroot()
+            except (ET.ParseError, OSError) as e:
+                raise Unresolvable(f"Cannot read {path}: {e}") from e
+        return self._documents[path]
+
+    def clear(self) -> None:
+        """Forget every parsed file, so that the next evaluation reads it again."""
+        self._documents.clear()
+
+    def evaluate(self, project_file: Path) -> Optional[Dict[str, str]]:
+        """Return the RESOLVED_PROPERTIES of a project, or None if unsure."""
+        try:
+            return self._evaluate(project_file)
+        except Unresolvable:
+            return None
+
+    def _evaluate(self, project_file: Path) -> Dict[str, str]:
+        root = self.parse(project_file)
+        self._check_sdk(root)
+
+        evaluation = _Evaluation(self, project_file)
+        evaluation.set("MSBuildProjectFullPath", str(project_file))
+        evaluation.set("MSBuildProjectDirectory", str(project_file.parent))
+        evaluation.set("MSBuildProjectFile", project_file.name)
+        evaluation.set("MSBuildProjectName", project_file.stem)
+        evaluation.set("MSBuildProjectExtension", project_file.suffix)
+        evaluation.set_default("Configuration", "Debug")
+        evaluation.set_default("Platform", "AnyCPU")
+
+        # Microsoft.Common.props: Directory.Build.props, then output defaults
+        props_file = self._import_above(evaluation, "Directory.Build.props")
+        base_dir = props_file.parent if props_file else project_file.parent
+        if evaluation.is_true("UseArtifactsOutput"):
+            evaluation.set_default("ArtifactsPath", str(base_dir / "artifacts"))
+            evaluation.set_default("ArtifactsProjectName", project_file.stem)
+            evaluation.set_default(
+                "BaseOutputPath", evaluation.expand("$(ArtifactsPath)/bin/")
+            )
+            evaluation.set_default(
+                "BaseIntermediateOutputPath",
+                evaluation.expand("$(ArtifactsPath)/obj/$(ArtifactsProjectName)/"),
+            )
+        evaluation.set_default("BaseOutputPath", "bin\\")
+        evaluation.set_default("BaseIntermediateOutputPath", "obj\\")
+
+        evaluation.evaluate_children(root)
+
+        # Microsoft.Common.targets: output path default, Directory.Build.targets
+        evaluation.set_default("PlatformName", evaluation.get("Platform"))
+        platform = evaluation.get("PlatformName")
+        if platform is None:
+            raise Unresolvable("Cannot determine PlatformName")
+        output_path = "$(BaseOutputPath)$(Configuration)\\"
+        if platform.lower() != "anycpu":
+            # Other platforms get a directory of their own
+            output_path = "$(BaseOutputPath)$(PlatformName)\\$(Configuration)\\"
+        evaluation.set_default("OutputPath", evaluation.expand(output_path))
+        self._import_above(evaluation, "Directory.Build.targets")
+
+        resolved: Dict[str, str] = {}
+        for name in RESOLVED_PROPERTIES:
+            value = evaluation.get(name)
+            if value is None:
+                raise Unresolvable(f"Cannot determine {name}")
+            resolved[name] = value
+        return resolved
+
+    def _check_sdk(self, root: ET.Element) -> None:
+        sdks = [root.get("Sdk", "")]
+        sdks.extend(
+            element.get("Name", "")
+            for element in root
+            if isinstance(element.tag, str) and _local_name(element.tag) == "Sdk"
+        )
+        names = [
+            name.split("/")[0].strip()
+            for value in sdks
+            for name in value.split(";")
+            if name.strip()
+        ]
+        if not names or not all(n.startswith("Microsoft.NET.Sdk") for n in names):
+            # Legacy and custom-SDK projects compute their outputs differently
+            raise Unresolvable("Not a Microsoft.NET.Sdk project")
+
+    def _import_above(self, evaluation: _Evaluation, name: str) -> Optional[Path]:
+        switch = "ImportDirectoryBuildProps"
+        if name.endswith(".targets"):
+            switch = "ImportDirectoryBuildTargets"
+        if (evaluation.get(switch) or "true").lower() == "false":
+            return None
+        found = _find_file_above(evaluation.project_file.parent, name)
+        if found is not None:
+            evaluation.evaluate_file(found)
+        return found
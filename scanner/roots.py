@@ -0,0 +1,153 @@
+"""
+Scanning several roots, in parallel across devices.
+"""
+
+import os
+import queue
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    cast,
+)
+
+from .stats import RunStats
+
+if TYPE_CHECKING:
+    import multiprocessing
+    import multiprocessing.process
+
+    from .base_scanner import Artifact
+
+# Scans a group of roots on one device, one after another, reporting to the
+# RunStats. Must be picklable (e.g. a functools.partial of a module-level
+# function) to run in a worker process.
+GroupScan = Callable[[Sequence[Path], RunStats], Iterator["Artifact"]]
+
+# Seconds between checks that the device workers are still alive.
+_POLL_SECONDS = 0.5
+
+
+def dedupe_roots(roots: Iterable[Path]) -> List[Path]:
+    """Resolve roots, dropping duplicates and roots inside another root."""
+    kept: List[Path] = []
+    # Sorted, a root always comes right before the roots inside it
+    for root in sorted({Path(root).resolve() for root in roots}):
+        if not kept or kept[-1] not in root.parents:
+            kept.append(root)
+    return kept
+
+
+def group_by_device(roots: Iterable[Path]) -> List[List[Path]]:
+    """Group roots by the device (st_dev) they are on, keeping their order."""
+    groups: Dict[int, List[Path]] = {}
+    for root in roots:
+        groups.setdefault(os.stat(root).st_dev, []).append(root)
+    return list(groups.values())
+
+
+class _DeviceDone(NamedTuple):
+    """Queued by a device worker once it has queued every artifact."""
+
+    stats: Dict[str, Any]
+
+
+def _scan_device(
+    roots: Sequence[Path],
+    scan: GroupScan,
+    stats_enabled: bool,
+    results: "multiprocessing.Queue[object]",
+) -> None:
+    """Worker process: scan roots and queue the artifacts as they arrive."""
+    stats = RunStats(enabled=stats_enabled)
+    try:
+        for artifact in scan(roots, stats):
+            results.put(artifact)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # The original may not survive pickling
+        results.put(RuntimeError(f"Scanning {', '.join(map(str, roots))}: {e}"))
+    finally:
+        results.put(_DeviceDone(stats.as_dict()))
+
+
+def stream_roots(
+    roots: Sequence[Path],
+    scan: GroupScan,
+    stats: Optional[RunStats] = None,
+    parallel: bool = True,
+) -> Iterator["Artifact"]:
+    """Yield the artifacts below every root, merged into one stream.
+
+    Roots are grouped by device. With parallel and more than one device,
+    every device is scanned by a worker process of its own, so independent
+    disks are walked at the same time while the work on each disk stays
+    bounded by what one scan does. Artifacts are yielded as the workers find
+    them, and their statistics are merged into stats (the time of each
+    worker as a "device_worker" phase). Otherwise all roots are scanned in
+    this process, one after another.
+    """
+    if stats is None:
+        stats = RunStats(enabled=False)
+    groups = group_by_device(roots)
+    if not parallel or len(groups) < 2:
+        yield from scan(roots, stats)
+        return
+
+    # Imported here: scans of a single device do not need it
+    import multiprocessing  # pylint: disable=import-outside-toplevel
+
+    # spawn: forking a process that runs threads is unsafe
+    context = multiprocessing.get_context("spawn")
+    results: "multiprocessing.Queue[object]" = context.Queue()
+    workers = [
+        context.Process(
+            target=_scan_device,
+            args=(group, scan, stats.enabled, results),
+            name=f"src-clean-device-{number}",
+            daemon=True,
+        )
+        for number, group in enumerate(groups)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        yield from _receive(workers, results, stats)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+
+def _receive(
+    workers: Sequence["multiprocessing.process.BaseProcess"],
+    results: "multiprocessing.Queue[object]",
+    stats: RunStats,
+) -> Iterator["Artifact"]:
+    """Yield what the workers queue until every one of them is done."""
+    remaining = len(workers)
+    while remaining:
+        try:
+            item = results.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            for worker in workers:
+                if worker.exitcode not in (None, 0):
+                    raise RuntimeError(  # pylint: disable=raise-missing-from
+                        f"{worker.name} exited with code {worker.exitcode}"
+                    )
+            continue
+        if isinstance(item, _DeviceDone):
+            remaining -= 1
+            stats.merge(item.stats, phase="device_worker")
+        elif isinstance(item, BaseException):
+            raise item
+        else:
+            yield cast("Artifact", item)
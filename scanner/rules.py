@@ -0,0 +1,138 @@
+"""
+Rule-driven scanner for build artifacts of further ecosystems.
+"""
+
+import fnmatch
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .base_scanner import Artifact, BaseScanner
+
+# Kept in a module of its own so the command line can offer the ecosystems
+# without loading the rules
+from .defaults import ECOSYSTEMS  # pylint: disable=unused-import
+
+
+class Rule(NamedTuple):
+    """Artifact directories that a marker file next to them identifies.
+
+    A directory is an artifact when it has one of the names in artifacts and
+    a sibling file matches one of markers (file names or glob patterns).
+    Without markers, the directory name identifies the artifact on its own.
+    """
+
+    ecosystem: str
+    type: str
+    markers: Tuple[str, ...]
+    artifacts: Tuple[str, ...]
+
+
+RULES: Tuple[Rule, ...] = (
+    Rule("rust", "Rust", ("Cargo.toml",), ("target",)),
+    Rule("maven", "Maven", ("pom.xml",), ("target",)),
+    Rule(
+        "gradle", "Gradle", ("build.gradle*", "settings.gradle*"), ("build", ".gradle")
+    ),
+    Rule(
+        "python",
+        "Python",
+        ("pyproject.toml", "setup.py", "setup.cfg", "tox.ini", "noxfile.py"),
+        (".venv", ".tox", ".nox", ".pytest_cache", ".mypy_cache"),
+    ),
+    # Python writes __pycache__ next to the modules it imports
+    Rule("python", "Python", ("*.py",), ("__pycache__",)),
+    Rule("cmake", "CMake", ("CMakeLists.txt",), ("build",)),
+)
+
+_GLOB_CHARS = frozenset("*?[")
+# Directories of installed packages (in virtualenvs and system-wide); what is
+# inside them was installed, not built, even if it looks like an artifact.
+_INSTALL_DIRS = frozenset({"site-packages", "dist-packages"})
+
+
+class _CompiledRule(NamedTuple):
+    type: str
+    names: Set[str]
+    # Matches any of the glob markers; None if the rule has none
+    pattern: Optional["re.Pattern[str]"]
+    # True if the rule has no markers at all
+    unconditional: bool
+
+
+class RuleScanner(BaseScanner):
+    """Scanner for the marker-based RULES of the selected ecosystems.
+
+    The rules are compiled into one table keyed on artifact directory name,
+    so each visited directory costs a set lookup per subdirectory; marker
+    files are only looked at when a subdirectory has an artifact's name.
+    Adding a rule therefore adds no work to directories it cannot match.
+    Nothing inside installed packages (site-packages or dist-packages) is
+    reported.
+    """
+
+    def __init__(
+        self,
+        ecosystems: Optional[Iterable[str]] = None,
+        rules: Tuple[Rule, ...] = RULES,
+    ) -> None:
+        known = {rule.ecosystem for rule in rules}
+        selected = known if ecosystems is None else set(ecosystems)
+        unknown = selected - known
+        if unknown:
+            raise ValueError(f"Unknown ecosystems: {', '.join(sorted(unknown))}")
+        self._table: Dict[str, List[_CompiledRule]] = {}
+        for rule in rules:
+            if rule.ecosystem not in selected:
+                continue
+            globs = [m for m in rule.markers if _GLOB_CHARS.intersection(m)]
+            compiled = _CompiledRule(
+                type=rule.type,
+                names={m for m in rule.markers if m not in globs},
+                pattern=(
+                    re.compile("|".join(fnmatch.translate(g) for g in globs))
+                    if globs
+                    else None
+                ),
+                unconditional=not rule.markers,
+            )
+            for name in rule.artifacts:
+                self._table.setdefault(name, []).append(compiled)
+
+    def visit_directory(
+        self,
+        directory: Path,
+        dirnames: List[str],
+        filenames: List[str],
+    ) -> Set[Artifact]:
+        artifacts: Set[Artifact] = set()
+        table = self._table
+        for name in dirnames:
+            rules = table.get(name)
+            if rules is None:
+                continue
+            if not _INSTALL_DIRS.isdisjoint(directory.parts):
+                break
+            for rule in rules:
+                marker = _find_marker(rule, filenames)
+                if marker is not None or rule.unconditional:
+                    artifacts.add(
+                        Artifact(
+                            path=directory / name,
+                            type=rule.type,
+                            project=None if marker is None else directory / marker,
+                        )
+                    )
+                    # The first matching rule names the artifact
+                    break
+        return artifacts
+
+
+def _find_marker(rule: _CompiledRule, filenames: List[str]) -> Optional[str]:
+    """Return the first of filenames that is a marker of rule."""
+    for filename in filenames:
+        if filename in rule.names:
+            return filename
+        if rule.pattern is not None and rule.pattern.match(filename):
+            return filename
+    return None
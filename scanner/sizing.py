@@ -0,0 +1,340 @@
+"""
+Directory sizing engine.
+"""
+
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from .stats import RunStats
+
+if TYPE_CHECKING:
+    from .base_scanner import Artifact
+
+# Sizing is dominated by stat() latency, so use more threads than cores.
+DEFAULT_SIZE_JOBS = min(32, (os.cpu_count() or 1) + 4)
+# Subdirectories measured per directory when a size is estimated.
+DEFAULT_SAMPLES = 16
+# Two-sided z-score of the ~95% confidence interval reported for estimates.
+_Z_95 = 1.96
+
+
+class DiskUsage(NamedTuple):
+    """Size of a directory tree."""
+
+    apparent: int
+    """Sum of file sizes (st_size), counting every hard link."""
+    reclaimable: int
+    """Allocated bytes that removing the tree would actually free."""
+
+
+class InodeLedger:
+    """Tracks hard-linked inodes across all artifacts sized in one run.
+
+    A file with several hard links only frees its blocks once every link is
+    gone, so its allocated size is counted as reclaimable when the last of its
+    links has been seen. Links that live outside the sized artifacts (e.g. a
+    pnpm content store) therefore keep the file from counting at all.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._remaining: Dict[Tuple[int, int], int] = {}
+
+    def release(self, st: os.stat_result) -> bool:
+        """Record one link of a file; return True if it was the last one."""
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            remaining = self._remaining.get(key, st.st_nlink) - 1
+            self._remaining[key] = remaining
+            return remaining == 0
+
+    def unrelease(self, st: os.stat_result) -> None:
+        """Undo a `release` of the same link."""
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            self._remaining[key] += 1
+
+
+def _allocated_bytes(st: os.stat_result) -> int:
+    # st_blocks is always in 512-byte units; it is missing on Windows.
+    blocks = getattr(st, "st_blocks", None)
+    return st.st_size if blocks is None else blocks * 512
+
+
+def _measure(  # pylint: disable=too-many-arguments,too-many-branches
+    path: Path,
+    ledger: InodeLedger,
+    deadline: Optional[float] = None,
+    stats: Optional[RunStats] = None,
+    *,
+    skip: FrozenSet[str] = frozenset(),
+    links: Optional[List[os.stat_result]] = None,
+) -> Optional[DiskUsage]:
+    """Measure a tree exactly; give up (returning None) once deadline passes.
+
+    Directories whose path is in skip are left out. The hard links released
+    to the ledger are appended to links, if given.
+    """
+    apparent = 0
+    reclaimable = 0
+    stat_calls = 0
+    released: List[os.stat_result] = []
+    stack = [os.fspath(path)]
+    while stack:
+        if deadline is not None and time.monotonic() > deadline:
+            # Links seen so far must count again for whoever sizes them next
+            for st in released:
+                ledger.unrelease(st)
+            if stats is not None:
+                stats.add("stat_calls", stat_calls)
+            return None
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.path not in skip:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            stat_calls += 1
+                            apparent += st.st_size
+                            if st.st_nlink > 1:
+                                released.append(st)
+                            if st.st_nlink <= 1 or ledger.release(st):
+                                reclaimable += _allocated_bytes(st)
+                    except OSError:
+                        # The entry vanished or is unreadable; count the rest
+                        continue
+        except OSError:
+            continue
+    if stats is not None:
+        stats.add("stat_calls", stat_calls)
+    if links is not None:
+        links.extend(released)
+    return DiskUsage(apparent=apparent, reclaimable=reclaimable)
+
+
+def get_disk_usage(path: Path, ledger: Optional[InodeLedger] = None) -> DiskUsage:
+    """Calculate the apparent and reclaimable size of a directory in bytes.
+
+    Uses the type and stat information cached on `os.DirEntry` objects, so a
+    file costs at most one stat call and no `Path` allocation. Directories
+    that cannot be read are skipped; the rest of the tree is still counted.
+    Reclaimable bytes are based on st_blocks, so sparse and compressed files
+    count what they occupy on disk. Pass the same ledger for every artifact of
+    a run so that hard links shared between artifacts are counted once.
+    """
+    usage = _measure(path, ledger or InodeLedger())
+    assert usage is not None  # only a deadline stops the measurement
+    return usage
+
+
+class SizeEstimate(NamedTuple):
+    """Estimated size of a directory tree."""
+
+    usage: DiskUsage
+    error: DiskUsage
+    """Half-width of the ~95% confidence interval of each value."""
+
+
+def _variance(values: List[float]) -> float:
+    """Return the sample variance of at least two values."""
+    mean = sum(values) / len(values)
+    return sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+
+
+def _estimate(
+    directory: str, samples: int, rng: random.Random, ledger: InodeLedger
+) -> Tuple[float, float, float, float]:
+    """Return (apparent, reclaimable, apparent variance, reclaimable variance)."""
+    apparent = 0.0
+    reclaimable = 0.0
+    subdirs: List[str] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        apparent += st.st_size
+                        if st.st_nlink <= 1 or ledger.release(st):
+                            reclaimable += _allocated_bytes(st)
+                except OSError:
+                    continue
+    except OSError:
+        return 0.0, 0.0, 0.0, 0.0
+
+    count = len(subdirs)
+    if count > samples:
+        subdirs = rng.sample(sorted(subdirs), samples)
+    parts = [_estimate(subdir, samples, rng, ledger) for subdir in subdirs]
+    if not parts:
+        return apparent, reclaimable, 0.0, 0.0
+
+    # Two-stage sampling: scale the sampled subtrees up to all of them, and
+    # add the variance between subtrees to the variance within each one.
+    scale = count / len(parts)
+    sums = [scale * sum(column) for column in zip(*parts)]
+    if 1 < len(parts) < count:
+        factor = count * count * (1 - len(parts) / count) / len(parts)
+        sums[2] += factor * _variance([p[0] for p in parts])
+        sums[3] += factor * _variance([p[1] for p in parts])
+    return apparent + sums[0], reclaimable + sums[1], sums[2], sums[3]
+
+
+def estimate_disk_usage(
+    path: Path,
+    samples: int = DEFAULT_SAMPLES,
+    ledger: Optional[InodeLedger] = None,
+) -> SizeEstimate:
+    """Estimate the size of a directory tree by sampling its subdirectories.
+
+    In every directory with more than samples subdirectories, only a random
+    sample of them is measured and the result is scaled up to all of them.
+    The sample is seeded by the path, so repeated estimates agree. The error
+    is the half-width of a ~95% confidence interval. As with
+    `get_disk_usage`, pass the ledger of the run to count hard links shared
+    between artifacts once.
+    """
+    rng = random.Random(os.fspath(path))
+    apparent, reclaimable, apparent_var, reclaimable_var = _estimate(
+        os.fspath(path), samples, rng, ledger or InodeLedger()
+    )
+    return SizeEstimate(
+        usage=DiskUsage(apparent=round(apparent), reclaimable=round(reclaimable)),
+        error=DiskUsage(
+            apparent=round(_Z_95 * math.sqrt(apparent_var)),
+            reclaimable=round(_Z_95 * math.sqrt(reclaimable_var)),
+        ),
+    )
+
+
+def get_dir_size(path: Path) -> int:
+    """Calculate the total apparent size of a directory in bytes."""
+    return get_disk_usage(path).apparent
+
+
+class Sizer:
+    """Sizes the artifacts of one run, sharing a single inode ledger.
+
+    Every artifact is sized afresh: a size from an earlier run could not
+    tell whether files deep inside the artifact changed since, nor which of
+    its hard links the other artifacts of this run hold. With estimate,
+    sizes are estimated by `estimate_disk_usage` instead of measured. With a budget
+    (in seconds, counted from the creation of the sizer), artifacts are
+    measured exactly until it runs out and estimated afterwards. An artifact
+    with `nested` artifacts is always measured exactly, leaving them out.
+    Work done is reported to stats. `size` is safe to call from several
+    threads.
+
+    A resizable sizer remembers the hard links each measured artifact
+    released to the ledger, so that `forget` can return them before the
+    artifact is sized again or after it is gone.
+    """
+
+    def __init__(
+        self,
+        estimate: bool = False,
+        budget: Optional[float] = None,
+        stats: Optional[RunStats] = None,
+        resizable: bool = False,
+    ) -> None:
+        self.ledger = InodeLedger()
+        self.estimate = estimate
+        self.deadline = None if budget is None else time.monotonic() + budget
+        self.stats = RunStats(enabled=False) if stats is None else stats
+        self._links: Optional[Dict[Path, List[os.stat_result]]] = (
+            {} if resizable else None
+        )
+
+    def forget(self, path: Path) -> None:
+        """Return the hard links released by the artifact at path to the ledger."""
+        if self._links is None:
+            return
+        for st in self._links.pop(path, []):
+            self.ledger.unrelease(st)
+
+    def size(self, artifact: "Artifact") -> "Artifact":
+        """Return a copy of artifact with its sizes filled in."""
+        with self.stats.phase("size"):
+            sized = self._size(artifact)
+        self.stats.add("artifacts_sized")
+        self.stats.add("bytes_sized", sized.size_bytes)
+        if sized.size_error is not None:
+            self.stats.add("artifacts_estimated")
+        return sized
+
+    def _size(self, artifact: "Artifact") -> "Artifact":
+        links: Optional[List[os.stat_result]] = None if self._links is None else []
+        if artifact.nested:
+            # Rare enough to always measure: an estimate could not leave out
+            # the artifacts sized on their own
+            usage = _measure(
+                artifact.path,
+                self.ledger,
+                stats=self.stats,
+                skip=frozenset(map(os.fspath, artifact.nested)),
+                links=links,
+            )
+        elif self.estimate:
+            usage = None
+        else:
+            usage = _measure(
+                artifact.path, self.ledger, self.deadline, self.stats, links=links
+            )
+        if usage is not None:
+            if self._links is not None and links:
+                self._links[artifact.path] = links
+            return replace(
+                artifact,
+                size_bytes=usage.apparent,
+                reclaimable_bytes=usage.reclaimable,
+            )
+
+        estimate = estimate_disk_usage(artifact.path, ledger=self.ledger)
+        return replace(
+            artifact,
+            size_bytes=estimate.usage.apparent,
+            reclaimable_bytes=estimate.usage.reclaimable,
+            size_error=estimate.error,
+        )
+
+
+def size_artifacts(
+    artifacts: Iterable["Artifact"],
+    jobs: Optional[int] = None,
+    sizer: Optional[Sizer] = None,
+) -> List["Artifact"]:
+    """Size several artifacts concurrently in a bounded thread pool.
+
+    Returns copies of the artifacts with size_bytes and reclaimable_bytes
+    filled in, in input order. Hard links are tracked across all of them,
+    and across everything else sized by sizer if one is given.
+    """
+    pending = list(artifacts)
+    if not pending:
+        return []
+
+    sizer = sizer or Sizer()
+    with ThreadPoolExecutor(max_workers=jobs or DEFAULT_SIZE_JOBS) as executor:
+        return list(executor.map(sizer.size, pending))
@@ -0,0 +1,173 @@
+"""
+Per-phase statistics and profiling of a run.
+"""
+
+import contextlib
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Type
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class _Phase:
+    """Times one call of a phase; wall clock and CPU time of the calling thread."""
+
+    def __init__(self, stats: "RunStats", name: str) -> None:
+        self._stats = stats
+        self._name = name
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    def __enter__(self) -> None:
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._stats.record_phase(
+            self._name,
+            time.perf_counter() - self._wall,
+            time.thread_time() - self._cpu,
+        )
+
+
+class RunStats:
+    """Counters and phase timings of one run.
+
+    Scanners, the sizer and the removers accept a RunStats and report what
+    they do to it: phases are timed with `phase` and events are counted with
+    `add`. Phases run on several threads at once, so their times are summed
+    over threads and can exceed the wall time of the run. A disabled
+    instance records nothing and costs next to nothing. Safe to update from
+    several threads.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        # name -> [calls, wall seconds, cpu seconds]
+        self._phases: Dict[str, List[float]] = {}
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def add(self, name: str, amount: int = 1) -> None:
+        """Add amount to the counter name."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Return a context manager that times one call of the phase name."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _Phase(self, name)
+
+    def record_phase(self, name: str, wall: float, cpu: float) -> None:
+        """Record one call of the phase name that took wall and cpu seconds."""
+        if not self.enabled:
+            return
+        with self._lock:
+            totals = self._phases.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+
+    def merge(self, data: Dict[str, Any], phase: Optional[str] = None) -> None:
+        """Add statistics from `as_dict` of another instance to this one.
+
+        This is how runs in other processes are reported. With phase, their
+        total wall and CPU time is recorded as one call of that phase.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, amount in data["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+            for name, times in data["phases"].items():
+                totals = self._phases.setdefault(name, [0, 0.0, 0.0])
+                totals[0] += times["calls"]
+                totals[1] += times["wall_seconds"]
+                totals[2] += times["cpu_seconds"]
+        if phase is not None:
+            self.record_phase(phase, data["wall_seconds"], data["cpu_seconds"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the statistics as JSON-serializable data."""
+        with self._lock:
+            return {
+                "wall_seconds": time.perf_counter() - self._wall,
+                "cpu_seconds": time.process_time() - self._cpu,
+                "phases": {
+                    name: {
+                        "calls": int(calls),
+                        "wall_seconds": wall,
+                        "cpu_seconds": cpu,
+                    }
+                    for name, (calls, wall, cpu) in sorted(self._phases.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def summary(self) -> str:
+        """Return the statistics as a human-readable report."""
+        data = self.as_dict()
+        lines = [
+            f"Run: {data['wall_seconds']:.3f}s wall, "
+            f"{data['cpu_seconds']:.3f}s CPU",
+            "Phases (summed over threads):",
+        ]
+        for name, phase in data["phases"].items():
+            lines.append(
+                f"  {name:<24}{phase['calls']:>9} calls"
+                f"{phase['wall_seconds']:>11.3f}s wall"
+                f"{phase['cpu_seconds']:>11.3f}s CPU"
+            )
+        lines.append("Counters:")
+        for name, value in data["counters"].items():
+            lines.append(f"  {name:<24}{value:>15,}")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profiled(output: Path) -> Iterator[None]:
+    """Profile the enclosed code with cProfile and dump the profile to output.
+
+    Threads started inside the block are profiled too, and their profiles
+    are merged into one file that `python -m pstats` can read.
+    """
+    # Only needed with --profile
+    import cProfile  # pylint: disable=import-outside-toplevel
+    import pstats  # pylint: disable=import-outside-toplevel
+
+    lock = threading.Lock()
+    profiles: List[cProfile.Profile] = []
+
+    def profile_thread(*_: Any) -> None:
+        profile = cProfile.Profile()
+        with lock:
+            profiles.append(profile)
+        # Replaces this hook for the rest of the thread
+        profile.enable()
+
+    main = cProfile.Profile()
+    threading.setprofile(profile_thread)
+    main.enable()
+    try:
+        yield
+    finally:
+        main.disable()
+        threading.setprofile(None)
+        merged = pstats.Stats(main)
+        with lock:
+            for profile in profiles:
+                merged.add(profile)
+        merged.dump_stats(output)
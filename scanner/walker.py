@@ -0,0 +1,344 @@
+"""
+Shared filesystem traversal for all scanners.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .containment import PathTrie
+from .ignore import IGNORE_FILE, IgnoreMatcher, IgnoreRules
+from .sizing import DEFAULT_SIZE_JOBS, Sizer
+from .stats import RunStats
+
+if TYPE_CHECKING:
+    from .base_scanner import Artifact, BaseScanner
+    from .index import ScanIndex
+
+# Directories that never contain build artifacts worth reporting: version
+# control metadata and the staging directory of `--mode trash`.
+SKIP_DIRS = frozenset(
+    {".git", ".hg", ".svn", ".bzr", ".jj", "_darcs", "CVS", ".src-clean-trash"}
+)
+
+
+def _read_directory(directory: Path) -> Tuple[List[str], List[str], List[str]]:
+    """List a directory, returning (dirnames, filenames, symlinked dirnames)."""
+    dirnames: List[str] = []
+    filenames: List[str] = []
+    symlinks: List[str] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirnames.append(entry.name)
+                if entry.is_symlink():
+                    symlinks.append(entry.name)
+            else:
+                filenames.append(entry.name)
+    return dirnames, filenames, symlinks
+
+
+def _list_directory(
+    directory: Path, index: Optional["ScanIndex"], stats: RunStats
+) -> Tuple[List[str], List[str], List[str]]:
+    """List a directory, from the index when it is unchanged since last time."""
+    if index is None:
+        return _read_directory(directory)
+
+    st = os.stat(directory)
+    cached = index.listing(directory, st)
+    if cached is not None:
+        stats.add("index_listings")
+        return cached.dirnames, cached.filenames, cached.symlinks
+
+    # Only loaded with an index, since it is imported on first use
+    from .index import Listing  # pylint: disable=import-outside-toplevel
+
+    listing = _read_directory(directory)
+    index.store_listing(directory, st, Listing(*listing))
+    return listing
+
+
+def _on_device(path: Path, device: int) -> bool:
+    try:
+        return os.lstat(path).st_dev == device
+    except OSError:
+        return False
+
+
+def _read_ignore_file(path: Path) -> Optional[IgnoreRules]:
+    try:
+        return IgnoreRules.from_file(path)
+    except OSError:
+        return None
+
+
+def walk(  # pylint: disable=too-many-arguments,too-many-locals
+    root_path: Path,
+    index: Optional["ScanIndex"] = None,
+    stats: Optional[RunStats] = None,
+    one_file_system: bool = False,
+    exclude: Sequence[str] = (),
+    *,
+    ignore: Optional[IgnoreMatcher] = None,
+) -> Iterator[Tuple[Path, List[str], List[str]]]:
+    """Walk the tree below root_path top-down, listing each directory once.
+
+    Yields (directory, dirnames, filenames) like `os.walk`. Callers may remove
+    entries from dirnames to stop the walk from descending into them. As with
+    `os.walk`, symlinks to directories are listed in dirnames but not followed.
+    With an index, directories whose mtime is unchanged since the index
+    recorded them are not read again. With one_file_system, directories on
+    another device than root_path (mount points) are left out of dirnames,
+    like `du -x` does.
+
+    Directories matched by the exclude patterns (relative to root_path) or by
+    an IGNORE_FILE at or below root_path, both in gitignore syntax, are left
+    out of dirnames too, so they are never listed. ignore adds the rules that
+    apply from outside the walk (see `IgnoreMatcher.for_directory`).
+    """
+    if stats is None:
+        stats = RunStats(enabled=False)
+    device: Optional[int] = None
+    if one_file_system:
+        try:
+            device = os.stat(root_path).st_dev
+        except OSError:
+            return
+    matcher = ignore or IgnoreMatcher()
+    stack = [(root_path, matcher.child(IgnoreRules(root_path, exclude)))]
+    while stack:
+        directory, matcher = stack.pop()
+        try:
+            with stats.phase("walk"):
+                listing = _list_directory(directory, index, stats)
+        except OSError:
+            continue
+        dirnames, filenames, symlink_list = listing
+        symlinks = set(symlink_list)
+        if device is not None:
+            dirnames[:] = [
+                name
+                for name in dirnames
+                if name in symlinks or _on_device(directory / name, device)
+            ]
+        if IGNORE_FILE in filenames:
+            rules = _read_ignore_file(directory / IGNORE_FILE)
+            if rules is not None:
+                matcher = matcher.child(rules)
+        if matcher and dirnames:
+            kept = [name for name in dirnames if not matcher.ignores(directory / name)]
+            stats.add("directories_excluded", len(dirnames) - len(kept))
+            dirnames[:] = kept
+        stats.add("directories_walked")
+        stats.add("files_seen", len(filenames))
+
+        yield directory, dirnames, filenames
+
+        # Reversed so that siblings are visited in listing order.
+        for name in reversed(dirnames):
+            if name not in symlinks:
+                stack.append((directory / name, matcher))
+
+
+def iter_artifacts(  # pylint: disable=too-many-arguments,too-many-locals
+    root_path: Path,
+    scanners: Sequence["BaseScanner"],
+    index: Optional["ScanIndex"] = None,
+    stop: Optional[threading.Event] = None,
+    stats: Optional[RunStats] = None,
+    *,
+    one_file_system: bool = False,
+    exclude: Sequence[str] = (),
+    ignore: Optional[IgnoreMatcher] = None,
+) -> Iterator["Artifact"]:
+    """Walk root_path once, yielding unsized artifacts as scanners find them.
+
+    Every directory is dispatched to all scanners. The walk does not descend
+    into directories that have already been classified as artifacts, nor into
+    version control metadata (SKIP_DIRS), nor into excluded directories (see
+    `walk`), nor with one_file_system into other filesystems. An index lets
+    unchanged directories be listed from an earlier run. Setting stop ends
+    the walk early. Time spent in each scanner is recorded in stats as a
+    "visit:<class>" phase.
+
+    Only top-level artifacts are yielded: one inside an artifact found
+    earlier (say, a .NET obj directory inside another project's bin) is
+    counted as "artifacts_nested" in stats and dropped. Artifacts below the
+    `deferred_directories` of a scanner are held back, so that one reported
+    late drops those inside it as well; the others are yielded at once. An
+    artifact found after artifacts inside it that were yielded already lists
+    them as `nested`, so that sizing leaves them out instead of counting
+    them twice.
+    """
+    if stats is None:
+        stats = RunStats(enabled=False)
+    phases = [f"visit:{type(scanner).__name__}" for scanner in scanners]
+    top_level = PathTrie()
+    held: Dict[Path, "Artifact"] = {}
+
+    def contain(found: Set["Artifact"]) -> None:
+        for artifact in found:
+            if artifact.path in top_level:
+                continue
+            nested = top_level.add(artifact.path)
+            if nested is None:
+                stats.add("artifacts_nested")
+                continue
+            yielded = [path for path in nested if held.pop(path, None) is None]
+            stats.add("artifacts_nested", len(nested) - len(yielded))
+            if yielded:
+                artifact = replace(artifact, nested=frozenset(yielded))
+            held[artifact.path] = artifact
+
+    def release() -> Iterator["Artifact"]:
+        if not held:
+            return
+        deferred: Set[Path] = set()
+        for scanner in scanners:
+            deferred.update(scanner.deferred_directories())
+        for path in list(held):
+            if path not in deferred and deferred.isdisjoint(path.parents):
+                yield held.pop(path)
+
+    for directory, dirnames, filenames in walk(
+        root_path, index, stats, one_file_system, exclude, ignore=ignore
+    ):
+        if stop is not None and stop.is_set():
+            return
+        for scanner, phase in zip(scanners, phases):
+            with stats.phase(phase):
+                contain(scanner.visit_directory(directory, dirnames, filenames))
+        yield from release()
+
+        dirnames[:] = [
+            name
+            for name in dirnames
+            if name not in SKIP_DIRS and directory / name not in top_level
+        ]
+
+    for scanner, phase in zip(scanners, phases):
+        with stats.phase(phase):
+            contain(scanner.finish_scan())
+    yield from held.values()
+
+
+def stream_tree(  # pylint: disable=too-many-arguments,too-many-locals
+    root_path: Path,
+    scanners: Sequence["BaseScanner"],
+    calculate_size: bool = True,
+    index: Optional["ScanIndex"] = None,
+    *,
+    jobs: Optional[int] = None,
+    sizer: Optional[Sizer] = None,
+    stats: Optional[RunStats] = None,
+    one_file_system: bool = False,
+    exclude: Sequence[str] = (),
+    ignore: Optional[IgnoreMatcher] = None,
+) -> Iterator["Artifact"]:
+    """Yield artifacts below root_path as soon as they are found and sized.
+
+    Discovery runs in a background thread and hands every artifact to a
+    bounded sizing pool as soon as it is found, so walking, .NET evaluation
+    and sizing overlap. Artifacts are yielded in completion order. A sizer
+    can be passed to control how artifacts are sized. The walk reports to
+    stats; a sizer created here does too. With one_file_system the walk
+    stays on the filesystem of root_path; directories matching the exclude
+    patterns or ignore files (including those of ignore) are not walked.
+    """
+    if not calculate_size:
+        yield from iter_artifacts(
+            root_path,
+            scanners,
+            index,
+            stats=stats,
+            one_file_system=one_file_system,
+            exclude=exclude,
+            ignore=ignore,
+        )
+        return
+
+    if sizer is None:
+        sizer = Sizer(stats=stats)
+    results: "queue.Queue[object]" = queue.Queue()
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=jobs or DEFAULT_SIZE_JOBS)
+
+    def discover() -> None:
+        submitted = 0
+        try:
+            for artifact in iter_artifacts(
+                root_path,
+                scanners,
+                index,
+                stop,
+                stats,
+                one_file_system=one_file_system,
+                exclude=exclude,
+                ignore=ignore,
+            ):
+                executor.submit(sizer.size, artifact).add_done_callback(results.put)
+                submitted += 1
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            results.put(e)
+        finally:
+            results.put(_DiscoveryDone(submitted))
+
+    discovery = threading.Thread(
+        target=discover, name="src-clean-discovery", daemon=True
+    )
+    discovery.start()
+    try:
+        received = 0
+        expected: Optional[int] = None
+        while expected is None or received < expected:
+            item = results.get()
+            if isinstance(item, _DiscoveryDone):
+                expected = item.submitted
+            elif isinstance(item, BaseException):
+                raise item
+            elif isinstance(item, Future):
+                received += 1
+                yield item.result()
+    finally:
+        # After a normal finish this is a no-op. If the consumer stopped early
+        # or an error occurred, do not wait for the walk or pending sizing.
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _DiscoveryDone(NamedTuple):
+    """Queued by the discovery thread once it has submitted every artifact."""
+
+    submitted: int
+
+
+def scan_tree(
+    root_path: Path,
+    scanners: Sequence["BaseScanner"],
+    calculate_size: bool = True,
+    index: Optional["ScanIndex"] = None,
+) -> Set["Artifact"]:
+    """Walk root_path once and return every artifact found by the scanners.
+
+    See `stream_tree` for a variant that yields artifacts as they are found.
+    """
+    return set(stream_tree(root_path, scanners, calculate_size, index=index))
@@ -3,12 +3,53 @@ src-clean: A tool to detect and remove build artifacts.
 """
 
 import argparse
+import contextlib
+import json
+import os
+import signal
 import sys
+from functools import partial
 from pathlib import Path
-from typing import Set
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
 
-from remover import DirectRemover, ScriptRemover
-from scanner import Artifact, DotnetScanner, NodeScanner
+# Both packages import their modules on first use, so a run only loads the
+# scanners and removers it needs.
+import remover
+import scanner
+from reclaim import (
+    RANKINGS,
+    ReclaimQueue,
+    free_bytes,
+    parse_size,
+    target_free_bytes,
+)
+from report import (
+    FORMATS,
+    RecordWriter,
+    Totals,
+    artifact_from_record,
+    artifact_record,
+    summary_record,
+)
+from scanner import Artifact, BaseScanner, NodeScanner, stream_tree
+from scanner.containment import collapse
+from scanner.defaults import DEFAULT_EVALUATION_TIMEOUT, ECOSYSTEMS
+from scanner.ignore import IgnoreMatcher
+from scanner.roots import dedupe_roots, group_by_device, stream_roots
+from scanner.sizing import Sizer
+from scanner.stats import RunStats, profiled
+
+if TYPE_CHECKING:
+    from scanner import ScanIndex
 
 
 def format_size(size_bytes: int) -> str:
@@ -21,102 +62,867 @@ def format_size(size_bytes: int) -> str:
     return f"{size:.1f} PiB"
 
 
-def main() -> None:
-    """Main entry point for the tool."""
-    parser = argparse.ArgumentParser(description="Detect and remove build artifacts.")
-    parser.add_argument("path", help="Directory to scan")
+def format_estimate(size_bytes: int, error_bytes: Optional[int]) -> str:
+    """Format a size, marking it as estimated when it has an error bound."""
+    if error_bytes is None:
+        return format_size(size_bytes)
+    return f"~{format_size(size_bytes)} ±{format_size(error_bytes)}"
+
+
+def reported_size(artifact: Artifact, disk_usage: bool) -> int:
+    """Return the size that counts towards savings for an artifact."""
+    return artifact.reclaimable_bytes if disk_usage else artifact.size_bytes
+
+
+def reported_error(artifact: Artifact, disk_usage: bool) -> Optional[int]:
+    """Return the error bound of reported_size, or None if it is exact."""
+    if artifact.size_error is None:
+        return None
+    return (
+        artifact.size_error.reclaimable if disk_usage else artifact.size_error.apparent
+    )
+
+
+def print_artifact(artifact: Artifact, args: argparse.Namespace) -> None:
+    """Print one dry-run line for an artifact."""
+    path_str = f"  {artifact.path} [{artifact.type}]"
+    if args.no_size:
+        print(path_str, flush=True)
+        return
+
+    error = artifact.size_error
+    size_str = format_estimate(artifact.size_bytes, error and error.apparent)
+    if args.disk_usage:
+        reclaimable = format_estimate(
+            artifact.reclaimable_bytes, error and error.reclaimable
+        )
+        size_str += f", {reclaimable} reclaimable"
+    if error is not None:
+        size_str += ", estimated"
+    print(f"{path_str} ({size_str})", flush=True)
+
+
+def dry_run(artifacts: Iterable[Artifact], args: argparse.Namespace) -> None:
+    """List artifacts, as they arrive or (with --sort) sorted by path."""
+    if args.sort:
+        artifacts = collapse(artifacts)
+        if artifacts:
+            print(f"\nFound {len(artifacts)} artifact(s)...")
+
+    totals = Totals()
+    for artifact in artifacts:
+        print_artifact(artifact, args)
+        totals.add(artifact)
+
+    if not totals.count:
+        print("No artifacts found.")
+        return
+    if not args.sort:
+        print(f"\nFound {totals.count} artifact(s).")
+    if args.no_size:
+        return
+    total_size = totals.reclaimable_bytes if args.disk_usage else totals.size_bytes
+    if totals.estimated:
+        total_str = format_estimate(total_size, totals.size_error(args.disk_usage))
+        total_str += f" ({totals.estimated} of {totals.count} estimated)"
+    else:
+        total_str = format_size(total_size)
+    print(f"\nTotal potential space savings: {total_str}")
+
+
+def write_records(
+    artifacts: Iterable[Artifact], args: argparse.Namespace, roots: List[Path]
+) -> None:
+    """Write a JSON or NDJSON record per artifact, then a summary record."""
+    writer = RecordWriter(args.format)
+    if args.sort:
+        artifacts = collapse(artifacts)
+    totals = Totals()
+    sized = not args.no_size
+    for artifact in artifacts:
+        writer.artifact(artifact_record(artifact, writer.elapsed(), sized))
+        totals.add(artifact)
+    writer.finish(summary_record(roots, totals, writer.elapsed(), sized))
+
+
+def delete(
+    sorted_artifacts: List[Artifact],
+    args: argparse.Namespace,
+    roots: List[Path],
+    stats: Optional[RunStats] = None,
+) -> None:
+    """Interactively delete (or stage) artifacts and report the space freed."""
+    if not sorted_artifacts:
+        print("No artifacts found.")
+        return
+    print(f"\nFound {len(sorted_artifacts)} artifact(s)...")
+
+    direct_remover = (
+        remover.StagingRemover(roots, jobs=args.jobs, confirm=not args.yes, stats=stats)
+        if args.mode == "trash"
+        else remover.DirectRemover(jobs=args.jobs, confirm=not args.yes, stats=stats)
+    )
+    result = direct_remover.remove([a.path for a in sorted_artifacts])
+    if stats is not None:
+        stats.add("artifacts_removed", len(result.removed))
+
+    # Report space freed
+    if result.removed and not args.no_size:
+        freed_bytes = 0
+        # Map Path to size from our sorted_artifacts list
+        path_to_size = {
+            a.path: reported_size(a, args.disk_usage) for a in sorted_artifacts
+        }
+        for removed_path in result.removed:
+            freed_bytes += path_to_size.get(removed_path, 0)
+        if stats is not None:
+            stats.add("bytes_removed", freed_bytes)
+        if args.mode == "trash":
+            print(f"\nTotal space freed once purged: {format_size(freed_bytes)}")
+        else:
+            print(f"\nTotal space freed: {format_size(freed_bytes)}")
+
+    if (
+        isinstance(direct_remover, remover.StagingRemover)
+        and direct_remover.staging_dirs
+    ):
+        staging_dirs = sorted(direct_remover.staging_dirs)
+        if args.no_purge:
+            print("\nStaged artifacts are kept in:")
+            for staging_dir in staging_dirs:
+                print(f"  {staging_dir}")
+            paths = " ".join(str(root) for root in roots)
+            print(f"Run '{Path(sys.argv[0]).name} purge {paths}' to delete them.")
+        else:
+            purge_in_background(staging_dirs, args.jobs)
+            print("\nPurging staged artifacts in the background.")
+
+    if not result.success:
+        sys.exit(1)
+
+
+def reclaim(
+    artifacts: Iterable[Artifact],
+    args: argparse.Namespace,
+    root_path: Path,
+    sizer: Optional[Sizer] = None,
+    stats: Optional[RunStats] = None,
+) -> None:
+    """Remove ranked artifacts until the free space target is met.
+
+    Artifacts are taken from the ranking a batch at a time, just enough to
+    cover what is still missing, and the free space is measured again after
+    each batch. In dry-run mode the artifacts that would go are listed.
+    """
+    if stats is None:
+        stats = RunStats(enabled=False)
+    target = target_free_bytes(root_path, args.free, args.until_free)
+    available = free_bytes(root_path)
+    print(f"Free space: {format_size(available)}, target: {format_size(target)}")
+    if available >= target:
+        print("The target is already met.")
+        return
+
+    queue = ReclaimQueue(collapse(artifacts), args.rank, sizer)
+    direct_remover = (
+        None
+        if args.mode == "dry-run"
+        else remover.DirectRemover(jobs=args.jobs, confirm=not args.yes, stats=stats)
+    )
+    if direct_remover is None:
+        print("\nArtifacts to remove:")
+    while available < target and len(queue):
+        batch = queue.take(target - available)
+        if direct_remover is None:
+            for artifact in batch:
+                print_artifact(artifact, args)
+            available += sum(a.reclaimable_bytes for a in batch)
+            continue
+        result = direct_remover.remove([a.path for a in batch])
+        stats.add("artifacts_removed", len(result.removed))
+        removed = set(result.removed)
+        stats.add(
+            "bytes_removed",
+            sum(a.reclaimable_bytes for a in batch if a.path in removed),
+        )
+        available = free_bytes(root_path)
+        if len(result.removed) + len(result.skipped) + len(result.failed) < len(batch):
+            break  # Interrupted
+
+    if available < target:
+        print(f"\nThe target cannot be met: {format_size(available)} free.")
+        if direct_remover is not None:
+            sys.exit(1)
+    else:
+        print(f"\nThe target is met: {format_size(available)} free.")
+
+
+def run_mode(
+    artifacts: Iterable[Artifact],
+    args: argparse.Namespace,
+    roots: List[Path],
+    stats: Optional[RunStats] = None,
+) -> None:
+    """Act on every artifact found as selected by --mode and --format."""
+    if args.format != "text":
+        write_records(artifacts, args, roots)
+    elif args.mode == "dry-run":
+        dry_run(artifacts, args)
+    elif args.mode == "script":
+        script_remover = remover.ScriptRemover(sort=args.sort, jobs=args.jobs)
+        if args.sort:
+            artifacts = collapse(artifacts)
+        script_remover.remove(a.path for a in artifacts)
+    elif args.mode in ("delete", "trash"):
+        delete(collapse(artifacts), args, roots, stats)
+
+
+def purge_in_background(staging_dirs: List[Path], jobs: Optional[int]) -> None:
+    """Purge staging directories in a detached process that outlives this one."""
+    import subprocess  # pylint: disable=import-outside-toplevel
+
+    command = [sys.executable, os.path.abspath(__file__), "purge"]
+    if jobs:
+        command += ["--jobs", str(jobs)]
+    command += [str(staging_dir) for staging_dir in staging_dirs]
+    subprocess.Popen(  # pylint: disable=consider-using-with
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def purge_main(argv: List[str]) -> None:
+    """Entry point of the purge subcommand."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} purge",
+        description="Delete artifacts staged by --mode trash.",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Directories to search for staged artifacts (or staging directories)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        help="Maximum number of deletion threads",
+    )
+    args = parser.parse_args(argv)
+
+    staging_dirs = [
+        staging_dir
+        for path in args.paths
+        for staging_dir in remover.find_staging_dirs(Path(path).resolve())
+    ]
+    result = remover.purge(staging_dirs, jobs=args.jobs)
+    for path in result.failed:
+        print(f"  Could not purge {path}")
+    print(f"Purged {len(result.removed)} staged artifact(s).")
+    if not result.success:
+        sys.exit(1)
+
+
+def watch_main(argv: List[str]) -> None:
+    """Entry point of the watch subcommand."""
+    # pylint: disable=import-outside-toplevel
+    from scanner.inotify import is_supported
+    from watch import (
+        DEFAULT_REFRESH_SECONDS,
+        DEFAULT_SETTLE_SECONDS,
+        ArtifactWatcher,
+        default_socket_path,
+        serve,
+    )
+
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} watch",
+        description=(
+            "Scan once, then keep the artifacts and their sizes current by "
+            "following filesystem events, and answer 'query' commands from "
+            "memory."
+        ),
+    )
+    parser.add_argument("paths", nargs="+", metavar="path", help="Directories to watch")
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=default_socket_path(),
+        help="Unix socket to listen on (default: in the user cache dir)",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE_SECONDS,
+        metavar="SECONDS",
+        help=(
+            "Size a changed artifact again once it has been unchanged for "
+            f"SECONDS (default: {DEFAULT_SETTLE_SECONDS:g})"
+        ),
+    )
+    parser.add_argument(
+        "--refresh",
+        type=float,
+        default=DEFAULT_REFRESH_SECONDS,
+        metavar="SECONDS",
+        help=(
+            "Size artifacts that are too large to watch every SECONDS "
+            f"(default: {DEFAULT_REFRESH_SECONDS:g})"
+        ),
+    )
+    add_walk_arguments(parser)
+    add_scanner_arguments(parser)
+    args = parser.parse_args(argv)
+    if not is_supported():
+        parser.error("watching needs inotify (Linux)")
+
+    roots = dedupe_roots(Path(path) for path in args.paths)
+    missing = [root for root in roots if not root.exists()]
+    if missing:
+        for root in missing:
+            print(f"Path does not exist: {root}")
+        sys.exit(1)
+
+    watcher = ArtifactWatcher(
+        roots,
+        build_scanners(args),
+        exclude=args.exclude,
+        one_file_system=args.one_file_system,
+        settle=args.settle,
+        refresh=args.refresh,
+    )
+    print(f"Scanning {', '.join(str(root) for root in roots)}...", flush=True)
+    watcher.scan(args.jobs)
+    print(
+        f"Watching {len(watcher.artifacts())} artifact(s) in "
+        f"{watcher.watch_count()} directories; listening on {args.socket}",
+        flush=True,
+    )
+    if watcher.watch_limit_reached:
+        print(
+            "The inotify watch limit is reached; raise "
+            "fs.inotify.max_user_watches to follow every change.",
+            file=sys.stderr,
+        )
+    # Shut down as on Ctrl+C, removing the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    try:
+        serve(watcher, args.socket, args.jobs)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Cannot listen on {args.socket}: {e.strerror}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        watcher.close()
+
+
+def query_main(argv: List[str]) -> None:
+    """Entry point of the query subcommand."""
+    # pylint: disable=import-outside-toplevel
+    from watch import default_socket_path, query
+
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} query",
+        description="Act on the artifacts known to a running watch daemon.",
+    )
     parser.add_argument(
         "--mode",
         choices=["dry-run", "script", "delete"],
         default="dry-run",
-        help=(
-            "Action to take: dry-run (list), "
-            "script (print rm commands to stdout), delete (remove files)"
-        ),
+        help="Action to take, as for a scan",
     )
     parser.add_argument(
-        "--scanners",
-        nargs="+",
-        choices=["node", "dotnet", "all"],
-        default=["all"],
-        help="Scanners to use (default: all)",
+        "--socket",
+        type=Path,
+        default=default_socket_path(),
+        help="Unix socket of the daemon (default: in the user cache dir)",
     )
     parser.add_argument(
-        "--no-size",
+        "--yes",
+        "-y",
         action="store_true",
-        help="Do not calculate or print artifact sizes",
+        help="Remove artifacts without asking for confirmation",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        help="Output of --mode dry-run, as for a scan",
+    )
+    parser.add_argument(
+        "--disk-usage",
+        action="store_true",
+        help="Report allocated bytes instead of apparent file sizes",
     )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        help=(
+            "Maximum number of removals requested at the same time; with "
+            "--mode script, the script removes this many artifacts at a time"
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.format != "text" and args.mode != "dry-run":
+        parser.error("--format json and ndjson need --mode dry-run")
+    # The daemon answers sorted by path, with sizes
+    args.sort = True
+    args.no_size = False
 
-    if len(sys.argv) == 1:
-        parser.print_help(sys.stderr)
+    try:
+        records = list(query(args.socket, {"command": "list"}))
+    except OSError as e:
+        print(f"No watch daemon on {args.socket}: {e.strerror}", file=sys.stderr)
         sys.exit(1)
+    artifacts = collapse(
+        artifact_from_record(record)
+        for record in records
+        if record["record"] == "artifact"
+    )
+    roots = [Path(root) for root in records[-1].get("roots", [])]
 
-    args = parser.parse_args()
-    root_path = Path(args.path).resolve()
+    if args.mode == "delete":
+        query_delete(artifacts, args)
+    else:
+        run_mode(artifacts, args, roots)
 
-    if not root_path.exists():
-        print(f"Path does not exist: {root_path}")
+
+def query_delete(artifacts: List[Artifact], args: argparse.Namespace) -> None:
+    """Have the watch daemon delete artifacts, confirming each unless --yes."""
+    from watch import DaemonRemover  # pylint: disable=import-outside-toplevel
+
+    if not artifacts:
+        print("No artifacts found.")
         return
+    print(f"\nFound {len(artifacts)} artifact(s)...")
+    daemon_remover = DaemonRemover(args.socket, jobs=args.jobs, confirm=not args.yes)
+    result = daemon_remover.remove([a.path for a in artifacts])
+    removed = set(result.removed)
+    freed_bytes = sum(
+        reported_size(a, args.disk_usage) for a in artifacts if a.path in removed
+    )
+    if removed:
+        print(f"\nTotal space freed: {format_size(freed_bytes)}")
+    if not result.success:
+        sys.exit(1)
+
+
+def positive_int(value: str) -> int:
+    """Parse a command line value that must be a positive integer."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
 
-    scanner_map = {
+def percentage(value: str) -> float:
+    """Parse a command line value that must be a percentage."""
+    number = float(value.rstrip("%"))
+    if not 0 < number <= 100:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 100: {value}")
+    return number
+
+
+def open_index(args: argparse.Namespace) -> Optional["ScanIndex"]:
+    """Open the persistent scan index requested on the command line."""
+    if not (args.index or args.index_file or args.verify_index):
+        return None
+    index = scanner.ScanIndex(Path(args.index_file) if args.index_file else None)
+    if args.full_rescan:
+        index.clear()
+    return index
+
+
+def build_scanners(
+    args: argparse.Namespace, stats: Optional[RunStats] = None
+) -> List[BaseScanner]:
+    """Create the scanners selected on the command line."""
+    scanner_map: Dict[str, Callable[[], BaseScanner]] = {
         "node": NodeScanner,
-        "dotnet": DotnetScanner,
+        "dotnet": lambda: scanner.DotnetScanner(
+            evaluation=args.dotnet_eval,
+            cache=None if args.no_dotnet_cache else scanner.DotnetPropertyCache(),
+            jobs=args.jobs,
+            timeout=args.dotnet_timeout,
+            stats=stats,
+        ),
     }
 
     selected_scanners = args.scanners
-    if "all" in selected_scanners:
+    if "every" in selected_scanners:
+        selected_scanners = list(scanner_map.keys()) + list(ECOSYSTEMS)
+    elif "all" in selected_scanners:
         selected_scanners = list(scanner_map.keys())
 
-    scanners = [scanner_map[s]() for s in selected_scanners]
-    artifacts: Set[Artifact] = set()
+    scanners = [scanner_map[s]() for s in selected_scanners if s in scanner_map]
+    # One scanner evaluates the rules of every selected ecosystem at once
+    ecosystems = [s for s in selected_scanners if s in ECOSYSTEMS]
+    if ecosystems:
+        scanners.append(scanner.RuleScanner(ecosystems))
+    return scanners
+
 
-    if args.mode != "script":
-        print(f"Scanning {root_path}...")
+def add_walk_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options that limit which directories are walked."""
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help=(
+            "Do not walk directories matching PATTERN (gitignore syntax, "
+            "relative to each path; repeatable). .srccleanignore files in and "
+            "above the scanned tree are applied the same way"
+        ),
+    )
+    parser.add_argument(
+        "--one-file-system",
+        "-x",
+        action="store_true",
+        help="Do not descend into directories on other filesystems (like du -x)",
+    )
 
-    for scanner in scanners:
-        artifacts.update(scanner.scan(root_path, calculate_size=not args.no_size))
 
-    if not artifacts and args.mode != "script":
-        print("No artifacts found.")
+def add_scanner_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options that select and configure the scanners."""
+    parser.add_argument(
+        "--scanners",
+        nargs="+",
+        choices=["node", "dotnet", *ECOSYSTEMS, "all", "every"],
+        default=["node", "dotnet"],
+        help=(
+            "Scanners to use (default: node dotnet). all selects node and "
+            "dotnet, every also the rule-based ecosystems "
+            f"({', '.join(ECOSYSTEMS)}), which share a single table lookup per "
+            "directory"
+        ),
+    )
+    parser.add_argument(
+        "--dotnet-eval",
+        choices=["auto", "static", "msbuild"],
+        default="auto",
+        help=(
+            "How .NET output paths are resolved: auto (static evaluation with "
+            "a dotnet msbuild fallback), static (no SDK needed), msbuild"
+        ),
+    )
+    parser.add_argument(
+        "--no-dotnet-cache",
+        action="store_true",
+        help="Do not reuse dotnet msbuild results cached by earlier runs",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        help=(
+            "Maximum number of concurrent dotnet msbuild evaluations and "
+            "deletion threads (default: based on the number of CPUs); with "
+            "--mode script, the script removes this many artifacts at a time"
+        ),
+    )
+    parser.add_argument(
+        "--dotnet-timeout",
+        type=float,
+        default=DEFAULT_EVALUATION_TIMEOUT,
+        help=(
+            "Seconds a .NET project may take to evaluate before it is skipped "
+            f"(default: {DEFAULT_EVALUATION_TIMEOUT:g})"
+        ),
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser of the scan modes."""
+    parser = argparse.ArgumentParser(description="Detect and remove build artifacts.")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        metavar="path",
+        help=(
+            "Directories to scan; overlapping ones are scanned once, and "
+            "directories on different devices are scanned in parallel"
+        ),
+    )
+    add_walk_arguments(parser)
+    parser.add_argument(
+        "--mode",
+        choices=["dry-run", "script", "delete", "trash"],
+        default="dry-run",
+        help=(
+            "Action to take: dry-run (list), "
+            "script (print rm commands to stdout), delete (remove files), "
+            "trash (move to a staging directory and purge in the background)"
+        ),
+    )
+    parser.add_argument(
+        "--yes",
+        "-y",
+        action="store_true",
+        help="Remove artifacts without asking for confirmation",
+    )
+    parser.add_argument(
+        "--free",
+        type=parse_size,
+        metavar="SIZE",
+        help=(
+            "Only remove as many artifacts as needed to free SIZE more bytes "
+            "(e.g. 50G) on the filesystem of path"
+        ),
+    )
+    parser.add_argument(
+        "--until-free",
+        type=percentage,
+        metavar="PERCENT",
+        help=(
+            "Only remove as many artifacts as needed until PERCENT of the "
+            "filesystem of path is free"
+        ),
+    )
+    parser.add_argument(
+        "--rank",
+        choices=RANKINGS,
+        default="size",
+        help=(
+            "Order in which --free/--until-free picks artifacts: size (largest "
+            "first) or stale (least recently changed project first)"
+        ),
+    )
+    parser.add_argument(
+        "--no-purge",
+        action="store_true",
+        help="With --mode trash, keep staged artifacts for a later 'purge' run",
+    )
+    add_scanner_arguments(parser)
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        help=(
+            "Output of --mode dry-run: text (default), json (one document) or "
+            "ndjson (one record per line). Both machine formats stream a record "
+            "per artifact with exact byte counts as it is found, followed by a "
+            "summary record"
+        ),
+    )
+    parser.add_argument(
+        "--sort",
+        action="store_true",
+        help=(
+            "Wait for the whole scan and list artifacts sorted by path instead "
+            "of printing them as they are found"
+        ),
+    )
+    parser.add_argument(
+        "--no-size",
+        action="store_true",
+        help="Do not calculate or print artifact sizes",
+    )
+    parser.add_argument(
+        "--estimate-size",
+        action="store_true",
+        help=(
+            "Estimate sizes by measuring a random sample of subdirectories "
+            "instead of every file (estimates are marked with ~ and an error "
+            "bound)"
+        ),
+    )
+    parser.add_argument(
+        "--size-budget",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Measure sizes exactly for SECONDS, then estimate the sizes of the "
+            "remaining artifacts"
+        ),
+    )
+    parser.add_argument(
+        "--disk-usage",
+        action="store_true",
+        help=(
+            "Count allocated bytes that deleting would actually free "
+            "(hard-link and sparse-file aware) instead of apparent file sizes"
+        ),
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help=(
+            "Keep a persistent index of directory listings so that re-scans "
+            "skip unchanged directories (artifacts are always sized afresh)"
+        ),
+    )
+    parser.add_argument(
+        "--index-file",
+        help="Location of the index (implies --index; default: user cache dir)",
+    )
+    parser.add_argument(
+        "--full-rescan",
+        action="store_true",
+        help="Ignore the existing index contents and rebuild them",
+    )
+    parser.add_argument(
+        "--verify-index",
+        action="store_true",
+        help="Check that the index still matches the filesystem, then exit",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="text",
+        choices=["text", "json"],
+        help=(
+            "Print time spent per phase and work done (directories walked, "
+            "stat calls, dotnet processes, bytes sized and removed) to stderr "
+            "when the run ends"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Profile the run with cProfile and write the profile to FILE",
+    )
+    return parser
+
+
+def report_stats(stats: RunStats, output_format: str) -> None:
+    """Print the run statistics to stderr."""
+    if output_format == "json":
+        print(json.dumps(stats.as_dict(), indent=2), file=sys.stderr)
+    else:
+        print(stats.summary(), file=sys.stderr)
+
+
+def sizes_while_scanning(args: argparse.Namespace) -> bool:
+    """Return whether artifacts are sized as soon as they are found.
+
+    Ranking by staleness sizes artifacts only when they are picked.
+    """
+    reclaiming = args.free is not None or args.until_free is not None
+    return not (args.no_size or (reclaiming and args.rank == "stale"))
+
+
+def scan_group(
+    args: argparse.Namespace,
+    roots: Sequence[Path],
+    stats: RunStats,
+    index: Optional["ScanIndex"] = None,
+) -> Iterator[Artifact]:
+    """Scan roots one after another, yielding artifacts as they are found.
+
+    The roots share one set of scanners and one sizer, so hard links between
+    them are counted once. Runs in a worker process when several devices are
+    scanned in parallel.
+    """
+    scanners = build_scanners(args, stats)
+    sizer = Sizer(estimate=args.estimate_size, budget=args.size_budget, stats=stats)
+    for root in roots:
+        # All scanners share a single walk of the tree; artifacts arrive as
+        # soon as they are found and sized.
+        yield from stream_tree(
+            root,
+            scanners,
+            calculate_size=sizes_while_scanning(args),
+            index=index,
+            sizer=sizer,
+            stats=stats,
+            one_file_system=args.one_file_system,
+            exclude=args.exclude,
+            # Ignore files above the path apply to it too, as with .gitignore
+            ignore=IgnoreMatcher.for_directory(Path(root.anchor), root),
+        )
+
+
+def scan_and_act(
+    args: argparse.Namespace,
+    roots: List[Path],
+    index: Optional["ScanIndex"],
+    stats: RunStats,
+) -> None:
+    """Scan the roots and act on the artifacts found as the arguments select."""
+    if args.mode != "script" and args.format == "text":
+        print(f"Scanning {', '.join(str(root) for root in roots)}...", flush=True)
+
+    # Devices are scanned in parallel processes, except with an index: its
+    # database is written by one process at a time.
+    stream = stream_roots(
+        roots, partial(scan_group, args, index=index), stats, parallel=index is None
+    )
+    if args.free is not None or args.until_free is not None:
+        sizer = None
+        if not (args.no_size or sizes_while_scanning(args)):
+            sizer = Sizer(
+                estimate=args.estimate_size, budget=args.size_budget, stats=stats
+            )
+        reclaim(stream, args, roots[0], sizer, stats)
+    else:
+        run_mode(stream, args, roots, stats)
+
+
+def check_arguments(
+    parser: argparse.ArgumentParser, args: argparse.Namespace, roots: List[Path]
+) -> None:
+    """Exit with a usage error if the arguments do not go together."""
+    reclaiming = args.free is not None or args.until_free is not None
+    if reclaiming and args.mode not in ("dry-run", "delete"):
+        parser.error("--free and --until-free need --mode dry-run or delete")
+    if reclaiming and args.no_size:
+        parser.error("--free and --until-free need artifact sizes")
+    if reclaiming and len(group_by_device(roots)) > 1:
+        parser.error("--free and --until-free need paths on a single filesystem")
+    if args.format != "text" and (args.mode != "dry-run" or reclaiming):
+        parser.error("--format json and ndjson need --mode dry-run")
+
+
+def main() -> None:
+    """Main entry point for the tool."""
+    if sys.argv[1:2] == ["purge"]:
+        purge_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["watch"]:
+        watch_main(sys.argv[2:])
         return
+    if sys.argv[1:2] == ["query"]:
+        query_main(sys.argv[2:])
+        return
+
+    parser = build_parser()
+    if len(sys.argv) == 1:
+        parser.print_help(sys.stderr)
+        sys.exit(1)
 
-    sorted_artifacts = sorted(list(artifacts), key=lambda x: x.path)
-    if args.mode != "script":
-        print(f"\nFound {len(sorted_artifacts)} artifact(s)...")
+    args = parser.parse_args()
+    roots = dedupe_roots(Path(path) for path in args.paths)
 
-    if args.mode == "dry-run":
-        total_size = 0
-        for artifact in sorted_artifacts:
-            path_str = f"  {artifact.path} [{artifact.type}]"
-            if args.no_size:
-                print(path_str)
-            else:
-                size_str = f"({format_size(artifact.size_bytes)})"
-                print(f"{path_str} {size_str}")
-                total_size += artifact.size_bytes
+    missing = [root for root in roots if not root.exists()]
+    if missing:
+        for root in missing:
+            print(f"Path does not exist: {root}")
+        return
 
-        if not args.no_size:
-            print(f"\nTotal potential space savings: {format_size(total_size)}")
+    check_arguments(parser, args, roots)
 
-    elif args.mode == "script":
-        script_remover = ScriptRemover()
-        script_remover.remove([a.path for a in sorted_artifacts])
-
-    elif args.mode == "delete":
-        direct_remover = DirectRemover()
-        result = direct_remover.remove([a.path for a in sorted_artifacts])
-
-        # Report space freed
-        if result.removed and not args.no_size:
-            freed_bytes = 0
-            # Map Path to size from our sorted_artifacts list
-            path_to_size = {a.path: a.size_bytes for a in sorted_artifacts}
-            for removed_path in result.removed:
-                freed_bytes += path_to_size.get(removed_path, 0)
-            print(f"\nTotal space freed: {format_size(freed_bytes)}")
+    index = open_index(args)
+    if args.verify_index and index is not None:
+        stale = index.verify()
+        index.close()
+        for path in stale:
+            print(f"  Stale: {path}")
+        print(f"Index {index.path}: {len(stale)} stale record(s)")
+        sys.exit(1 if stale else 0)
 
-        if not result.success:
-            sys.exit(1)
+    stats = RunStats(enabled=args.stats is not None)
+    profile = profiled(Path(args.profile)) if args.profile else contextlib.nullcontext()
+    try:
+        with profile, stats.phase("total"):
+            scan_and_act(args, roots, index, stats)
+    finally:
+        if index is not None:
+            index.close()
+        if args.stats:
+            report_stats(stats, args.stats)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+﻿"""
+Tests for the benchmark tree generator and runner.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+from benchmarks.__main__ import PHASES, run
+from benchmarks.tree import TreeSpec, generate_tree
+
+SMALL = TreeSpec(
+    node_projects=2,
+    node_depth=2,
+    node_fanout=2,
+    files_per_package=2,
+    dotnet_projects=3,
+    output_files=2,
+)
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Unit tests for the benchmark suite."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def _listing(self, root: Path) -> List[str]:
+        return sorted(
+            f"{path.relative_to(root)}:{path.lstat().st_size}"
+            for path in root.rglob("*")
+        )
+
+    def test_generated_trees_are_reproducible(self) -> None:
+        """Test that the same spec always generates the same tree."""
+        first = generate_tree(self.test_dir / "a", SMALL)
+        second = generate_tree(self.test_dir / "b", SMALL)
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            self._listing(self.test_dir / "a"), self._listing(self.test_dir / "b")
+        )
+        self.assertTrue(
+            (
+                self.test_dir
+                / "a"
+                / "web"
+                / "app1"
+                / "node_modules"
+                / "workspace-sibling"
+            ).is_symlink()
+        )
+
+    def test_run_times_every_phase(self) -> None:
+        """Test that a run finds every generated artifact and times each phase."""
+        path = os.environ.get("PATH")
+
+        results = run(SMALL, repeat=1, dotnet_startup=0, dotnet_per_project=0)
+
+        self.assertEqual(os.environ.get("PATH"), path)
+        self.assertEqual(results["artifacts_found"], results["tree"]["artifacts"])
+        self.assertEqual(set(results["phases"]), set(PHASES))
+        for phase in results["phases"].values():
+            self.assertEqual(len(phase["runs"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
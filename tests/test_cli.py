@@ -2,18 +2,45 @@
 Tests for the CLI arguments.
 """
 
+import io
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
+from typing import List, Set
+from scanner import Artifact, BaseScanner, NodeScanner, RuleScanner
 from src_clean import main
 
 
+class _OutputScanner(BaseScanner):
+    """Reports the directory out, but only once the walk is over."""
+
+    def __init__(self, out: Path) -> None:
+        self.out = out
+        self.finished = False
+
+    def visit_directory(
+        self, directory: Path, dirnames: List[str], filenames: List[str]
+    ) -> Set[Artifact]:
+        return set()
+
+    def deferred_directories(self) -> Set[Path]:
+        return set() if self.finished else {self.out}
+
+    def finish_scan(self) -> Set[Artifact]:
+        self.finished = True
+        return {Artifact(path=self.out, type="Output")}
+
+
 class TestCLI(unittest.TestCase):
     """Tests for the command-line interface."""
 
+    @patch("src_clean.stream_tree", return_value=iter([]))
     @patch("src_clean.NodeScanner")
-    @patch("src_clean.DotnetScanner")
-    @patch("src_clean.argparse.ArgumentParser.parse_args")
+    @patch("scanner.DotnetScanner")
     @patch("sys.argv", ["src_clean.py", "."])
     @patch("pathlib.Path.exists", return_value=True)
     @patch("pathlib.Path.resolve", return_value=Path("."))
@@ -21,28 +48,24 @@ class TestCLI(unittest.TestCase):
         self,
         _mock_resolve: MagicMock,
         _mock_exists: MagicMock,
-        mock_args: MagicMock,
         mock_dotnet: MagicMock,
         mock_node: MagicMock,
+        mock_stream_tree: MagicMock,
     ) -> None:
         """Test that all scanners are used by default."""
-        mock_args.return_value = MagicMock(
-            path=".", mode="dry-run", scanners=["node", "dotnet"]
-        )
-
-        # We need to mock the scan method to return an empty set to avoid further logic
-        mock_node.return_value.scan.return_value = set()
-        mock_dotnet.return_value.scan.return_value = set()
-
         with patch("builtins.print"):
             main()
 
         mock_node.assert_called_once()
         mock_dotnet.assert_called_once()
+        # Both scanners are served by one shared walk of the tree
+        mock_stream_tree.assert_called_once()
+        scanners = mock_stream_tree.call_args.args[1]
+        self.assertEqual(scanners, [mock_node.return_value, mock_dotnet.return_value])
 
+    @patch("src_clean.stream_tree", return_value=iter([]))
     @patch("src_clean.NodeScanner")
-    @patch("src_clean.DotnetScanner")
-    @patch("src_clean.argparse.ArgumentParser.parse_args")
+    @patch("scanner.DotnetScanner")
     @patch("sys.argv", ["src_clean.py", ".", "--scanners", "node"])
     @patch("pathlib.Path.exists", return_value=True)
     @patch("pathlib.Path.resolve", return_value=Path("."))
@@ -50,24 +73,22 @@ class TestCLI(unittest.TestCase):
         self,
         _mock_resolve: MagicMock,
         _mock_exists: MagicMock,
-        mock_args: MagicMock,
         mock_dotnet: MagicMock,
         mock_node: MagicMock,
+        mock_stream_tree: MagicMock,
     ) -> None:
         """Test that only the specified scanner is used."""
-        mock_args.return_value = MagicMock(path=".", mode="dry-run", scanners=["node"])
-
-        mock_node.return_value.scan.return_value = set()
-
         with patch("builtins.print"):
             main()
 
         mock_node.assert_called_once()
         mock_dotnet.assert_not_called()
+        scanners = mock_stream_tree.call_args.args[1]
+        self.assertEqual(scanners, [mock_node.return_value])
 
+    @patch("src_clean.stream_tree", return_value=iter([]))
     @patch("src_clean.NodeScanner")
-    @patch("src_clean.DotnetScanner")
-    @patch("src_clean.argparse.ArgumentParser.parse_args")
+    @patch("scanner.DotnetScanner")
     @patch("sys.argv", ["src_clean.py", ".", "--scanners", "all"])
     @patch("pathlib.Path.exists", return_value=True)
     @patch("pathlib.Path.resolve", return_value=Path("."))
@@ -75,21 +96,122 @@ class TestCLI(unittest.TestCase):
         self,
         _mock_resolve: MagicMock,
         _mock_exists: MagicMock,
-        mock_args: MagicMock,
         mock_dotnet: MagicMock,
         mock_node: MagicMock,
+        mock_stream_tree: MagicMock,
     ) -> None:
         """Test that 'all' option uses all scanners."""
-        mock_args.return_value = MagicMock(path=".", mode="dry-run", scanners=["all"])
+        with patch("builtins.print"):
+            main()
 
-        mock_node.return_value.scan.return_value = set()
-        mock_dotnet.return_value.scan.return_value = set()
+        mock_node.assert_called_once()
+        mock_dotnet.assert_called_once()
+        mock_stream_tree.assert_called_once()
 
+    @patch("src_clean.stream_tree", return_value=iter([]))
+    @patch("src_clean.NodeScanner")
+    @patch("scanner.DotnetScanner")
+    @patch("sys.argv", ["src_clean.py", ".", "--scanners", "every"])
+    @patch("pathlib.Path.exists", return_value=True)
+    @patch("pathlib.Path.resolve", return_value=Path("."))
+    def test_every_scanner_option(
+        self,
+        _mock_resolve: MagicMock,
+        _mock_exists: MagicMock,
+        mock_dotnet: MagicMock,
+        mock_node: MagicMock,
+        mock_stream_tree: MagicMock,
+    ) -> None:
+        """Test that 'every' option adds the rule-based ecosystems."""
         with patch("builtins.print"):
             main()
 
         mock_node.assert_called_once()
         mock_dotnet.assert_called_once()
+        scanners = mock_stream_tree.call_args.args[1]
+        self.assertIsInstance(scanners[2], RuleScanner)
+
+    def test_trash_then_purge(self) -> None:
+        """Test that --mode trash stages artifacts for the purge subcommand."""
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        (root / "web" / "node_modules" / "pkg").mkdir(parents=True)
+        (root / "web" / "package.json").write_text("{}", encoding="utf-8")
+
+        argv = ["src_clean.py", str(root), "--mode", "trash", "--no-purge"]
+        with patch("sys.argv", argv), patch("builtins.input", return_value="y"):
+            with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                main()
+
+        self.assertFalse((root / "web" / "node_modules").exists())
+        self.assertIn("Staged artifacts are kept in:", fake_out.getvalue())
+        self.assertTrue((root / ".src-clean-trash").is_dir())
+
+        with patch("sys.argv", ["src_clean.py", "purge", str(root)]):
+            with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                main()
+
+        self.assertIn("Purged 1 staged artifact(s).", fake_out.getvalue())
+        self.assertFalse((root / ".src-clean-trash").exists())
+        self.assertTrue((root / "web" / "package.json").exists())
+
+    def test_streamed_output_leaves_out_nested_artifacts(self) -> None:
+        """Test that unsorted modes only list the artifact reported late."""
+        root = Path(tempfile.mkdtemp()).resolve()
+        self.addCleanup(shutil.rmtree, root)
+        out = root / "out"
+        (out / "web" / "node_modules").mkdir(parents=True)
+        (out / "web" / "package.json").write_text("{}", encoding="utf-8")
+
+        for options in (
+            ["--mode", "script", "--jobs", "2"],
+            ["--mode", "dry-run"],
+            ["--format", "ndjson"],
+        ):
+            with self.subTest(options=options):
+                argv = ["src_clean.py", str(root), *options]
+                scanners = [NodeScanner(), _OutputScanner(out)]
+                with (
+                    patch("sys.argv", argv),
+                    patch("src_clean.build_scanners", return_value=scanners),
+                    patch("sys.stdout", new=io.StringIO()) as fake_out,
+                ):
+                    main()
+                self.assertIn(str(out), fake_out.getvalue())
+                self.assertNotIn("node_modules", fake_out.getvalue())
+
+    def test_node_scan_imports_only_what_it_needs(self) -> None:
+        """Test that a node-only scan loads no .NET, rule, index or daemon code."""
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        code = (
+            "import sys, src_clean\n"
+            f"sys.argv = ['src_clean.py', {str(root)!r}, '--scanners', 'node']\n"
+            "src_clean.main()\n"
+            "print(' '.join(sorted(sys.modules)))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent.parent,
+        )
+        modules = set(result.stdout.splitlines()[-1].split())
+        self.assertIn("scanner.node", modules)
+        unwanted = [
+            "scanner.dotnet",
+            "scanner.dotnet_sdk",
+            "scanner.rules",
+            "scanner.index",
+            "subprocess",
+            "sqlite3",
+            "xml.sax",
+            "ctypes",
+            "watch",
+        ]
+        for module in unwanted:
+            self.assertNotIn(module, modules)
 
 
 if __name__ == "__main__":
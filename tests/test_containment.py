@@ -0,0 +1,99 @@
+﻿"""
+Tests for keeping only top-level artifacts.
+"""
+
+import unittest
+from pathlib import Path
+
+from scanner.base_scanner import Artifact
+from scanner.containment import PathTrie, collapse
+from scanner.sizing import DiskUsage
+
+
+class TestPathTrie(unittest.TestCase):
+    """Unit tests for PathTrie."""
+
+    def test_refuses_paths_inside_members(self) -> None:
+        """Test that a path inside a member is not added."""
+        trie = PathTrie()
+        self.assertEqual(trie.add(Path("/r/app/node_modules")), [])
+
+        self.assertIsNone(trie.add(Path("/r/app/node_modules/pkg/node_modules")))
+        self.assertIsNone(trie.add(Path("/r/app/node_modules")))
+        self.assertIn(Path("/r/app/node_modules"), trie)
+        self.assertNotIn(Path("/r/app/node_modules/pkg/node_modules"), trie)
+        self.assertTrue(trie.covers(Path("/r/app/node_modules/pkg")))
+        self.assertFalse(trie.covers(Path("/r/app")))
+
+    def test_replaces_members_inside_a_new_path(self) -> None:
+        """Test that adding a parent of members replaces them."""
+        trie = PathTrie()
+        trie.add(Path("/r/a/bin/obj"))
+        trie.add(Path("/r/a/bin/x/y"))
+        trie.add(Path("/r/b/obj"))
+
+        self.assertEqual(
+            sorted(trie.add(Path("/r/a/bin")) or []),
+            [Path("/r/a/bin/obj"), Path("/r/a/bin/x/y")],
+        )
+        self.assertIn(Path("/r/a/bin"), trie)
+        self.assertNotIn(Path("/r/a/bin/obj"), trie)
+        self.assertIn(Path("/r/b/obj"), trie)
+
+
+class TestCollapse(unittest.TestCase):
+    """Unit tests for collapse."""
+
+    def test_keeps_top_level_artifacts_sorted(self) -> None:
+        """Test that nested artifacts are dropped, without adding their sizes."""
+        artifacts = [
+            Artifact(Path("/r/b/node_modules/x/node_modules"), "node", 5),
+            Artifact(Path("/r/b/node_modules"), "node", 50),
+            Artifact(Path("/r/a-b/node_modules"), "node", 7),
+            Artifact(Path("/r/a/node_modules"), "node", 3),
+            Artifact(Path("/r/a/node_modules"), "node", 3),
+        ]
+
+        self.assertEqual(
+            [(a.path, a.size_bytes) for a in collapse(artifacts)],
+            [
+                (Path("/r/a/node_modules"), 3),
+                (Path("/r/a-b/node_modules"), 7),
+                (Path("/r/b/node_modules"), 50),
+            ],
+        )
+
+    def test_adds_sizes_measured_apart(self) -> None:
+        """Test that sizes left out of the outer artifact are attributed to it."""
+        outer = Path("/r/out")
+        artifacts = [
+            Artifact(
+                outer,
+                ".NET",
+                5,
+                4,
+                nested=frozenset({outer / "a" / "obj", outer / "b"}),
+            ),
+            Artifact(outer / "a" / "obj", ".NET", 10, 8),
+            Artifact(
+                outer / "b",
+                ".NET",
+                20,
+                16,
+                size_error=DiskUsage(2, 1),
+                nested=frozenset({outer / "b" / "c"}),
+            ),
+            Artifact(outer / "b" / "c", ".NET", 1, 1),
+            Artifact(outer / "b" / "d", ".NET", 100, 100),
+        ]
+
+        (top,) = collapse(artifacts)
+
+        self.assertEqual(top.path, outer)
+        self.assertEqual((top.size_bytes, top.reclaimable_bytes), (36, 29))
+        self.assertEqual(top.size_error, DiskUsage(2, 1))
+        self.assertEqual(top.nested, frozenset())
+
+
+if __name__ == "__main__":
+    unittest.main()
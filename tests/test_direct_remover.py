@@ -93,6 +93,22 @@ class TestDirectRemover(unittest.TestCase):
         self.assertIn(self.file1, result.failed)
         self.assertTrue(self.file1.exists())
 
+    def test_remove_continues_after_error(self) -> None:
+        """Test that one failing artifact does not stop the others."""
+        (self.dir1 / "nested").mkdir()
+        (self.dir1 / "nested" / "file.txt").touch()
+        missing = self.test_dir / "missing"
+        artifacts = [missing, self.dir1, self.file1]
+        with patch("builtins.input", side_effect=["y", "y", "y"]):
+            with patch("builtins.print"):
+                result = DirectRemover(jobs=2).remove(artifacts)
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.failed, [missing])
+        self.assertEqual(result.removed, [self.dir1, self.file1])
+        self.assertFalse(self.dir1.exists())
+        self.assertFalse(self.file1.exists())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,91 @@
+﻿"""
+Tests for the dotnet property cache.
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanner.dotnet_cache import DotnetPropertyCache
+
+
+class TestDotnetPropertyCache(unittest.TestCase):
+    """Unit tests for DotnetPropertyCache."""
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache_file = self.temp_dir / "cache.json"
+        self.project = self.temp_dir / "src" / "app" / "app.csproj"
+        self.project.parent.mkdir(parents=True)
+        self.project.write_text("<Project />", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_entries_persist_across_instances(self) -> None:
+        """Test that saved entries are loaded by a new cache."""
+        cache = DotnetPropertyCache(self.cache_file)
+        key = cache.key(self.project, "8.0.100")
+        assert key is not None
+        cache.put(key, {"BaseOutputPath": "bin/"})
+        cache.save()
+
+        reloaded = DotnetPropertyCache(self.cache_file)
+
+        self.assertEqual(reloaded.get(key), {"BaseOutputPath": "bin/"})
+
+    def test_hits_do_not_rewrite_the_cache(self) -> None:
+        """Test that a cache only read from is not saved again."""
+        cache = DotnetPropertyCache(self.cache_file)
+        cache.put("a", {})
+        cache.save()
+        reloaded = DotnetPropertyCache(self.cache_file)
+        self.cache_file.unlink()
+
+        self.assertEqual(reloaded.get("a"), {})
+        reloaded.save()
+
+        self.assertFalse(self.cache_file.exists())
+
+    def test_unwritable_cache_is_not_an_error(self) -> None:
+        """Test that a cache directory that cannot be created is skipped."""
+        not_a_directory = self.temp_dir / "file"
+        not_a_directory.write_text("", encoding="utf-8")
+        cache = DotnetPropertyCache(not_a_directory / "cache.json")
+        cache.put("a", {})
+
+        cache.save()
+
+        self.assertEqual(cache.get("a"), {})
+
+    def test_key_depends_on_inputs(self) -> None:
+        """Test that the key changes with the SDK and evaluation inputs."""
+        key = DotnetPropertyCache(self.cache_file).key(self.project, "8.0.100")
+
+        self.assertNotEqual(
+            key, DotnetPropertyCache(self.cache_file).key(self.project, "9.0.100")
+        )
+        (self.temp_dir / "src" / "global.json").write_text("{}", encoding="utf-8")
+        self.assertNotEqual(
+            key, DotnetPropertyCache(self.cache_file).key(self.project, "8.0.100")
+        )
+        self.assertIsNone(
+            DotnetPropertyCache(self.cache_file).key(self.temp_dir / "missing", "")
+        )
+
+    def test_least_recently_used_entries_are_evicted(self) -> None:
+        """Test that the cache keeps at most max_entries entries."""
+        cache = DotnetPropertyCache(self.cache_file, max_entries=2)
+        cache.put("a", {})
+        cache.put("b", {})
+        cache.get("a")
+        cache.put("c", {})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {})
+        self.assertEqual(cache.get("c"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
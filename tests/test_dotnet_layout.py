@@ -0,0 +1,147 @@
+﻿"""
+Tests for solution parsing and shared .NET output layouts.
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanner.dotnet_layout import (
+    LayoutGroup,
+    LayoutKeys,
+    OutputLayout,
+    solution_projects,
+)
+
+
+class TestSolutionProjects(unittest.TestCase):
+    """Unit tests for solution_projects."""
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_sln(self) -> None:
+        """Test that .sln projects are listed and solution folders skipped."""
+        solution = self.temp_dir / "all.sln"
+        solution.write_text(
+            "\ufeff\nMicrosoft Visual Studio Solution File, Format Version 12.00\n"
+            'Project("{2150E333-8FDC-42A3-9474-1A3956D46DE8}") = "src", "src", '
+            '"{00000000-0000-0000-0000-000000000001}"\nEndProject\n'
+            'Project("{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}") = "App", '
+            '"src\\App\\App.csproj", "{00000000-0000-0000-0000-000000000002}"\n'
+            "EndProject\n",
+            encoding="utf-8",
+        )
+
+        self.assertEqual(
+            solution_projects(solution),
+            [self.temp_dir / "src", self.temp_dir / "src" / "App" / "App.csproj"],
+        )
+
+    def test_slnx(self) -> None:
+        """Test that .slnx projects are listed, including those in folders."""
+        solution = self.temp_dir / "build" / "all.slnx"
+        solution.parent.mkdir()
+        solution.write_text(
+            "<Solution>"
+            '<Folder Name="/src/"><Project Path="../src/App/App.csproj" /></Folder>'
+            '<Project Path="Tool/Tool.fsproj" />'
+            "</Solution>",
+            encoding="utf-8",
+        )
+
+        self.assertEqual(
+            solution_projects(solution),
+            [
+                self.temp_dir / "src" / "App" / "App.csproj",
+                self.temp_dir / "build" / "Tool" / "Tool.fsproj",
+            ],
+        )
+
+    def test_unreadable_solution(self) -> None:
+        """Test that a missing or malformed solution lists nothing."""
+        broken = self.temp_dir / "broken.slnx"
+        broken.write_text("<Solution>", encoding="utf-8")
+
+        self.assertEqual(solution_projects(broken), [])
+        self.assertEqual(solution_projects(self.temp_dir / "missing.sln"), [])
+
+
+class TestLayouts(unittest.TestCase):
+    """Unit tests for LayoutKeys, OutputLayout and LayoutGroup."""
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.projects = []
+        for name in ["app", "lib"]:
+            project = self.temp_dir / "src" / name / f"{name}.csproj"
+            project.parent.mkdir(parents=True)
+            project.write_text('<Project Sdk="Microsoft.NET.Sdk" />', encoding="utf-8")
+            self.projects.append(project)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_no_key_without_shared_settings(self) -> None:
+        """Test that projects with default outputs are not grouped."""
+        (self.temp_dir / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup><Nullable>enable</Nullable>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+
+        self.assertIsNone(LayoutKeys().key(self.projects[0]))
+
+    def test_shared_settings_group_projects(self) -> None:
+        """Test that a Directory.Build.props moving outputs groups projects."""
+        (self.temp_dir / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup><UseArtifactsOutput>true</UseArtifactsOutput>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+        keys = LayoutKeys()
+
+        key = keys.key(self.projects[0])
+        self.assertIsNotNone(key)
+        self.assertEqual(keys.key(self.projects[1]), key)
+
+        self.projects[1].write_text(
+            '<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup>'
+            "<OutputPath>out/</OutputPath></PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+        self.assertIsNone(keys.key(self.projects[1]))
+
+    def test_layout_moves_with_the_project(self) -> None:
+        """Test that relative outputs follow the project and shared ones stay."""
+        app_dir = self.projects[0].parent
+        lib_dir = self.projects[1].parent
+        shared = self.temp_dir / "artifacts"
+        layout = OutputLayout.of(app_dir, {app_dir / "obj", shared})
+
+        self.assertEqual(layout.paths(lib_dir), {lib_dir / "obj", shared})
+
+    def test_group_needs_agreeing_samples(self) -> None:
+        """Test that a group's layout is only known once its samples agree."""
+        app = self.projects[0]
+        lib = self.projects[1]
+        shared = OutputLayout.of(app.parent, {self.temp_dir / "artifacts"})
+        group = LayoutGroup()
+        group.samples.extend([app, lib])
+        self.assertFalse(group.wants_sample())
+
+        group.record(app, shared)
+        self.assertIsNone(group.layout)
+        group.record(lib, shared)
+        self.assertEqual(group.layout, shared)
+
+        group.record(lib, OutputLayout.of(lib.parent, {lib.parent / "bin"}))
+        self.assertIsNone(group.layout)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,16 +2,23 @@
 Tests for the DotnetScanner class.
 """
 
+import io
 import json
+import os
 import shutil
 import subprocess
+import sys
 import tempfile
 import unittest
 from pathlib import Path
-from typing import Any, Tuple
+from typing import Any, Dict, List, Set, Tuple
 from unittest.mock import patch
 
-from scanner.dotnet import DotnetScanner
+from scanner.dotnet import BATCH_SIZE, DotnetScanner
+from scanner.dotnet_cache import DotnetPropertyCache
+from scanner.node import NodeScanner
+from scanner.stats import RunStats
+from scanner.walker import iter_artifacts
 
 
 class TestDotnetScanner(unittest.TestCase):
@@ -67,7 +74,7 @@ class TestDotnetScanner(unittest.TestCase):
             bin_dir.mkdir(parents=True, exist_ok=True)
             obj_dir.mkdir(parents=True, exist_ok=True)
 
-            scanner = DotnetScanner()
+            scanner = DotnetScanner(evaluation="msbuild")
             artifacts = scanner.scan(self.temp_dir)
             paths = {a.path for a in artifacts}
             self.assertIn(bin_dir, paths)
@@ -100,10 +107,387 @@ class TestDotnetScanner(unittest.TestCase):
 
         with patch("subprocess.run", side_effect=fake_run):
             # Do NOT create bin/ or obj/ directories
-            scanner = DotnetScanner()
+            scanner = DotnetScanner(evaluation="msbuild")
             artifacts = scanner.scan(self.temp_dir)
             self.assertEqual(artifacts, set())
 
 
+# A stand-in for the dotnet CLI. It answers --version, single-project
+# -getProperty calls and batched -getItem calls, logging every invocation.
+# FAKE_DOTNET_PATHS overrides the reported paths; @NAME@ is the project name.
+# --version reports the SDK pinned by a global.json above the working directory.
+FAKE_DOTNET = """#!{python}
+import json, os, sys, time
+import xml.etree.ElementTree as ET
+
+with open(os.environ["FAKE_DOTNET_LOG"], "a", encoding="utf-8") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+
+args = sys.argv[1:]
+if args == ["--version"]:
+    version = "8.0.100"
+    directory = os.getcwd()
+    while True:
+        if os.path.isfile(os.path.join(directory, "global.json")):
+            with open(os.path.join(directory, "global.json"), encoding="utf-8") as f:
+                version = json.load(f)["sdk"]["version"]
+            break
+        if os.path.dirname(directory) == directory:
+            break
+        directory = os.path.dirname(directory)
+    print(version)
+    sys.exit(0)
+
+broken = os.environ.get("FAKE_DOTNET_BROKEN", "")
+default = '{{"BaseOutputPath": "bin/", "BaseIntermediateOutputPath": "obj/"}}'
+paths = json.loads(os.environ.get("FAKE_DOTNET_PATHS", default))
+
+def project_paths(project):
+    name = os.path.splitext(os.path.basename(project))[0]
+    return {{key: value.replace("@NAME@", name) for key, value in paths.items()}}
+
+if any(a.startswith("-getItem:") for a in args):
+    if os.environ.get("FAKE_DOTNET_FAIL_BATCH"):
+        sys.exit(1)
+    root = ET.parse(args[1]).getroot()
+    items = []
+    for item in root.iter("_SrcCleanProject"):
+        project = item.get("Include")
+        if broken and project.endswith(broken):
+            continue
+        items.append(dict(Identity=project, **project_paths(project)))
+    print(json.dumps({{"Items": {{"SrcCleanResult": items}}}}))
+    sys.exit(0)
+
+if broken and args[1].endswith(broken) and os.environ.get("FAKE_DOTNET_FAIL"):
+    if os.environ.get("FAKE_DOTNET_HANG"):
+        time.sleep(30)
+    print("error MSB4025: The project file could not be loaded.")
+    sys.exit(1)
+print(json.dumps({{"Properties": project_paths(args[1])}}))
+"""
+
+
+class TestDotnetBatchEvaluation(unittest.TestCase):
+    """Tests for batched msbuild evaluation using a fake dotnet on PATH."""
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        bin_dir = self.temp_dir / "fake-bin"
+        bin_dir.mkdir()
+        dotnet = bin_dir / "dotnet"
+        dotnet.write_text(FAKE_DOTNET.format(python=sys.executable), encoding="utf-8")
+        dotnet.chmod(0o755)
+        self.dotnet = dotnet
+        self.log = self.temp_dir / "dotnet.log"
+        self.env = patch.dict(
+            os.environ,
+            {
+                "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+                "FAKE_DOTNET_LOG": str(self.log),
+            },
+        )
+        self.env.start()
+
+        self.expected = set()
+        for name in ["app", "lib", "tests"]:
+            proj_dir = self.temp_dir / "src" / name
+            (proj_dir / "bin").mkdir(parents=True)
+            (proj_dir / "obj").mkdir()
+            (proj_dir / f"{name}.csproj").write_text("<Project />", encoding="utf-8")
+            self.expected.update({proj_dir / "bin", proj_dir / "obj"})
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def _calls(self) -> List[str]:
+        if not self.log.exists():
+            return []
+        return self.log.read_text(encoding="utf-8").splitlines()
+
+    def _msbuild_calls(self) -> List[str]:
+        return [line for line in self._calls() if line.startswith("msbuild")]
+
+    def test_evaluates_all_projects_in_one_call(self) -> None:
+        """Test that several projects are evaluated by a single msbuild run."""
+        artifacts = DotnetScanner().scan(self.temp_dir / "src")
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        calls = self._msbuild_calls()
+        self.assertEqual(len(calls), 1)
+        self.assertIn("-getItem:SrcCleanResult", calls[0])
+
+    def test_falls_back_for_projects_missing_from_batch(self) -> None:
+        """Test that a project the batch could not evaluate is retried alone."""
+        with patch.dict(os.environ, {"FAKE_DOTNET_BROKEN": "lib.csproj"}):
+            artifacts = DotnetScanner().scan(self.temp_dir / "src")
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        calls = self._msbuild_calls()
+        self.assertEqual(len(calls), 2)
+        self.assertIn("lib.csproj -getProperty:", calls[1])
+
+    def test_falls_back_when_batch_fails(self) -> None:
+        """Test that every project is evaluated alone if the batch fails."""
+        with patch.dict(os.environ, {"FAKE_DOTNET_FAIL_BATCH": "1"}):
+            artifacts = DotnetScanner().scan(self.temp_dir / "src")
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        self.assertEqual(len(self._msbuild_calls()), 4)
+
+    def test_artifacts_inside_pending_outputs_are_dropped(self) -> None:
+        """Test that what the walk finds in outputs msbuild reports is dropped."""
+        web = self.temp_dir / "src" / "app" / "bin" / "web"
+        (web / "node_modules").mkdir(parents=True)
+        (web / "package.json").write_text("{}", encoding="utf-8")
+
+        stats = RunStats()
+        artifacts = list(
+            iter_artifacts(
+                self.temp_dir / "src", [NodeScanner(), DotnetScanner()], stats=stats
+            )
+        )
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        self.assertEqual(len(artifacts), len(self.expected))
+        self.assertEqual(stats.as_dict()["counters"]["artifacts_nested"], 1)
+
+    def test_other_artifacts_stream_while_projects_are_pending(self) -> None:
+        """Test that only artifacts below pending projects are held back."""
+        web = self.temp_dir / "web"
+        (web / "node_modules").mkdir(parents=True)
+        (web / "package.json").write_text("{}", encoding="utf-8")
+
+        yielded: Dict[Path, List[str]] = {}
+        for artifact in iter_artifacts(self.temp_dir, [NodeScanner(), DotnetScanner()]):
+            yielded[artifact.path] = self._msbuild_calls()
+
+        self.assertEqual(set(yielded), self.expected | {web / "node_modules"})
+        # Reported before the pending projects were handed to msbuild
+        self.assertEqual(yielded[web / "node_modules"], [])
+
+    def test_cached_results_skip_msbuild(self) -> None:
+        """Test that a warm cache evaluates no project with msbuild."""
+        cache_file = self.temp_dir / "cache.json"
+        DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(self.temp_dir / "src")
+        self.log.unlink()
+
+        artifacts = DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(
+            self.temp_dir / "src"
+        )
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        self.assertEqual(self._msbuild_calls(), [])
+
+    def test_cache_invalidated_by_directory_build_props(self) -> None:
+        """Test that editing an evaluation input re-evaluates the project."""
+        cache_file = self.temp_dir / "cache.json"
+        DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(self.temp_dir / "src")
+        self.log.unlink()
+        (self.temp_dir / "src" / "lib" / "Directory.Build.props").write_text(
+            "<Project />", encoding="utf-8"
+        )
+
+        DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(self.temp_dir / "src")
+
+        calls = self._msbuild_calls()
+        self.assertEqual(len(calls), 1)
+        self.assertIn("lib.csproj", calls[0])
+
+    def _broken_lib_scan(self, **kwargs: Any) -> Tuple[Set[Path], str]:
+        """Scan with lib.csproj failing in the batch and on its own."""
+        with patch("sys.stderr", new=io.StringIO()) as fake_err:
+            artifacts = DotnetScanner(**kwargs).scan(self.temp_dir / "src")
+        return {a.path for a in artifacts}, fake_err.getvalue()
+
+    def test_broken_project_does_not_abort_scan(self) -> None:
+        """Test that a project msbuild cannot evaluate is skipped with a warning."""
+        env = {"FAKE_DOTNET_BROKEN": "lib.csproj", "FAKE_DOTNET_FAIL": "1"}
+        with patch.dict(os.environ, env):
+            paths, warnings = self._broken_lib_scan()
+
+        src = self.temp_dir / "src"
+        self.assertEqual(
+            paths,
+            {src / "app" / "bin", src / "app" / "obj"}
+            | {src / "tests" / "bin", src / "tests" / "obj"},
+        )
+        self.assertIn("lib.csproj", warnings)
+        self.assertIn("exited with code 1", warnings)
+
+    def test_hanging_project_times_out(self) -> None:
+        """Test that a project exceeding the timeout is skipped with a warning."""
+        env = {
+            "FAKE_DOTNET_BROKEN": "lib.csproj",
+            "FAKE_DOTNET_FAIL": "1",
+            "FAKE_DOTNET_HANG": "1",
+        }
+        with patch.dict(os.environ, env):
+            paths, warnings = self._broken_lib_scan(timeout=1)
+
+        self.assertEqual(len(paths), 4)
+        self.assertIn("lib.csproj: timed out after 1s", warnings)
+
+    def test_batches_spread_over_jobs(self) -> None:
+        """Test that many projects are split into batches for the worker pool."""
+        for i in range(2 * BATCH_SIZE):
+            proj_dir = self.temp_dir / "src" / f"extra{i}"
+            (proj_dir / "bin").mkdir(parents=True)
+            (proj_dir / f"extra{i}.csproj").write_text("<Project />", encoding="utf-8")
+            self.expected.add(proj_dir / "bin")
+
+        artifacts = DotnetScanner(jobs=4).scan(self.temp_dir / "src")
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        calls = self._msbuild_calls()
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(all("-getItem:SrcCleanResult" in c for c in calls))
+
+    def test_sdk_probed_only_when_needed(self) -> None:
+        """Test that no dotnet process starts unless a project needs the SDK."""
+        empty = self.temp_dir / "empty"
+        (empty / "node_modules").mkdir(parents=True)
+        static = self.temp_dir / "static"
+        static.mkdir()
+        (static / "static.csproj").write_text(
+            '<Project Sdk="Microsoft.NET.Sdk"></Project>', encoding="utf-8"
+        )
+        (static / "bin").mkdir()
+
+        DotnetScanner().scan(empty)
+        artifacts = DotnetScanner().scan(static)
+
+        self.assertEqual({a.path for a in artifacts}, {static / "bin"})
+        self.assertEqual(self._calls(), [])
+
+    def test_sdk_probe_cached(self) -> None:
+        """Test that the SDK probe is reused until the dotnet binary changes."""
+        cache_file = self.temp_dir / "cache.json"
+        DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(self.temp_dir / "src")
+        self.assertIn("--version", self._calls())
+        self.assertTrue((self.temp_dir / "dotnet-sdk.json").exists())
+        self.log.unlink()
+
+        # Re-evaluate a project, so the SDK is needed again
+        (self.temp_dir / "src" / "lib" / "Directory.Build.props").write_text(
+            "<Project />", encoding="utf-8"
+        )
+        DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(self.temp_dir / "src")
+        self.assertNotIn("--version", self._calls())
+        self.assertEqual(len(self._msbuild_calls()), 1)
+
+        stat = self.dotnet.stat()
+        os.utime(self.dotnet, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        (self.temp_dir / "src" / "lib" / "Directory.Build.props").unlink()
+        DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(self.temp_dir / "src")
+        self.assertIn("--version", self._calls())
+
+    def test_sdk_probed_per_global_json(self) -> None:
+        """Test that trees pinning different SDKs are probed separately."""
+        src = self.temp_dir / "src"
+        for name, version in [("app", "8.0.100"), ("lib", "9.0.100")]:
+            (src / name / "global.json").write_text(
+                json.dumps({"sdk": {"version": version}}), encoding="utf-8"
+            )
+        cache_file = self.temp_dir / "cache.json"
+
+        artifacts = DotnetScanner(cache=DotnetPropertyCache(cache_file)).scan(src)
+
+        self.assertEqual({a.path for a in artifacts}, self.expected)
+        self.assertEqual(self._calls().count("--version"), 3)
+        # One batch per global.json, so each runs the SDK its projects pin
+        self.assertEqual(len(self._msbuild_calls()), 3)
+        data = json.loads(
+            (self.temp_dir / "dotnet-sdk.json").read_text(encoding="utf-8")
+        )
+        self.assertCountEqual(
+            [entry["version"] for entry in data["entries"].values()],
+            ["8.0.100", "9.0.100", "8.0.100"],
+        )
+
+    def _shared_layout(self, paths: Dict[str, str], extra: int = 0) -> Path:
+        """Move the outputs of every project with a Directory.Build.props."""
+        src = self.temp_dir / "src"
+        (src / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup>"
+            "<ArtifactsPath>$(MSBuildThisFileDirectory)artifacts</ArtifactsPath>"
+            "<UseArtifactsOutput>true</UseArtifactsOutput>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+        for i in range(extra):
+            proj_dir = src / f"extra{i}"
+            proj_dir.mkdir()
+            (proj_dir / f"extra{i}.csproj").write_text("<Project />", encoding="utf-8")
+        # Restored with the rest of the environment by tearDown
+        os.environ["FAKE_DOTNET_PATHS"] = json.dumps(paths)
+        return src
+
+    def test_shared_artifacts_path_evaluates_samples_only(self) -> None:
+        """Test that projects sharing an ArtifactsPath are evaluated only twice."""
+        src = self.temp_dir / "src"
+        artifacts_dir = src / "artifacts"
+        (artifacts_dir / "bin" / "app").mkdir(parents=True)
+        self._shared_layout(
+            {
+                "ArtifactsPath": f"{artifacts_dir}/",
+                "UseArtifactsOutput": "true",
+                "BaseOutputPath": f"{artifacts_dir}/bin/@NAME@/",
+                "BaseIntermediateOutputPath": f"{artifacts_dir}/obj/@NAME@/",
+            },
+            extra=3 * BATCH_SIZE,
+        )
+
+        stats = RunStats()
+        artifacts = DotnetScanner(stats=stats).scan(src)
+
+        self.assertEqual({a.path for a in artifacts}, {artifacts_dir})
+        self.assertEqual(len(self._msbuild_calls()), 1)
+        counters = stats.as_dict()["counters"]
+        self.assertEqual(counters["projects_resolved_by_layout"], 1 + 3 * BATCH_SIZE)
+
+    def test_disagreeing_samples_evaluate_every_project(self) -> None:
+        """Test that a layout depending on the project is not shared."""
+        src = self.temp_dir / "src"
+        expected = {src / "out" / name for name in ["app", "lib", "tests"]}
+        for path in expected:
+            path.mkdir(parents=True)
+        self._shared_layout({"BaseOutputPath": f"{src}/out/@NAME@/"})
+
+        artifacts = DotnetScanner().scan(src)
+
+        self.assertEqual({a.path for a in artifacts}, expected)
+        self.assertEqual(len(self._msbuild_calls()), 2)
+
+    def test_solution_projects_respect_exclusions(self) -> None:
+        """Test that projects read from a solution are only reported if walked."""
+        src = self.temp_dir / "src"
+        (src / "all.sln").write_text(
+            'Project("{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}") = "app", '
+            '"app\\app.csproj", "{11111111-1111-1111-1111-111111111111}"\n'
+            "EndProject\n"
+            'Project("{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}") = "lib", '
+            '"lib\\lib.csproj", "{22222222-2222-2222-2222-222222222222}"\n'
+            "EndProject\n",
+            encoding="utf-8",
+        )
+
+        stats = RunStats()
+        scanner = DotnetScanner(stats=stats)
+        artifacts = list(iter_artifacts(src, [scanner], stats=stats, exclude=["lib"]))
+
+        self.assertEqual(
+            {a.path for a in artifacts},
+            {src / name / sub for name in ["app", "tests"] for sub in ["bin", "obj"]},
+        )
+        self.assertEqual(stats.as_dict()["counters"]["solutions_read"], 1)
+
+    def test_rejects_invalid_jobs(self) -> None:
+        """Test that a job count below one is rejected."""
+        with self.assertRaises(ValueError):
+            DotnetScanner(jobs=0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,154 @@
+﻿"""
+Tests for ignore files and exclude patterns.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Set
+from unittest.mock import patch
+
+from scanner import NodeScanner, RunStats, scan_tree
+from scanner.ignore import IGNORE_FILE, IgnoreMatcher, IgnoreRules
+from scanner.walker import walk
+from src_clean import main
+
+
+class TestIgnore(unittest.TestCase):
+    """Unit tests for IgnoreRules, IgnoreMatcher and pruning in the walk."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp()).resolve()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def _ignored(self, patterns: List[str], relative: str) -> bool:
+        matcher = IgnoreMatcher().child(IgnoreRules(self.test_dir, patterns))
+        return matcher.ignores(self.test_dir / relative)
+
+    def _walked(self, exclude: List[str]) -> Set[str]:
+        return {
+            directory.relative_to(self.test_dir).as_posix()
+            for directory, _, _ in walk(self.test_dir, exclude=exclude)
+        }
+
+    def _tree(self, *directories: str) -> None:
+        for directory in directories:
+            (self.test_dir / directory).mkdir(parents=True)
+
+    def test_unanchored_patterns_match_at_any_depth(self) -> None:
+        """A pattern without a slash matches a directory name anywhere."""
+        self.assertTrue(self._ignored(["data"], "data"))
+        self.assertTrue(self._ignored(["data/"], "a/b/data"))
+        self.assertTrue(self._ignored(["*.cache"], "a/x.cache"))
+        self.assertFalse(self._ignored(["data"], "database"))
+
+    def test_anchored_patterns(self) -> None:
+        """A slash at the start or in the middle anchors the pattern."""
+        self.assertTrue(self._ignored(["/vendor"], "vendor"))
+        self.assertFalse(self._ignored(["/vendor"], "lib/vendor"))
+        self.assertTrue(self._ignored(["lib/vendor"], "lib/vendor"))
+        self.assertFalse(self._ignored(["lib/vendor"], "src/lib/vendor"))
+        self.assertFalse(self._ignored(["lib/*"], "lib/a/b"))
+
+    def test_double_star(self) -> None:
+        """** matches any number of directories."""
+        self.assertTrue(self._ignored(["**/fixtures"], "fixtures"))
+        self.assertTrue(self._ignored(["**/fixtures"], "a/b/fixtures"))
+        self.assertTrue(self._ignored(["a/**/z"], "a/z"))
+        self.assertTrue(self._ignored(["a/**/z"], "a/b/c/z"))
+        self.assertTrue(self._ignored(["a/**"], "a/b/c"))
+
+    def test_character_classes_and_escapes(self) -> None:
+        """Classes, negated classes, ? and escapes follow gitignore."""
+        self.assertTrue(self._ignored(["run[0-9]"], "run7"))
+        self.assertFalse(self._ignored(["run[!0-9]"], "run7"))
+        self.assertTrue(self._ignored(["ru?"], "run"))
+        self.assertTrue(self._ignored(["\\#notes"], "#notes"))
+        self.assertTrue(self._ignored(["\\!keep"], "!keep"))
+
+    def test_comments_blank_lines_and_negation(self) -> None:
+        """The last matching pattern wins, and ! re-includes."""
+        patterns = ["# comment", "", "data*", "!data-small", "   "]
+        self.assertTrue(self._ignored(patterns, "data-big"))
+        self.assertFalse(self._ignored(patterns, "data-small"))
+        self.assertTrue(self._ignored(patterns + ["data-small"], "data-small"))
+
+    def test_exclude_prunes_before_listing(self) -> None:
+        """Excluded directories are never listed."""
+        self._tree("datasets/big/inner", "src/datasets", "src/app")
+        with patch("os.scandir", wraps=os.scandir) as scandir:
+            walked = self._walked(["datasets"])
+        self.assertEqual(walked, {".", "src", "src/app"})
+        listed = [call.args[0] for call in scandir.call_args_list]
+        self.assertNotIn(self.test_dir / "datasets", listed)
+        self.assertIn(self.test_dir / "src", listed)
+
+    def test_nested_ignore_files(self) -> None:
+        """Ignore files apply below their directory; deeper ones win."""
+        self._tree("a/cache", "a/b/cache", "a/b/keep", "c/cache")
+        (self.test_dir / "a" / IGNORE_FILE).write_text(
+            "cache\nkeep\n", encoding="utf-8"
+        )
+        (self.test_dir / "a" / "b" / IGNORE_FILE).write_text(
+            "!keep\n", encoding="utf-8"
+        )
+        self.assertEqual(
+            self._walked([]), {".", "a", "a/b", "a/b/keep", "c", "c/cache"}
+        )
+
+    def test_excluded_artifacts_are_not_reported(self) -> None:
+        """Artifacts in excluded directories are not found."""
+        for name in ("app", "vendor/lib"):
+            (self.test_dir / name / "node_modules").mkdir(parents=True)
+            (self.test_dir / name / "package.json").write_text("{}", encoding="utf-8")
+        (self.test_dir / IGNORE_FILE).write_text("/vendor/\n", encoding="utf-8")
+
+        artifacts = scan_tree(self.test_dir, [NodeScanner()], calculate_size=False)
+        self.assertEqual(
+            [a.path for a in artifacts], [self.test_dir / "app" / "node_modules"]
+        )
+
+    def test_cli_exclude(self) -> None:
+        """--exclude patterns are applied below every path."""
+        self._tree("app/node_modules", "big/node_modules")
+        for name in ("app", "big"):
+            (self.test_dir / name / "package.json").write_text("{}", encoding="utf-8")
+        argv = ["src_clean.py", str(self.test_dir), "--scanners", "node"]
+        argv += ["--exclude", "big", "--mode", "script"]
+        stdout = io.StringIO()
+        with patch("sys.argv", argv), patch("sys.stdout", stdout):
+            main()
+        self.assertIn("app", stdout.getvalue())
+        self.assertNotIn("big", stdout.getvalue())
+
+    def test_cli_applies_ignore_files_above_the_path(self) -> None:
+        """An ignore file above a scanned path prunes the walk below it."""
+        self._tree("repo/app/node_modules", "repo/data/node_modules")
+        for name in ("app", "data"):
+            (self.test_dir / "repo" / name / "package.json").write_text(
+                "{}", encoding="utf-8"
+            )
+        (self.test_dir / IGNORE_FILE).write_text("/repo/data/\n", encoding="utf-8")
+        argv = ["src_clean.py", str(self.test_dir / "repo"), "--scanners", "node"]
+        argv += ["--mode", "script"]
+        stdout = io.StringIO()
+        with patch("sys.argv", argv), patch("sys.stdout", stdout):
+            main()
+        self.assertIn("app", stdout.getvalue())
+        self.assertNotIn("data", stdout.getvalue())
+
+    def test_excluded_directories_are_counted(self) -> None:
+        """The walk reports how many directories it pruned."""
+        self._tree("one", "two", "three")
+        stats = RunStats()
+        list(walk(self.test_dir, stats=stats, exclude=["t*"]))
+        self.assertEqual(stats.as_dict()["counters"]["directories_excluded"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
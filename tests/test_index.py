@@ -0,0 +1,135 @@
+﻿"""
+Tests for the persistent scan index.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any, List
+from unittest.mock import patch
+
+from scanner.index import ScanIndex
+from scanner.node import NodeScanner
+from scanner.walker import scan_tree
+
+
+class TestScanIndex(unittest.TestCase):
+    """Unit tests for ScanIndex and its use by the walker."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.tree = self.test_dir / "tree"
+        self.project = self.tree / "project"
+        self.node_modules = self.project / "node_modules"
+        self.node_modules.mkdir(parents=True)
+        (self.project / "package.json").touch()
+        (self.node_modules / "lib.js").write_bytes(b"x" * 100)
+        self._age(self.tree, self.project, self.node_modules)
+        self.index_file = self.test_dir / "index.sqlite"
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def _age(self, *paths: Path) -> None:
+        """Backdate mtimes so that the directories count as settled."""
+        old = time.time() - 3600
+        for path in paths:
+            os.utime(path, (old, old))
+
+    def _scan(self, scandir_calls: List[str]) -> Any:
+        real_scandir = os.scandir
+
+        def counting_scandir(path: Any) -> Any:
+            scandir_calls.append(os.fspath(path))
+            return real_scandir(path)
+
+        index = ScanIndex(self.index_file)
+        try:
+            with patch("scanner.walker.os.scandir", side_effect=counting_scandir):
+                return scan_tree(self.tree, [NodeScanner()], index=index)
+        finally:
+            index.close()
+
+    def test_unchanged_directories_are_not_read_again(self) -> None:
+        """Test that a second scan lists directories from the index."""
+        first_calls: List[str] = []
+        second_calls: List[str] = []
+
+        first = self._scan(first_calls)
+        second = self._scan(second_calls)
+
+        # tree and project are listed, node_modules is read to size it
+        self.assertEqual(len(first_calls), 3)
+        self.assertEqual(second_calls, [str(self.node_modules)])
+        self.assertEqual(first, second)
+        self.assertEqual(list(second)[0].size_bytes, 100)
+
+    def test_artifacts_are_sized_afresh(self) -> None:
+        """Test that files rewritten deep inside an artifact change its size."""
+        self._scan([])
+        deep = self.node_modules / "pkg"
+        deep.mkdir()
+        (deep / "index.js").write_bytes(b"x" * 10)
+        (self.node_modules / "lib.js").write_bytes(b"x" * 50)
+        self._age(self.node_modules)
+
+        artifacts = self._scan([])
+
+        self.assertEqual(list(artifacts)[0].size_bytes, 60)
+
+    def test_changed_directory_is_read_again(self) -> None:
+        """Test that a directory with a new mtime is listed from disk."""
+        self._scan([])
+        (self.tree / "other").mkdir()
+        self._age(self.tree)
+        os.utime(self.tree, (time.time() - 60, time.time() - 60))
+
+        calls: List[str] = []
+        self._scan(calls)
+
+        self.assertIn(str(self.tree), calls)
+        self.assertNotIn(str(self.project), calls)
+
+    def test_recently_modified_directories_are_not_recorded(self) -> None:
+        """Test that directories still settling are always read from disk."""
+        os.utime(self.project)
+        self._scan([])
+
+        calls: List[str] = []
+        self._scan(calls)
+
+        # node_modules is only read to size it
+        self.assertEqual(set(calls), {str(self.project), str(self.node_modules)})
+
+    def test_verify_reports_stale_records(self) -> None:
+        """Test that verify lists records that no longer match the disk."""
+        self._scan([])
+        index = ScanIndex(self.index_file)
+        try:
+            self.assertEqual(index.verify(), [])
+            shutil.rmtree(self.node_modules)
+            os.utime(self.project, (time.time() - 60, time.time() - 60))
+            stale = set(index.verify())
+        finally:
+            index.close()
+
+        self.assertEqual(stale, {self.project})
+
+    def test_clear_forces_full_rescan(self) -> None:
+        """Test that a cleared index reads every directory again."""
+        self._scan([])
+        index = ScanIndex(self.index_file)
+        index.clear()
+        index.close()
+
+        calls: List[str] = []
+        self._scan(calls)
+
+        self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+﻿"""
+Tests for the inotify binding.
+"""
+
+import errno
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from scanner.inotify import (
+    IN_CREATE,
+    IN_DELETE,
+    IN_ISDIR,
+    IN_ONLYDIR,
+    Inotify,
+    is_supported,
+)
+
+
+@unittest.skipUnless(is_supported(), "inotify is not available")
+class TestInotify(unittest.TestCase):
+    """Unit tests for Inotify."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.inotify = Inotify()
+
+    def tearDown(self) -> None:
+        self.inotify.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_events(self) -> None:
+        """Events carry the watch descriptor, kind and entry name."""
+        wd = self.inotify.add_watch(str(self.test_dir), IN_CREATE | IN_DELETE)
+        (self.test_dir / "file").touch()
+        (self.test_dir / "dir").mkdir()
+        (self.test_dir / "file").unlink()
+
+        events = self.inotify.read(timeout=5)
+        self.assertEqual(
+            [(e.wd, e.mask, e.name) for e in events],
+            [
+                (wd, IN_CREATE, "file"),
+                (wd, IN_CREATE | IN_ISDIR, "dir"),
+                (wd, IN_DELETE, "file"),
+            ],
+        )
+
+    def test_read_timeout(self) -> None:
+        """Without events, read returns an empty list once the timeout passes."""
+        self.inotify.add_watch(str(self.test_dir), IN_CREATE)
+        self.assertEqual(self.inotify.read(timeout=0.01), [])
+
+    def test_add_watch_errors(self) -> None:
+        """Failing watches raise OSError with the errno of the call."""
+        file = self.test_dir / "file"
+        file.touch()
+        with self.assertRaises(OSError) as context:
+            self.inotify.add_watch(str(file), IN_CREATE | IN_ONLYDIR)
+        self.assertEqual(context.exception.errno, errno.ENOTDIR)
+        with self.assertRaises(FileNotFoundError):
+            self.inotify.add_watch(str(self.test_dir / "missing"), IN_CREATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
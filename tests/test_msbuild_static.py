@@ -0,0 +1,220 @@
+﻿"""
+Tests for the static MSBuild evaluator.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from scanner.dotnet import DotnetScanner
+from scanner.msbuild_static import StaticEvaluator
+
+SDK_PROJECT = '<Project Sdk="Microsoft.NET.Sdk">{body}</Project>'
+
+
+class TestStaticEvaluator(unittest.TestCase):
+    """Unit tests for StaticEvaluator."""
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.proj_dir = self.temp_dir / "src" / "app"
+        self.proj_dir.mkdir(parents=True)
+        self.evaluator = StaticEvaluator()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def _write_project(self, body: str = "") -> Path:
+        csproj = self.proj_dir / "app.csproj"
+        csproj.write_text(SDK_PROJECT.format(body=body), encoding="utf-8")
+        return csproj
+
+    def _path(self, value: str) -> str:
+        return os.path.normpath(value.replace("\\", os.sep))
+
+    def test_sdk_defaults(self) -> None:
+        """Test that a bare SDK project gets the default bin and obj paths."""
+        props = self.evaluator.evaluate(self._write_project())
+
+        assert props is not None
+        self.assertEqual(self._path(props["BaseOutputPath"]), "bin")
+        self.assertEqual(self._path(props["BaseIntermediateOutputPath"]), "obj")
+        self.assertEqual(self._path(props["OutputPath"]), os.path.join("bin", "Debug"))
+
+    def test_platform_output_path(self) -> None:
+        """Test that platforms other than AnyCPU get their own OutputPath."""
+        props = self.evaluator.evaluate(
+            self._write_project(
+                "<PropertyGroup><Platform>x64</Platform></PropertyGroup>"
+            )
+        )
+
+        assert props is not None
+        self.assertEqual(
+            self._path(props["OutputPath"]), os.path.join("bin", "x64", "Debug")
+        )
+
+    def test_exists_is_relative_to_the_project(self) -> None:
+        """Test that Exists() in an imported file resolves from the project."""
+        (self.proj_dir / "marker.txt").touch()
+        (self.temp_dir / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup Condition=\"Exists('marker.txt')\">"
+            "<BaseOutputPath>out/</BaseOutputPath>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+
+        props = self.evaluator.evaluate(self._write_project())
+
+        assert props is not None
+        self.assertEqual(self._path(props["BaseOutputPath"]), "out")
+
+    def test_directory_build_props(self) -> None:
+        """Test that Directory.Build.props above the project is imported."""
+        (self.temp_dir / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup>"
+            "<BaseOutputPath>$(MSBuildThisFileDirectory)out\\$(MSBuildProjectName)"
+            "</BaseOutputPath>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+
+        props = self.evaluator.evaluate(self._write_project())
+
+        assert props is not None
+        self.assertEqual(
+            self._path(props["BaseOutputPath"]), str(self.temp_dir / "out" / "app")
+        )
+
+    def test_conditions_and_parent_imports(self) -> None:
+        """Test conditional groups and GetPathOfFileAbove imports."""
+        (self.temp_dir / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup Condition=\"'$(Configuration)' == 'Debug'\">"
+            "<BaseIntermediateOutputPath>../../build/obj/</BaseIntermediateOutputPath>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+        (self.temp_dir / "src" / "Directory.Build.props").write_text(
+            '<Project><Import Project="$([MSBuild]::GetPathOfFileAbove('
+            "'Directory.Build.props', '$(MSBuildThisFileDirectory)../'))\" "
+            "Condition=\"Exists('../Directory.Build.props')\" /></Project>",
+            encoding="utf-8",
+        )
+
+        props = self.evaluator.evaluate(self._write_project())
+
+        assert props is not None
+        self.assertEqual(
+            self._path(props["BaseIntermediateOutputPath"]),
+            os.path.join("..", "..", "build", "obj"),
+        )
+
+    def test_artifacts_output(self) -> None:
+        """Test that UseArtifactsOutput places outputs under ArtifactsPath."""
+        (self.temp_dir / "Directory.Build.props").write_text(
+            "<Project><PropertyGroup><UseArtifactsOutput>true</UseArtifactsOutput>"
+            "</PropertyGroup></Project>",
+            encoding="utf-8",
+        )
+
+        props = self.evaluator.evaluate(self._write_project())
+
+        assert props is not None
+        self.assertEqual(props["UseArtifactsOutput"], "true")
+        self.assertEqual(props["ArtifactsPath"], str(self.temp_dir / "artifacts"))
+        self.assertEqual(
+            self._path(props["BaseOutputPath"]),
+            str(self.temp_dir / "artifacts" / "bin"),
+        )
+
+    def test_unresolvable_constructs(self) -> None:
+        """Test that unsupported constructs defer to msbuild."""
+        unsupported = [
+            "<PropertyGroup><BaseOutputPath>$([System.IO.Path]::GetTempPath())"
+            "</BaseOutputPath></PropertyGroup>",
+            "<PropertyGroup Condition=\"'$(MSBuildExtensionsPath)' != ''\">"
+            "<BaseOutputPath>x</BaseOutputPath></PropertyGroup>",
+            '<Choose><When Condition="true"></When></Choose>',
+            '<Import Project="missing.props" />',
+        ]
+        for body in unsupported:
+            with self.subTest(body=body):
+                self.assertIsNone(self.evaluator.evaluate(self._write_project(body)))
+
+    def test_wrong_argument_counts_are_unresolvable(self) -> None:
+        """Test that property functions called with too few arguments defer."""
+        calls = [
+            "GetPathOfFileAbove()",
+            "GetDirectoryNameOfFileAbove($(MSBuildProjectDirectory))",
+            "NormalizePath()",
+            "NormalizeDirectory()",
+            "EnsureTrailingSlash()",
+            "EnsureTrailingSlash(a, b)",
+        ]
+        for call in calls:
+            with self.subTest(call=call):
+                body = (
+                    f"<PropertyGroup><BaseOutputPath>$([MSBuild]::{call})"
+                    "</BaseOutputPath></PropertyGroup>"
+                )
+                self.assertIsNone(self.evaluator.evaluate(self._write_project(body)))
+
+    def test_legacy_project_is_unresolvable(self) -> None:
+        """Test that non-SDK projects are left to msbuild."""
+        csproj = self.proj_dir / "app.csproj"
+        csproj.write_text(
+            '<Project xmlns="http://schemas.microsoft.com/developer/msbuild/2003">'
+            "</Project>",
+            encoding="utf-8",
+        )
+        self.assertIsNone(self.evaluator.evaluate(csproj))
+
+
+class TestStaticDotnetScanner(unittest.TestCase):
+    """Tests for DotnetScanner using the static evaluator."""
+
+    def setUp(self) -> None:
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.temp_dir)
+
+    def test_scan_without_sdk(self) -> None:
+        """Test that static mode finds outputs without running dotnet."""
+        proj_dir = self.temp_dir / "app"
+        (proj_dir / "bin" / "Debug").mkdir(parents=True)
+        (proj_dir / "obj").mkdir()
+        (proj_dir / "app.csproj").write_text(
+            SDK_PROJECT.format(body=""), encoding="utf-8"
+        )
+
+        with patch("subprocess.run", side_effect=AssertionError("no dotnet")):
+            artifacts = DotnetScanner(evaluation="static").scan(self.temp_dir)
+
+        self.assertEqual(
+            {a.path for a in artifacts},
+            {(proj_dir / "bin").resolve(), (proj_dir / "obj").resolve()},
+        )
+
+    def test_never_reports_project_directory(self) -> None:
+        """Test that an output path pointing at the project itself is ignored."""
+        proj_dir = self.temp_dir / "app"
+        proj_dir.mkdir()
+        (proj_dir / "app.csproj").write_text(
+            SDK_PROJECT.format(
+                body="<PropertyGroup><BaseOutputPath>./</BaseOutputPath>"
+                "<OutputPath>..</OutputPath></PropertyGroup>"
+            ),
+            encoding="utf-8",
+        )
+
+        artifacts = DotnetScanner(evaluation="static").scan(self.temp_dir)
+
+        self.assertEqual(artifacts, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -74,6 +74,20 @@ class TestNodeScanner(unittest.TestCase):
             self.assertEqual(a.type, "Node.js")
             self.assertEqual(a.size_bytes, 0)
 
+    def test_scan_does_not_descend_into_node_modules(self) -> None:
+        """Test that packages inside node_modules are not reported."""
+        project_dir = self.test_dir / "project"
+        project_dir.mkdir()
+        (project_dir / "package.json").touch()
+        node_modules = project_dir / "node_modules"
+        nested = node_modules / "pkg" / "node_modules"
+        nested.mkdir(parents=True)
+        (node_modules / "pkg" / "package.json").touch()
+
+        artifacts = self.scanner.scan(self.test_dir)
+
+        self.assertEqual({a.path for a in artifacts}, {node_modules})
+
 
 if __name__ == "__main__":
     unittest.main()
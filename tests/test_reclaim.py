@@ -0,0 +1,132 @@
+﻿"""
+Tests for freeing a target amount of disk space.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, NamedTuple
+from unittest.mock import patch
+
+from reclaim import ReclaimQueue, last_change, parse_size, target_free_bytes
+from scanner.base_scanner import Artifact
+from scanner.sizing import Sizer
+from src_clean import main
+
+
+class _Usage(NamedTuple):
+    """Stand-in for the result of shutil.disk_usage."""
+
+    total: int
+    used: int
+    free: int
+
+
+def _usage(total: int, free: int) -> _Usage:
+    return _Usage(total, total - free, free)
+
+
+class TestReclaim(unittest.TestCase):
+    """Unit tests for ranking and selecting artifacts to free space."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def _project(self, name: str, size: int, mtime: float) -> Artifact:
+        project_dir = self.test_dir / name
+        (project_dir / "node_modules").mkdir(parents=True)
+        (project_dir / "node_modules" / "blob").write_bytes(b"x" * size)
+        package_json = project_dir / "package.json"
+        package_json.write_text("{}", encoding="utf-8")
+        os.utime(package_json, (mtime, mtime))
+        return Artifact(
+            path=project_dir / "node_modules", type="Node.js", project=package_json
+        )
+
+    def test_parse_size(self) -> None:
+        """Test that sizes with binary units are parsed."""
+        self.assertEqual(parse_size("4096"), 4096)
+        self.assertEqual(parse_size("50G"), 50 * 1024**3)
+        self.assertEqual(parse_size("1.5 KiB"), 1536)
+        self.assertEqual(parse_size("2mb"), 2 * 1024**2)
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def test_target_free_bytes(self) -> None:
+        """Test that the larger of the two targets wins."""
+        with patch("reclaim.shutil.disk_usage", return_value=_usage(1000, 100)):
+            self.assertEqual(target_free_bytes(self.test_dir, free=50), 150)
+            self.assertEqual(target_free_bytes(self.test_dir, until_free=25), 250)
+            self.assertEqual(
+                target_free_bytes(self.test_dir, free=300, until_free=25), 400
+            )
+            self.assertEqual(target_free_bytes(self.test_dir, until_free=5), 100)
+
+    def test_last_change_uses_lockfile(self) -> None:
+        """Test that a newer lock file makes a project less stale."""
+        artifact = self._project("web", 1, mtime=1000)
+        lockfile = self.test_dir / "web" / "yarn.lock"
+        lockfile.write_text("", encoding="utf-8")
+        os.utime(lockfile, (5000, 5000))
+
+        self.assertEqual(last_change(artifact), 5000)
+
+    def test_queue_takes_largest_first(self) -> None:
+        """Test that size ranking takes only as many artifacts as needed."""
+        artifacts = [
+            Artifact(path=Path(f"/p{size}"), type="x", reclaimable_bytes=size)
+            for size in [10, 300, 20, 200]
+        ]
+        queue = ReclaimQueue(artifacts, "size")
+
+        self.assertEqual([a.reclaimable_bytes for a in queue.take(250)], [300])
+        self.assertEqual([a.reclaimable_bytes for a in queue.take(210)], [200, 20])
+        self.assertEqual(len(queue), 1)
+
+    def test_queue_sizes_stale_artifacts_lazily(self) -> None:
+        """Test that staleness ranking only sizes the artifacts it takes."""
+        old = self._project("old", 100, mtime=1000)
+        new = self._project("new", 100, mtime=9000)
+        sizer = Sizer()
+        sized: List[Path] = []
+        real_size = sizer.size
+
+        def size(artifact: Artifact) -> Artifact:
+            sized.append(artifact.path)
+            return real_size(artifact)
+
+        with patch.object(sizer, "size", side_effect=size):
+            queue = ReclaimQueue([new, old], "stale", sizer)
+            taken = queue.take(1)
+
+        self.assertEqual([a.path for a in taken], [old.path])
+        self.assertEqual(sized, [old.path])
+        self.assertGreater(taken[0].reclaimable_bytes, 0)
+
+    def test_cli_deletes_until_target_is_met(self) -> None:
+        """Test that --free removes the largest artifacts and then stops."""
+        small = self._project("small", 10, mtime=1000)
+        large = self._project("large", 100_000, mtime=1000)
+        free = [100, 200_000]
+
+        argv = ["src_clean.py", str(self.test_dir), "--mode", "delete"]
+        argv += ["--free", "1K", "--yes"]
+        with patch("sys.argv", argv), patch("src_clean.free_bytes") as free_bytes:
+            free_bytes.side_effect = free
+            with patch("reclaim.shutil.disk_usage", return_value=_usage(10**6, 100)):
+                with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                    main()
+
+        self.assertFalse(large.path.exists())
+        self.assertTrue(small.path.exists())
+        self.assertIn("The target is met", fake_out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+﻿"""
+Tests for the machine-readable reports.
+"""
+
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from report import RecordWriter, Totals, artifact_record, summary_record
+from scanner import Artifact
+from scanner.sizing import DiskUsage
+from src_clean import main
+
+
+class TestReport(unittest.TestCase):
+    """Unit tests for report records and RecordWriter."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.exact = Artifact(
+            path=Path("/repo/app/node_modules"),
+            type="Node.js",
+            size_bytes=3_000_000,
+            reclaimable_bytes=2_000_000,
+            project=Path("/repo/app/package.json"),
+        )
+        self.estimated = Artifact(
+            path=Path("/repo/lib/bin"),
+            type=".NET",
+            size_bytes=1000,
+            reclaimable_bytes=1000,
+            size_error=DiskUsage(apparent=30, reclaimable=40),
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_artifact_record_is_exact(self) -> None:
+        """Records carry exact byte counts and the owning project."""
+        record = artifact_record(self.exact, 1.5)
+        self.assertEqual(record["size_bytes"], 3_000_000)
+        self.assertEqual(record["reclaimable_bytes"], 2_000_000)
+        self.assertEqual(record["project"], "/repo/app/package.json")
+        self.assertIsNone(record["size_error_bytes"])
+        self.assertEqual(record["elapsed_seconds"], 1.5)
+
+        estimated = artifact_record(self.estimated, 0.0)
+        self.assertIsNone(estimated["project"])
+        self.assertEqual(estimated["size_error_bytes"], 30)
+        self.assertEqual(estimated["reclaimable_error_bytes"], 40)
+
+        unsized = artifact_record(self.exact, 0.0, sized=False)
+        self.assertIsNone(unsized["size_bytes"])
+
+    def test_totals(self) -> None:
+        """Totals sum sizes and add estimate errors in quadrature."""
+        totals = Totals()
+        self.assertIsNone(totals.size_error())
+        totals.add(self.exact)
+        totals.add(self.estimated)
+        totals.add(self.estimated)
+        self.assertEqual(totals.count, 3)
+        self.assertEqual(totals.estimated, 2)
+        self.assertEqual(totals.size_bytes, 3_002_000)
+        self.assertEqual(totals.size_error(), 42)  # sqrt(2 * 30^2)
+        self.assertEqual(totals.size_error(disk_usage=True), 57)
+
+    def test_ndjson_writes_one_record_per_line(self) -> None:
+        """NDJSON output is a line per artifact and a final summary line."""
+        stream = io.StringIO()
+        writer = RecordWriter("ndjson", stream)
+        totals = Totals()
+        for artifact in (self.exact, self.estimated):
+            writer.artifact(artifact_record(artifact, writer.elapsed()))
+            totals.add(artifact)
+        writer.finish(summary_record([Path("/repo")], totals, writer.elapsed()))
+
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            [r["record"] for r in records], ["artifact", "artifact", "summary"]
+        )
+        self.assertEqual(records[2]["artifacts"], 2)
+        self.assertEqual(records[2]["size_bytes"], 3_001_000)
+
+    def test_json_is_one_document(self) -> None:
+        """JSON output parses as one document, with or without artifacts."""
+        for artifacts in ([], [self.exact, self.estimated]):
+            with self.subTest(count=len(artifacts)):
+                stream = io.StringIO()
+                writer = RecordWriter("json", stream)
+                totals = Totals()
+                for artifact in artifacts:
+                    writer.artifact(artifact_record(artifact, 0.0))
+                    totals.add(artifact)
+                writer.finish(summary_record([Path("/repo")], totals, 0.0))
+
+                document = json.loads(stream.getvalue())
+                self.assertEqual(len(document["artifacts"]), len(artifacts))
+                self.assertEqual(document["summary"]["artifacts"], len(artifacts))
+
+    def test_cli_ndjson(self) -> None:
+        """--format ndjson prints nothing but records to stdout."""
+        modules = self.test_dir / "app" / "node_modules"
+        modules.mkdir(parents=True)
+        (self.test_dir / "app" / "package.json").write_text("{}", encoding="utf-8")
+        (modules / "index.js").write_text("x" * 100, encoding="utf-8")
+
+        argv = ["src_clean.py", str(self.test_dir), "--scanners", "node"]
+        argv += ["--format", "ndjson"]
+        stdout = io.StringIO()
+        with patch("sys.argv", argv), patch("sys.stdout", stdout):
+            main()
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["path"], str(modules.resolve()))
+        self.assertEqual(records[0]["size_bytes"], 100)
+        self.assertEqual(records[1]["record"], "summary")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+﻿"""
+Tests for scanning several roots.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Iterator, List, Sequence
+from unittest.mock import patch
+
+from scanner import Artifact, RunStats
+from scanner.roots import dedupe_roots, group_by_device, stream_roots
+from scanner.walker import walk
+
+
+def _scan_roots(roots: Sequence[Path], stats: RunStats) -> Iterator[Artifact]:
+    """Stand-in scan, importable by spawned worker processes."""
+    for root in roots:
+        stats.add("roots_scanned")
+        yield Artifact(path=root / "node_modules", type="Node.js")
+
+
+def _fail(roots: Sequence[Path], stats: RunStats) -> Iterator[Artifact]:
+    raise OSError(f"cannot scan {roots[0]}")
+
+
+class TestRoots(unittest.TestCase):
+    """Unit tests for multi-root scanning."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp()).resolve()
+        self.first = self.test_dir / "first"
+        self.second = self.test_dir / "second"
+        (self.first / "nested").mkdir(parents=True)
+        self.second.mkdir()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_dedupe_roots(self) -> None:
+        """Duplicate roots and roots inside other roots are dropped."""
+        alias = self.test_dir / "alias"
+        alias.symlink_to(self.first)
+        roots = dedupe_roots(
+            [self.second, self.first / "nested", alias, self.first, self.second]
+        )
+        self.assertEqual(roots, [self.first, self.second])
+
+    def test_siblings_with_a_common_prefix_are_kept(self) -> None:
+        """A root is only dropped below another root, not beside it."""
+        sibling = self.test_dir / "first-copy"
+        sibling.mkdir()
+        self.assertEqual(dedupe_roots([self.first, sibling]), [self.first, sibling])
+
+    def test_group_by_device(self) -> None:
+        """Roots on one device form one group."""
+        self.assertEqual(
+            group_by_device([self.first, self.second]), [[self.first, self.second]]
+        )
+
+    def test_one_device_is_scanned_in_process(self) -> None:
+        """Without several devices, the roots are scanned here in one call."""
+        calls: List[Sequence[Path]] = []
+
+        def scan(roots: Sequence[Path], stats: RunStats) -> Iterator[Artifact]:
+            calls.append(roots)
+            return _scan_roots(roots, stats)
+
+        found = list(stream_roots([self.first, self.second], scan))
+        self.assertEqual(calls, [[self.first, self.second]])
+        self.assertEqual(len(found), 2)
+
+    def test_devices_are_scanned_in_worker_processes(self) -> None:
+        """Each device group runs in a worker; results and stats are merged."""
+        stats = RunStats()
+        with patch(
+            "scanner.roots.group_by_device",
+            return_value=[[self.first], [self.second]],
+        ):
+            found = list(stream_roots([self.first, self.second], _scan_roots, stats))
+
+        self.assertEqual(
+            {a.path for a in found},
+            {self.first / "node_modules", self.second / "node_modules"},
+        )
+        data = stats.as_dict()
+        self.assertEqual(data["counters"]["roots_scanned"], 2)
+        self.assertEqual(data["phases"]["device_worker"]["calls"], 2)
+
+    def test_worker_errors_are_raised(self) -> None:
+        """An error in a worker process is raised in the caller."""
+        with patch(
+            "scanner.roots.group_by_device",
+            return_value=[[self.first], [self.second]],
+        ):
+            with self.assertRaisesRegex(RuntimeError, "cannot scan"):
+                list(stream_roots([self.first, self.second], _fail))
+
+    def test_walk_stays_on_one_file_system(self) -> None:
+        """Directories on another device are not walked."""
+        (self.first / "mnt" / "deep").mkdir(parents=True)
+        device = os.stat(self.first).st_dev
+
+        def on_device(path: Path, expected: int) -> bool:
+            self.assertEqual(expected, device)
+            return path.name != "mnt"
+
+        with patch("scanner.walker._on_device", side_effect=on_device):
+            walked = {d for d, _, _ in walk(self.first, one_file_system=True)}
+        self.assertEqual(walked, {self.first, self.first / "nested"})
+        walked = {d for d, _, _ in walk(self.first)}
+        self.assertIn(self.first / "mnt" / "deep", walked)
+
+
+if __name__ == "__main__":
+    unittest.main()
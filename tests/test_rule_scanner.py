@@ -0,0 +1,112 @@
+﻿"""
+Tests for the RuleScanner class.
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List
+
+from scanner.rules import ECOSYSTEMS, RULES, Rule, RuleScanner
+
+
+class TestRuleScanner(unittest.TestCase):
+    """Unit tests for RuleScanner."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def _project(self, name: str, files: List[str], dirs: List[str]) -> Path:
+        project_dir = self.test_dir / name
+        project_dir.mkdir()
+        for file in files:
+            (project_dir / file).touch()
+        for directory in dirs:
+            (project_dir / directory / "content").mkdir(parents=True)
+        return project_dir
+
+    def _found(self, scanner: RuleScanner) -> Dict[Path, str]:
+        return {a.path: a.type for a in scanner.scan(self.test_dir, False)}
+
+    def test_scan_finds_artifacts_of_every_ecosystem(self) -> None:
+        """Test that each rule finds its artifact directories."""
+        rust = self._project("rust", ["Cargo.toml"], ["target", "src"])
+        maven = self._project("maven", ["pom.xml"], ["target"])
+        gradle = self._project("gradle", ["build.gradle.kts"], ["build", ".gradle"])
+        python = self._project("python", ["pyproject.toml"], [".venv", ".tox"])
+        cmake = self._project("cmake", ["CMakeLists.txt"], ["build"])
+
+        self.assertEqual(
+            self._found(RuleScanner()),
+            {
+                rust / "target": "Rust",
+                maven / "target": "Maven",
+                gradle / "build": "Gradle",
+                gradle / ".gradle": "Gradle",
+                python / ".venv": "Python",
+                python / ".tox": "Python",
+                cmake / "build": "CMake",
+            },
+        )
+
+    def test_scan_needs_a_marker(self) -> None:
+        """Test that artifact names without a marker file are ignored."""
+        self._project("docs", ["README.md"], ["build", "target", ".venv"])
+        self.assertEqual(self._found(RuleScanner()), {})
+
+    def test_pycache_needs_python_sources(self) -> None:
+        """Test that __pycache__ is found next to Python modules only."""
+        package = self._project("package", ["module.py"], ["__pycache__"])
+        self._project("orphan", ["README.md"], ["__pycache__"])
+        artifacts = RuleScanner().scan(self.test_dir, calculate_size=False)
+        self.assertEqual([a.path for a in artifacts], [package / "__pycache__"])
+        self.assertEqual(list(artifacts)[0].project, package / "module.py")
+
+    def test_installed_packages_are_skipped(self) -> None:
+        """Test that nothing is reported inside site-packages."""
+        packages = self.test_dir / "venv" / "lib" / "python3.12" / "site-packages"
+        (packages / "pkg" / "__pycache__").mkdir(parents=True)
+        (packages / "pkg" / "__init__.py").touch()
+        (packages / "tool" / "build").mkdir(parents=True)
+        (packages / "tool" / "CMakeLists.txt").touch()
+        self.assertEqual(self._found(RuleScanner()), {})
+
+    def test_project_is_the_marker_file(self) -> None:
+        """Test that artifacts record the marker file as their project."""
+        gradle = self._project("gradle", ["settings.gradle"], ["build"])
+        artifacts = RuleScanner().scan(self.test_dir, calculate_size=False)
+        self.assertEqual([a.project for a in artifacts], [gradle / "settings.gradle"])
+
+    def test_ecosystems_can_be_selected(self) -> None:
+        """Test that only the rules of the selected ecosystems are applied."""
+        rust = self._project("rust", ["Cargo.toml"], ["target"])
+        self._project("cmake", ["CMakeLists.txt"], ["build"])
+        self.assertEqual(self._found(RuleScanner(["rust"])), {rust / "target": "Rust"})
+        with self.assertRaises(ValueError):
+            RuleScanner(["cobol"])
+        self.assertIn("python", ECOSYSTEMS)
+        self.assertEqual(
+            ECOSYSTEMS, tuple(dict.fromkeys(rule.ecosystem for rule in RULES))
+        )
+
+    def test_first_matching_rule_wins(self) -> None:
+        """Test that a directory matched by several rules is reported once."""
+        both = self._project("both", ["Cargo.toml", "pom.xml"], ["target"])
+        self.assertEqual(self._found(RuleScanner()), {both / "target": "Rust"})
+
+    def test_custom_rules(self) -> None:
+        """Test that a scanner can be built from other rules."""
+        project = self._project("zig", ["build.zig"], ["zig-cache", "zig-out"])
+        rules = (Rule("zig", "Zig", ("*.zig",), ("zig-cache", "zig-out")),)
+        self.assertEqual(
+            self._found(RuleScanner(rules=rules)),
+            {project / "zig-cache": "Zig", project / "zig-out": "Zig"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,11 @@ Tests for the ScriptRemover class.
 """
 
 import io
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import patch
@@ -29,7 +34,7 @@ class TestScriptRemover(unittest.TestCase):
         self.assertTrue(output.startswith("#!/bin/sh\n"))
 
         # Check rm commands (should be sorted)
-        expected_commands = ['rm -rf "build"', 'rm -rf "dist"', 'rm -rf "node_modules"']
+        expected_commands = ["rm -rf build", "rm -rf dist", "rm -rf node_modules"]
         for cmd in expected_commands:
             self.assertIn(cmd, output)
 
@@ -73,6 +78,66 @@ class TestScriptRemover(unittest.TestCase):
         self.assertTrue(result.success)
         self.assertEqual(result.removed, [])
 
+    def test_remove_unsorted_keeps_arrival_order(self) -> None:
+        """Test that streaming mode prints commands in the order received."""
+        remover = ScriptRemover(sort=False)
+        arriving = [Path("node_modules"), Path("build")]
+        with patch("os.name", "posix"):
+            with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                result = remover.remove(iter(arriving))
+                output = fake_out.getvalue()
+
+        lines = [line for line in output.split("\n") if line.startswith("rm -rf")]
+        self.assertEqual(lines, ["rm -rf node_modules", "rm -rf build"])
+        self.assertEqual(result.removed, arriving)
+
+    def test_quoting(self) -> None:
+        """Paths with shell metacharacters are quoted as one literal word."""
+        path = Path("/tmp/a $HOME `id` \"b\" 'c'")
+        with patch("os.name", "posix"):
+            with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                self.remover.remove([path])
+                output = fake_out.getvalue()
+        command = output.splitlines()[1]
+        self.assertEqual(shlex.split(command), ["rm", "-rf", str(path)])
+
+    def test_parallel_single_xargs(self) -> None:
+        """With jobs, every path is fed to a single xargs for the whole script."""
+        remover = ScriptRemover(jobs=4)
+        artifacts = [Path(f"dir{i:03}") for i in range(100)]
+        with patch("os.name", "posix"):
+            with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                result = remover.remove(artifacts)
+                output = fake_out.getvalue()
+
+        lines = output.splitlines()
+        xargs = [line for line in lines if "xargs" in line]
+        self.assertEqual(len(xargs), 1)
+        self.assertIn("xargs -0 -n 1 -P 4 rm -rf", xargs[0])
+        writes = [line for line in lines if line.startswith("printf")]
+        self.assertEqual(writes, [f"printf '%s\\0' {a} >&3" for a in artifacts])
+        self.assertNotIn("\nrm -rf", output)
+        self.assertEqual(result.removed, artifacts)
+
+    @unittest.skipIf(os.name == "nt" or not shutil.which("xargs"), "needs sh, xargs")
+    def test_scripts_remove_awkward_paths(self) -> None:
+        """Serial and parallel scripts remove paths with metacharacters."""
+        test_dir = Path(tempfile.mkdtemp())
+        try:
+            for jobs in (None, 3):
+                names = ['a "b"', "$HOME", "`touch x`", "it's", "new\nline", "-rf"]
+                artifacts = [test_dir / name for name in names]
+                for artifact in artifacts:
+                    (artifact / "sub").mkdir(parents=True)
+                keep = test_dir / "keep"
+                keep.mkdir(exist_ok=True)
+                with patch("sys.stdout", new=io.StringIO()) as fake_out:
+                    ScriptRemover(jobs=jobs).remove(artifacts)
+                subprocess.run(["sh"], input=fake_out.getvalue(), text=True, check=True)
+                self.assertEqual(list(test_dir.iterdir()), [keep])
+        finally:
+            shutil.rmtree(test_dir)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,221 @@
+﻿"""
+Tests for the directory sizing engine.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from scanner.base_scanner import Artifact
+from scanner.sizing import (
+    InodeLedger,
+    Sizer,
+    estimate_disk_usage,
+    get_dir_size,
+    get_disk_usage,
+    size_artifacts,
+)
+
+
+class TestSizing(unittest.TestCase):
+    """Unit tests for get_dir_size and size_artifacts."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        (self.test_dir / "a" / "b").mkdir(parents=True)
+        (self.test_dir / "c").mkdir()
+        (self.test_dir / "top.bin").write_bytes(b"x" * 10)
+        (self.test_dir / "a" / "one.bin").write_bytes(b"x" * 100)
+        (self.test_dir / "a" / "b" / "two.bin").write_bytes(b"x" * 1000)
+        (self.test_dir / "c" / "three.bin").write_bytes(b"x" * 5)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_get_dir_size_sums_nested_files(self) -> None:
+        """Test that files at every depth are counted."""
+        self.assertEqual(get_dir_size(self.test_dir), 1115)
+
+    def test_get_dir_size_skips_unreadable_directories(self) -> None:
+        """Test that an unreadable subtree does not abort the whole count."""
+        real_scandir = os.scandir
+        blocked = os.fspath(self.test_dir / "a")
+
+        def fake_scandir(path: Any) -> Any:
+            if os.fspath(path) == blocked:
+                raise PermissionError("denied")
+            return real_scandir(path)
+
+        with patch("scanner.sizing.os.scandir", side_effect=fake_scandir):
+            self.assertEqual(get_dir_size(self.test_dir), 15)
+
+    def test_get_dir_size_missing_path(self) -> None:
+        """Test that a missing directory has size zero."""
+        self.assertEqual(get_dir_size(self.test_dir / "missing"), 0)
+
+    def test_size_artifacts_preserves_order(self) -> None:
+        """Test that concurrent sizing returns sized copies in input order."""
+        artifacts = [
+            Artifact(path=self.test_dir / "c", type="test"),
+            Artifact(path=self.test_dir / "a", type="test"),
+        ]
+
+        sized = size_artifacts(artifacts, jobs=2)
+
+        self.assertEqual([a.path for a in sized], [a.path for a in artifacts])
+        self.assertEqual([a.size_bytes for a in sized], [5, 1100])
+
+    def test_hard_links_are_reclaimable_once(self) -> None:
+        """Test that a file linked from two artifacts is reclaimable once."""
+        first = self.test_dir / "first"
+        second = self.test_dir / "second"
+        first.mkdir()
+        second.mkdir()
+        (first / "shared.bin").write_bytes(b"x" * 8192)
+        os.link(first / "shared.bin", second / "shared.bin")
+        allocated = (first / "shared.bin").stat().st_blocks * 512
+
+        sized = size_artifacts(
+            [Artifact(path=first, type="test"), Artifact(path=second, type="test")]
+        )
+
+        self.assertEqual([a.size_bytes for a in sized], [8192, 8192])
+        self.assertEqual(sum(a.reclaimable_bytes for a in sized), allocated)
+
+    def test_links_outside_artifacts_are_not_reclaimable(self) -> None:
+        """Test that removing one of several links frees nothing."""
+        store = self.test_dir / "store.bin"
+        store.write_bytes(b"x" * 8192)
+        os.link(store, self.test_dir / "c" / "linked.bin")
+
+        usage = get_disk_usage(self.test_dir / "c", InodeLedger())
+
+        self.assertEqual(usage.apparent, 8197)
+        self.assertEqual(
+            usage.reclaimable,
+            (self.test_dir / "c" / "three.bin").stat().st_blocks * 512,
+        )
+
+    def test_sparse_files_count_allocated_blocks(self) -> None:
+        """Test that a sparse file is not counted at its apparent size."""
+        sparse = self.test_dir / "c" / "sparse.bin"
+        with open(sparse, "wb") as handle:
+            handle.truncate(64 * 1024 * 1024)
+        if sparse.stat().st_blocks * 512 >= 64 * 1024 * 1024:
+            self.skipTest("filesystem does not support sparse files")
+
+        usage = get_disk_usage(self.test_dir / "c")
+
+        self.assertEqual(usage.apparent, 64 * 1024 * 1024 + 5)
+        self.assertLess(usage.reclaimable, 1024 * 1024)
+
+    def test_estimate_is_exact_for_small_trees(self) -> None:
+        """Test that a tree with few subdirectories is measured completely."""
+        estimate = estimate_disk_usage(self.test_dir)
+
+        self.assertEqual(estimate.usage, get_disk_usage(self.test_dir))
+        self.assertEqual(estimate.error.apparent, 0)
+
+    def test_estimate_samples_wide_trees(self) -> None:
+        """Test that a wide tree is extrapolated from a sample with an error."""
+        wide = self.test_dir / "wide"
+        for i in range(100):
+            (wide / f"pkg{i}").mkdir(parents=True)
+            (wide / f"pkg{i}" / "index.js").write_bytes(b"x" * (100 + i % 10))
+        measured = []
+        real_scandir = os.scandir
+
+        def counting_scandir(path: Any) -> Any:
+            measured.append(path)
+            return real_scandir(path)
+
+        with patch("scanner.sizing.os.scandir", side_effect=counting_scandir):
+            estimate = estimate_disk_usage(wide, samples=10)
+
+        self.assertEqual(len(measured), 11)
+        exact = get_dir_size(wide)
+        self.assertGreater(estimate.error.apparent, 0)
+        # The bound is a 95% interval; allow a wide margin so the test is stable
+        self.assertLessEqual(
+            abs(estimate.usage.apparent - exact), 3 * estimate.error.apparent
+        )
+        self.assertEqual(estimate, estimate_disk_usage(wide, samples=10))
+
+    def test_sizer_estimates_after_budget(self) -> None:
+        """Test that sizes are exact within the budget and estimated after."""
+        artifact = Artifact(path=self.test_dir, type="Test")
+
+        exact = Sizer(budget=60).size(artifact)
+        estimated = Sizer(budget=0).size(artifact)
+
+        self.assertEqual(exact.size_bytes, 1115)
+        self.assertIsNone(exact.size_error)
+        self.assertIsNotNone(estimated.size_error)
+        self.assertEqual(estimated.size_bytes, 1115)
+
+    def test_estimates_share_the_hard_link_ledger(self) -> None:
+        """Test that estimated artifacts count a shared hard link once."""
+        first = self.test_dir / "first"
+        second = self.test_dir / "second"
+        first.mkdir()
+        second.mkdir()
+        (first / "shared.bin").write_bytes(b"x" * 8192)
+        os.link(first / "shared.bin", second / "shared.bin")
+        allocated = (first / "shared.bin").stat().st_blocks * 512
+
+        sizer = Sizer(estimate=True)
+        sized = [sizer.size(Artifact(path=p, type="Test")) for p in (first, second)]
+
+        self.assertTrue(all(a.size_error is not None for a in sized))
+        self.assertEqual(sum(a.reclaimable_bytes for a in sized), allocated)
+
+    def test_sizer_budget_keeps_hard_link_ledger(self) -> None:
+        """Test that an abandoned measurement does not consume hard links."""
+        first = self.test_dir / "first"
+        second = self.test_dir / "second"
+        (first / "sub").mkdir(parents=True)
+        second.mkdir()
+        (first / "data").write_bytes(b"x" * 4096)
+        os.link(first / "data", second / "data")
+
+        sizer = Sizer()
+        # The budget runs out after the link in first has been seen
+        sizer.deadline = 5.0
+        with patch("scanner.sizing.time.monotonic", side_effect=[0.0, 10.0]):
+            sized = sizer.size(Artifact(path=first, type="Test"))
+        self.assertIsNotNone(sized.size_error)
+        sizer.deadline = None
+        second_sized = sizer.size(Artifact(path=second, type="Test"))
+
+        # The abandoned walk of first must not count as having seen its link:
+        # only its estimate did, so the link in second is the last one
+        self.assertEqual(sized.reclaimable_bytes, 0)
+        self.assertEqual(
+            second_sized.reclaimable_bytes, (second / "data").stat().st_blocks * 512
+        )
+
+    def test_resizable_sizer_forgets_released_links(self) -> None:
+        """Test that an artifact sized again keeps its hard links reclaimable."""
+        first = self.test_dir / "first"
+        first.mkdir()
+        (first / "data").write_bytes(b"x" * 4096)
+        os.link(first / "data", first / "link")
+        artifact = Artifact(path=first, type="Test")
+
+        sizer = Sizer(resizable=True)
+        before = sizer.size(artifact)
+        sizer.forget(first)
+        after = sizer.size(artifact)
+
+        self.assertGreater(before.reclaimable_bytes, 0)
+        self.assertEqual(after.reclaimable_bytes, before.reclaimable_bytes)
+        # Without forgetting, the links count as released twice
+        self.assertEqual(sizer.size(artifact).reclaimable_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+﻿"""
+Tests for rename-then-purge removal.
+"""
+
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from remover.staging import (
+    STAGING_DIR_NAME,
+    StagingRemover,
+    find_staging_dirs,
+    purge,
+    stage,
+)
+from scanner import NodeScanner
+
+
+class TestStaging(unittest.TestCase):
+    """Unit tests for staging and purging artifacts."""
+
+    def setUp(self) -> None:
+        self.root = Path(tempfile.mkdtemp())
+        self.project = self.root / "web"
+        self.artifact = self.project / "node_modules"
+        (self.artifact / "pkg").mkdir(parents=True)
+        (self.artifact / "pkg" / "index.js").write_text("x", encoding="utf-8")
+        (self.project / "package.json").write_text("{}", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root)
+
+    def test_stage_moves_into_root_staging_dir(self) -> None:
+        """Test that an artifact is renamed into the root's staging directory."""
+        staged = stage(self.artifact, self.root)
+
+        self.assertFalse(self.artifact.exists())
+        self.assertEqual(staged.name, "node_modules")
+        self.assertEqual(staged.parent.parent, self.root / STAGING_DIR_NAME)
+        self.assertTrue((staged / "pkg" / "index.js").exists())
+
+    def test_stage_falls_back_next_to_artifact(self) -> None:
+        """Test that a cross-device rename stages next to the artifact."""
+        real_rename = os.rename
+
+        def rename(src: Any, dst: Any) -> None:
+            if Path(dst).parent.parent == self.root / STAGING_DIR_NAME:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            real_rename(src, dst)
+
+        with patch("remover.staging.os.rename", side_effect=rename):
+            staged = stage(self.artifact, self.root)
+
+        self.assertEqual(staged.parent.parent, self.project / STAGING_DIR_NAME)
+        self.assertEqual(list((self.root / STAGING_DIR_NAME).iterdir()), [])
+
+    def test_remover_stages_and_reports_failures(self) -> None:
+        """Test that confirmed artifacts are staged and failures reported."""
+        missing = self.project / "missing"
+        remover = StagingRemover(self.root)
+        with patch("builtins.input", side_effect=["y", "y"]):
+            with patch("builtins.print"):
+                result = remover.remove([self.artifact, missing])
+
+        self.assertFalse(result.success)
+        self.assertEqual(result.removed, [self.artifact])
+        self.assertEqual(result.failed, [missing])
+        self.assertEqual(remover.staging_dirs, {self.root / STAGING_DIR_NAME})
+
+    def test_remover_stages_below_the_containing_root(self) -> None:
+        """Test that with several roots, the innermost containing one is used."""
+        other_root = self.root / "other"
+        other_artifact = other_root / "app" / "node_modules"
+        other_artifact.mkdir(parents=True)
+        remover = StagingRemover([self.root, other_root], confirm=False)
+        with patch("builtins.print"):
+            result = remover.remove([self.artifact, other_artifact])
+
+        self.assertTrue(result.success)
+        self.assertEqual(
+            remover.staging_dirs,
+            {self.root / STAGING_DIR_NAME, other_root / STAGING_DIR_NAME},
+        )
+
+    def test_staged_artifacts_are_not_scanned(self) -> None:
+        """Test that the walker skips staging directories."""
+        stage(self.artifact, self.root)
+        staged_project = self.root / STAGING_DIR_NAME / "old"
+        (staged_project / "node_modules").mkdir(parents=True)
+        (staged_project / "package.json").write_text("{}", encoding="utf-8")
+
+        self.assertEqual(NodeScanner().scan(self.root, calculate_size=False), set())
+
+    def test_purge_deletes_staged_trees(self) -> None:
+        """Test that purge empties and removes every staging directory."""
+        stage(self.artifact, self.root)
+        other = self.project / "dist"
+        other.mkdir()
+        stage(other, self.project)
+
+        staging_dirs = find_staging_dirs(self.root)
+        result = purge(staging_dirs)
+
+        self.assertTrue(result.success)
+        self.assertEqual(len(result.removed), 2)
+        self.assertEqual(
+            sorted(staging_dirs),
+            [self.root / STAGING_DIR_NAME, self.project / STAGING_DIR_NAME],
+        )
+        for staging_dir in staging_dirs:
+            self.assertFalse(staging_dir.exists())
+        self.assertTrue((self.project / "package.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
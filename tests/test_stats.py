@@ -0,0 +1,123 @@
+﻿"""
+Tests for run statistics and profiling.
+"""
+
+import io
+import json
+import pstats
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from remover.tree_delete import ParallelDeleter
+from scanner import NodeScanner, RunStats, stream_tree
+from scanner.stats import profiled
+from src_clean import main
+
+
+def _busy_thread_function() -> None:
+    sum(range(1000))
+
+
+class TestRunStats(unittest.TestCase):
+    """Unit tests for RunStats and profiled."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        modules = self.test_dir / "app" / "node_modules" / "dep"
+        modules.mkdir(parents=True)
+        (self.test_dir / "app" / "package.json").write_text("{}", encoding="utf-8")
+        for i in range(3):
+            (modules / f"file{i}.js").write_text("x" * 10, encoding="utf-8")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_counters_and_phases(self) -> None:
+        """Counters add up and every call of a phase is recorded."""
+        stats = RunStats()
+        stats.add("files")
+        stats.add("files", 4)
+        for _ in range(3):
+            with stats.phase("work"):
+                pass
+        data = stats.as_dict()
+        self.assertEqual(data["counters"], {"files": 5})
+        self.assertEqual(data["phases"]["work"]["calls"], 3)
+        self.assertIn("work", stats.summary())
+
+    def test_counts_from_threads(self) -> None:
+        """Updates from several threads are not lost."""
+        stats = RunStats()
+
+        def count() -> None:
+            for _ in range(1000):
+                stats.add("events")
+
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(stats.as_dict()["counters"], {"events": 4000})
+
+    def test_disabled_records_nothing(self) -> None:
+        """A disabled instance ignores counters and phases."""
+        stats = RunStats(enabled=False)
+        stats.add("files")
+        with stats.phase("work"):
+            pass
+        data = stats.as_dict()
+        self.assertEqual(data["counters"], {})
+        self.assertEqual(data["phases"], {})
+
+    def test_scan_and_delete_are_counted(self) -> None:
+        """The walk, the sizer and the deleter report their work."""
+        stats = RunStats()
+        artifacts = list(stream_tree(self.test_dir, [NodeScanner()], stats=stats))
+        self.assertEqual(len(artifacts), 1)
+        ParallelDeleter(stats=stats).submit(artifacts[0].path).result()
+
+        data = stats.as_dict()
+        counters = data["counters"]
+        self.assertEqual(counters["directories_walked"], 2)
+        self.assertEqual(counters["stat_calls"], 3)
+        self.assertEqual(counters["bytes_sized"], 30)
+        self.assertEqual(counters["files_removed"], 3)
+        self.assertEqual(counters["directories_removed"], 2)
+        for phase in ("walk", "visit:NodeScanner", "size", "delete"):
+            self.assertIn(phase, data["phases"])
+
+    def test_profiled_includes_threads(self) -> None:
+        """Functions run on threads started inside the block are profiled."""
+        output = self.test_dir / "run.prof"
+        with profiled(output):
+            thread = threading.Thread(target=_busy_thread_function)
+            thread.start()
+            thread.join()
+        profile = pstats.Stats(str(output)).get_stats_profile()
+        self.assertIn("_busy_thread_function", profile.func_profiles)
+
+    def test_cli_prints_json_stats(self) -> None:
+        """--stats json prints the statistics to stderr, not stdout."""
+        argv = ["src_clean.py", str(self.test_dir), "--scanners", "node"]
+        argv += ["--stats", "json"]
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with (
+            patch("sys.argv", argv),
+            patch("sys.stdout", stdout),
+            patch("sys.stderr", stderr),
+        ):
+            main()
+        data = json.loads(stderr.getvalue())
+        self.assertEqual(data["phases"]["total"]["calls"], 1)
+        self.assertEqual(data["counters"]["artifacts_sized"], 1)
+        self.assertNotIn("phases", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+﻿"""
+Tests for the parallel deletion engine.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from remover.tree_delete import ParallelDeleter, rmtree
+
+
+class TestTreeDelete(unittest.TestCase):
+    """Unit tests for rmtree and ParallelDeleter."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.tree = self.test_dir / "node_modules"
+        for i in range(5):
+            package = self.tree / f"pkg{i}" / "lib" / "deep"
+            package.mkdir(parents=True)
+            for j in range(20):
+                (package / f"file{j}.js").write_text("x", encoding="utf-8")
+            (self.tree / f"pkg{i}" / "package.json").write_text("{}", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_rmtree_removes_tree(self) -> None:
+        """Test that a nested tree is removed completely."""
+        rmtree(self.tree)
+        self.assertFalse(self.tree.exists())
+        self.assertTrue(self.test_dir.exists())
+
+    def test_rmtree_without_helper_threads(self) -> None:
+        """Test that the tree is removed inline when no slot is free."""
+        with patch("remover.tree_delete.threading.Thread") as thread:
+            rmtree(self.tree, threading.Semaphore(0))
+        thread.assert_not_called()
+        self.assertFalse(self.tree.exists())
+
+    def test_rmtree_does_not_follow_symlinks(self) -> None:
+        """Test that symlinked directories are unlinked, not emptied."""
+        outside = self.test_dir / "outside"
+        outside.mkdir()
+        (outside / "keep.txt").write_text("keep", encoding="utf-8")
+        (self.tree / "pkg0" / "link").symlink_to(outside, target_is_directory=True)
+
+        rmtree(self.tree)
+
+        self.assertFalse(self.tree.exists())
+        self.assertTrue((outside / "keep.txt").exists())
+
+    def test_rmtree_raises_after_removing_the_rest(self) -> None:
+        """Test that a failing entry is reported once the rest is removed."""
+        locked = self.tree / "pkg2" / "lib" / "locked.bin"
+        locked.write_text("x", encoding="utf-8")
+        real_unlink = os.unlink
+
+        def failing_unlink(name: Any, **kwargs: Any) -> None:
+            if name == locked.name:
+                raise PermissionError(13, "Permission denied")
+            real_unlink(name, **kwargs)
+
+        with patch("remover.tree_delete.os.unlink", side_effect=failing_unlink):
+            with self.assertRaises(OSError) as ctx:
+                rmtree(self.tree)
+
+        self.assertEqual(ctx.exception.filename, str(locked))
+        self.assertEqual([p for p in self.tree.rglob("*") if p.is_file()], [locked])
+
+    def test_parallel_deleter_reports_each_artifact(self) -> None:
+        """Test that the deleter removes artifacts and reports failures."""
+        single_file = self.test_dir / "stale.log"
+        single_file.write_text("x", encoding="utf-8")
+        missing = self.test_dir / "missing"
+
+        deleter = ParallelDeleter(jobs=2)
+        futures = [deleter.submit(p) for p in [self.tree, single_file, missing]]
+
+        self.assertIsNone(futures[0].result())
+        self.assertIsNone(futures[1].result())
+        self.assertIsInstance(futures[2].exception(), FileNotFoundError)
+        self.assertFalse(self.tree.exists())
+        self.assertFalse(single_file.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
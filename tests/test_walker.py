@@ -0,0 +1,243 @@
+﻿"""
+Tests for the shared filesystem traversal.
+"""
+
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from typing import List, Set
+
+from scanner.base_scanner import Artifact, BaseScanner
+from scanner.containment import collapse
+from scanner.stats import RunStats
+from scanner.walker import iter_artifacts, scan_tree, stream_tree, walk
+
+
+class RecordingScanner(BaseScanner):
+    """Scanner that records every directory it is shown."""
+
+    def __init__(self, marker: str, artifact_dir: str = "") -> None:
+        self.marker = marker
+        self.artifact_dir = artifact_dir
+        self.visited: List[Path] = []
+
+    def visit_directory(
+        self,
+        directory: Path,
+        dirnames: List[str],
+        filenames: List[str],
+    ) -> Set[Artifact]:
+        self.visited.append(directory)
+        if self.marker in filenames:
+            return {Artifact(path=directory / self.artifact_dir, type=self.marker)}
+        return set()
+
+
+class TestWalker(unittest.TestCase):
+    """Unit tests for the shared traversal."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp())
+        (self.test_dir / "a" / "b").mkdir(parents=True)
+        (self.test_dir / "c").mkdir()
+        (self.test_dir / "a" / "one.marker").touch()
+        (self.test_dir / "c" / "two.marker").touch()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_walk_lists_every_directory_once(self) -> None:
+        """Test that walk yields each directory exactly once."""
+        visited = [directory for directory, _, _ in walk(self.test_dir)]
+        self.assertEqual(len(visited), len(set(visited)))
+        self.assertEqual(
+            set(visited),
+            {
+                self.test_dir,
+                self.test_dir / "a",
+                self.test_dir / "a" / "b",
+                self.test_dir / "c",
+            },
+        )
+
+    def test_walk_honours_pruned_dirnames(self) -> None:
+        """Test that removing an entry from dirnames skips that subtree."""
+        visited = []
+        for directory, dirnames, _ in walk(self.test_dir):
+            visited.append(directory)
+            if "a" in dirnames:
+                dirnames.remove("a")
+        self.assertNotIn(self.test_dir / "a", visited)
+        self.assertNotIn(self.test_dir / "a" / "b", visited)
+
+    def test_scan_tree_dispatches_to_all_scanners(self) -> None:
+        """Test that one walk serves every registered scanner."""
+        first = RecordingScanner("one.marker")
+        second = RecordingScanner("two.marker")
+
+        artifacts = scan_tree(self.test_dir, [first, second])
+
+        self.assertEqual(first.visited, second.visited)
+        self.assertEqual(len(first.visited), 4)
+        self.assertEqual(
+            {a.path for a in artifacts}, {self.test_dir / "a", self.test_dir / "c"}
+        )
+
+    def test_scan_tree_prunes_artifacts_and_vcs_dirs(self) -> None:
+        """Test that artifacts and VCS metadata are not descended into."""
+        (self.test_dir / ".git" / "objects").mkdir(parents=True)
+        (self.test_dir / "a" / "b" / "c").mkdir()
+        (self.test_dir / "a" / "b" / "one.marker").touch()
+        scanner = RecordingScanner("one.marker", artifact_dir="b")
+
+        artifacts = scan_tree(self.test_dir, [scanner])
+
+        self.assertNotIn(self.test_dir / ".git", scanner.visited)
+        self.assertNotIn(self.test_dir / ".git" / "objects", scanner.visited)
+        # "a/b" is reported as an artifact, so it is never descended into
+        self.assertNotIn(self.test_dir / "a" / "b", scanner.visited)
+        self.assertEqual({a.path for a in artifacts}, {self.test_dir / "a" / "b"})
+
+    def test_stream_tree_yields_before_walk_finishes(self) -> None:
+        """Test that the first artifact arrives while the walk is still busy."""
+        release = threading.Event()
+
+        class BlockingScanner(RecordingScanner):
+            """Reports "a", then blocks the walk until released."""
+
+            def visit_directory(
+                self,
+                directory: Path,
+                dirnames: List[str],
+                filenames: List[str],
+            ) -> Set[Artifact]:
+                if len(self.visited) > 2 and not release.wait(timeout=10):
+                    raise AssertionError("walk was never released")
+                return super().visit_directory(directory, dirnames, filenames)
+
+        stream = stream_tree(self.test_dir, [BlockingScanner("one.marker")])
+
+        first = next(stream)
+        self.assertEqual(first.path, self.test_dir / "a")
+        release.set()
+        self.assertEqual(list(stream), [])
+
+    def test_stream_tree_sizes_artifacts(self) -> None:
+        """Test that streamed artifacts carry their sizes."""
+        (self.test_dir / "a" / "data.bin").write_bytes(b"x" * 42)
+
+        artifacts = list(stream_tree(self.test_dir, [RecordingScanner("one.marker")]))
+
+        self.assertEqual([a.size_bytes for a in artifacts], [42])
+
+    def test_nested_artifacts_are_counted_once(self) -> None:
+        """Test that an artifact found after artifacts inside it leaves them out."""
+        out = self.test_dir / "out"
+        (out / "app" / "obj" / "sub").mkdir(parents=True)
+        (out / "app" / "obj" / "sub" / "data.bin").write_bytes(b"x" * 10)
+        (out / "top.bin").write_bytes(b"x" * 5)
+
+        class LateScanner(BaseScanner):
+            """Finds obj while walking, and out (and something in it) at the end."""
+
+            def visit_directory(
+                self, directory: Path, dirnames: List[str], filenames: List[str]
+            ) -> Set[Artifact]:
+                if directory == out / "app":
+                    return {Artifact(path=out / "app" / "obj", type="late")}
+                return set()
+
+            def finish_scan(self) -> Set[Artifact]:
+                return {
+                    Artifact(path=out, type="late"),
+                    Artifact(path=out / "app" / "obj" / "sub", type="late"),
+                }
+
+        stats = RunStats()
+        artifacts = list(stream_tree(self.test_dir, [LateScanner()], stats=stats))
+
+        self.assertEqual(
+            {a.path: a.size_bytes for a in artifacts}, {out / "app" / "obj": 10, out: 5}
+        )
+        self.assertEqual(stats.as_dict()["counters"]["artifacts_nested"], 1)
+        collapsed = collapse(artifacts)
+        self.assertEqual([(a.path, a.size_bytes) for a in collapsed], [(out, 15)])
+
+    def test_deferred_artifacts_replace_those_inside(self) -> None:
+        """Test that artifacts are held back while a scanner defers."""
+        out = self.test_dir / "out"
+        (out / "app" / "obj").mkdir(parents=True)
+        (out / "app" / "obj" / "data.bin").write_bytes(b"x" * 10)
+
+        class DeferringScanner(BaseScanner):
+            """Finds obj while walking and, once the walk is over, out."""
+
+            def __init__(self) -> None:
+                self.finished = False
+
+            def visit_directory(
+                self, directory: Path, dirnames: List[str], filenames: List[str]
+            ) -> Set[Artifact]:
+                if directory == out / "app":
+                    return {Artifact(path=out / "app" / "obj", type="late")}
+                return set()
+
+            def deferred_directories(self) -> Set[Path]:
+                return set() if self.finished else {out}
+
+            def finish_scan(self) -> Set[Artifact]:
+                self.finished = True
+                return {Artifact(path=out, type="late")}
+
+        stats = RunStats()
+        artifacts = list(stream_tree(self.test_dir, [DeferringScanner()], stats=stats))
+
+        self.assertEqual([(a.path, a.size_bytes) for a in artifacts], [(out, 10)])
+        self.assertEqual(artifacts[0].nested, frozenset())
+        self.assertEqual(stats.as_dict()["counters"]["artifacts_nested"], 1)
+
+    def test_only_deferred_directories_hold_artifacts_back(self) -> None:
+        """Test that artifacts outside the deferred directories stream at once."""
+        (self.test_dir / "out" / "obj").mkdir(parents=True)
+        (self.test_dir / "web" / "node_modules").mkdir(parents=True)
+        out = self.test_dir / "out"
+        yielded: List[Path] = []
+
+        class DeferringScanner(BaseScanner):
+            """Finds out/obj and web/node_modules, deferring out."""
+
+            def __init__(self) -> None:
+                self.yielded_before_finish: List[Path] = []
+
+            def visit_directory(
+                self, directory: Path, dirnames: List[str], filenames: List[str]
+            ) -> Set[Artifact]:
+                return {
+                    Artifact(path=directory / name, type="found")
+                    for name in dirnames
+                    if name in ("obj", "node_modules")
+                }
+
+            def deferred_directories(self) -> Set[Path]:
+                return {out}
+
+            def finish_scan(self) -> Set[Artifact]:
+                self.yielded_before_finish = list(yielded)
+                return set()
+
+        scanner = DeferringScanner()
+        for artifact in iter_artifacts(self.test_dir, [scanner]):
+            yielded.append(artifact.path)
+
+        self.assertEqual(
+            scanner.yielded_before_finish, [self.test_dir / "web" / "node_modules"]
+        )
+        self.assertCountEqual(
+            yielded, [self.test_dir / "web" / "node_modules", out / "obj"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,260 @@
+﻿"""
+Tests for the watch daemon.
+"""
+
+import errno
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from scanner import DotnetScanner, NodeScanner, RuleScanner
+from scanner.inotify import is_supported
+from watch import ArtifactWatcher, DaemonRemover, WatchServer, query, serve
+
+
+@unittest.skipUnless(is_supported(), "inotify is not available")
+class TestArtifactWatcher(unittest.TestCase):
+    """Unit tests for ArtifactWatcher and its socket server."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp()).resolve()
+        self.root = self.test_dir / "root"
+        self._project("app", 100)
+        self.watcher = ArtifactWatcher(
+            [self.root], [NodeScanner(), RuleScanner()], settle=0.05
+        )
+        self.watcher.scan()
+        self.thread = threading.Thread(target=self.watcher.run)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.watcher.stop()
+        self.thread.join()
+        self.watcher.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _project(self, name: str, size: int) -> Path:
+        project = self.root / name
+        (project / "node_modules").mkdir(parents=True)
+        (project / "package.json").write_text("{}")
+        (project / "node_modules" / "lib.js").write_bytes(b"x" * size)
+        return project
+
+    def _sizes(self) -> Dict[Path, int]:
+        return {a.path: a.size_bytes for a in self.watcher.artifacts()}
+
+    def _wait_for(self, condition: Callable[[], bool]) -> None:
+        deadline = time.monotonic() + 10
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail(f"Timed out; artifacts: {self._sizes()}")
+            time.sleep(0.02)
+
+    def test_initial_scan(self) -> None:
+        """The initial scan finds and sizes the artifacts."""
+        self.assertEqual(self._sizes(), {self.root / "app" / "node_modules": 100})
+
+    def test_new_project(self) -> None:
+        """A project created later is found and sized."""
+        self._project("nested/other", 50)
+        expected = self.root / "nested" / "other" / "node_modules"
+        self._wait_for(lambda: self._sizes().get(expected) == 50)
+
+    def test_artifact_grows(self) -> None:
+        """Writing into an artifact sizes it again once it settles."""
+        deep = self.root / "app" / "node_modules" / "pkg" / "dist"
+        deep.mkdir(parents=True)
+        (deep / "index.js").write_bytes(b"y" * 25)
+        node_modules = self.root / "app" / "node_modules"
+        self._wait_for(lambda: self._sizes().get(node_modules) == 125)
+        self.assertEqual(self.watcher.pending(), 0)
+
+    def test_artifact_removed(self) -> None:
+        """Deleting an artifact or its marker file drops it."""
+        self._project("second", 10)
+        second = self.root / "second" / "node_modules"
+        self._wait_for(lambda: second in self._sizes())
+
+        shutil.rmtree(self.root / "app" / "node_modules")
+        (self.root / "second" / "package.json").unlink()
+        self._wait_for(lambda: not self._sizes())
+
+        # The former artifact is walked again, so it can be found again
+        (self.root / "second" / "package.json").write_text("{}")
+        self._wait_for(lambda: self._sizes().get(second) == 10)
+
+    def test_moved_project(self) -> None:
+        """A project moved within the tree is found at its new place."""
+        (self.root / "moved").mkdir()
+        (self.root / "app").rename(self.root / "moved" / "app")
+        expected = self.root / "moved" / "app" / "node_modules"
+        self._wait_for(lambda: list(self._sizes()) == [expected])
+
+    def test_resized_hard_links_stay_reclaimable(self) -> None:
+        """Re-sizing an artifact does not count its hard links twice."""
+        node_modules = self.root / "app" / "node_modules"
+        os.link(node_modules / "lib.js", node_modules / "link.js")
+        self._wait_for(lambda: self._sizes().get(node_modules) == 200)
+        (node_modules / "more.js").write_bytes(b"z")
+        self._wait_for(lambda: self._sizes().get(node_modules) == 201)
+        (artifact,) = self.watcher.artifacts()
+        self.assertEqual(
+            artifact.reclaimable_bytes,
+            sum(p.stat().st_blocks * 512 for p in node_modules.glob("[lm]*.js"))
+            - (node_modules / "link.js").stat().st_blocks * 512,
+        )
+
+    def test_ignored_subtree(self) -> None:
+        """Directories excluded by an ignore file are not scanned."""
+        (self.root / ".srccleanignore").write_text("vendor/\n")
+        self._project("vendor/lib", 10)
+        self._project("kept", 10)
+        self._wait_for(lambda: self.root / "kept" / "node_modules" in self._sizes())
+        self.assertNotIn(self.root / "vendor" / "lib" / "node_modules", self._sizes())
+
+    def test_server(self) -> None:
+        """The server lists the artifacts and removes only known ones."""
+        socket_path = self.test_dir / "watch.sock"
+        server = WatchServer(socket_path, self.watcher)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.assertEqual(socket_path.stat().st_mode & 0o777, 0o600)
+            records = list(query(socket_path, {"command": "list"}))
+            self.assertEqual([r["record"] for r in records], ["artifact", "summary"])
+            self.assertEqual(records[0]["size_bytes"], 100)
+            self.assertEqual(records[1]["artifacts"], 1)
+
+            records = list(
+                query(
+                    socket_path,
+                    {"command": "delete", "paths": [str(self.root / "app")]},
+                )
+            )
+            self.assertEqual(records[0]["record"], "failed")
+            self.assertTrue((self.root / "app").exists())
+
+            node_modules = self.root / "app" / "node_modules"
+            result = DaemonRemover(socket_path, confirm=False).remove([node_modules])
+            self.assertEqual(result.removed, [node_modules])
+            self.assertFalse(node_modules.exists())
+            self.assertEqual(self.watcher.artifacts(), [])
+
+            records = list(query(socket_path, {"command": "bogus"}))
+            self.assertEqual(records[0]["record"], "error")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+@unittest.skipUnless(is_supported(), "inotify is not available")
+class TestDotnetWatch(unittest.TestCase):
+    """Unit tests for following edits of .NET project files."""
+
+    def setUp(self) -> None:
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        self.project = self.root / "src" / "app"
+        self.project.mkdir(parents=True)
+        (self.project / "app.csproj").write_text(
+            '<Project Sdk="Microsoft.NET.Sdk"></Project>'
+        )
+        for name in ("bin", "obj", "out"):
+            (self.project / name).mkdir()
+        self.watcher = ArtifactWatcher(
+            [self.root], [DotnetScanner(evaluation="static")], settle=0.05
+        )
+        self.watcher.scan()
+        self.thread = threading.Thread(target=self.watcher.run)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.watcher.stop()
+        self.thread.join()
+        self.watcher.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _paths(self) -> List[Path]:
+        return [a.path for a in self.watcher.artifacts()]
+
+    def _wait_for(self, expected: List[Path]) -> None:
+        deadline = time.monotonic() + 10
+        while self._paths() != expected:
+            if time.monotonic() > deadline:
+                self.fail(f"Timed out; artifacts: {self._paths()}")
+            time.sleep(0.02)
+
+    def test_project_edited_in_place(self) -> None:
+        """Rewriting a project file evaluates it again."""
+        self._wait_for([self.project / "bin", self.project / "obj"])
+        with open(self.project / "app.csproj", "w", encoding="utf-8") as file:
+            file.write(
+                '<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup>'
+                "<BaseOutputPath>out/</BaseOutputPath>"
+                "</PropertyGroup></Project>"
+            )
+        self._wait_for([self.project / "obj", self.project / "out"])
+
+    def test_directory_build_props_edited(self) -> None:
+        """Editing a Directory.Build.props above a project evaluates it again."""
+        props = self.root / "Directory.Build.props"
+        props.write_text("<Project></Project>")
+        # Let the new file be seen before rewriting it
+        time.sleep(0.2)
+        with open(props, "w", encoding="utf-8") as file:
+            file.write(
+                "<Project><PropertyGroup>"
+                "<BaseOutputPath>out/</BaseOutputPath>"
+                "</PropertyGroup></Project>"
+            )
+        self._wait_for([self.project / "obj", self.project / "out"])
+
+
+@unittest.skipUnless(is_supported(), "inotify is not available")
+class TestServe(unittest.TestCase):
+    """Unit tests for claiming the daemon socket."""
+
+    def setUp(self) -> None:
+        self.test_dir = Path(tempfile.mkdtemp()).resolve()
+        self.socket_path = self.test_dir / "watch.sock"
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_stale_socket_is_replaced(self) -> None:
+        """A socket nobody listens on is taken over and removed on exit."""
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(str(self.socket_path))
+        stale.close()
+
+        watcher = ArtifactWatcher([self.test_dir], [NodeScanner()])
+        thread = threading.Thread(target=serve, args=(watcher, self.socket_path))
+        thread.start()
+        try:
+            while not _list_or_empty(self.socket_path):
+                time.sleep(0.02)
+            # A second daemon does not take over a socket that is in use
+            with self.assertRaises(OSError) as context:
+                serve(ArtifactWatcher([self.test_dir], []), self.socket_path)
+            self.assertEqual(context.exception.errno, errno.EADDRINUSE)
+        finally:
+            watcher.stop()
+            thread.join()
+            watcher.close()
+        self.assertFalse(self.socket_path.exists())
+
+
+def _list_or_empty(socket_path: Path) -> List[Dict[str, Any]]:
+    """Return the answer to a list request, or nothing if nobody listens."""
+    try:
+        return list(query(socket_path, {"command": "list"}))
+    except OSError:
+        return []
+
+
+if __name__ == "__main__":
+    unittest.main()
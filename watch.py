@@ -0,0 +1,672 @@
+"""
+Watch daemon: an always-current artifact index, served over a Unix socket.
+"""
+
+import contextlib
+import dataclasses
+import errno
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+)
+
+from remover import DirectRemover, ParallelDeleter
+from report import Totals, artifact_record, summary_record
+from scanner import Artifact, BaseScanner
+from scanner.cache_dir import user_cache_dir
+from scanner.ignore import IGNORE_FILE, IgnoreMatcher, IgnoreRules
+from scanner.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_DONT_FOLLOW,
+    IN_EXCL_UNLINK,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MOVE_SELF,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Event,
+    Inotify,
+)
+from scanner.sizing import Sizer, size_artifacts
+from scanner.walker import SKIP_DIRS, iter_artifacts
+
+# Seconds an artifact must be quiet before it is sized again, and between
+# re-sizes of artifacts too large to watch completely.
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_REFRESH_SECONDS = 300.0
+
+# Entries appearing or disappearing and files rewritten in place. In walked
+# directories these are marker files, subdirectories and files whose contents
+# some scanners read (see `BaseScanner.reads_file`); inside artifacts,
+# anything that changes their size.
+_MASK = (
+    IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CLOSE_WRITE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+    | IN_DONT_FOLLOW
+    | IN_EXCL_UNLINK
+)
+
+
+def default_socket_path() -> Path:
+    """Return where the daemon listens unless told otherwise."""
+    return user_cache_dir() / "watch.sock"
+
+
+def _origin(artifact: Artifact) -> Path:
+    """Return the directory whose entries made a scanner report artifact."""
+    return artifact.path.parent if artifact.project is None else artifact.project.parent
+
+
+def _is_below(path: Path, directory: Path) -> bool:
+    return path == directory or directory in path.parents
+
+
+class _Watch(NamedTuple):
+    path: Path
+    # Artifact the directory belongs to; None for walked directories
+    artifact: Optional[Path]
+
+
+class _WatchingScanner(BaseScanner):
+    """Pseudo-scanner that watches every directory the walk visits."""
+
+    def __init__(self, watcher: "ArtifactWatcher") -> None:
+        self._watcher = watcher
+
+    def visit_directory(
+        self,
+        directory: Path,
+        dirnames: List[str],
+        filenames: List[str],
+    ) -> Set[Artifact]:
+        self._watcher.watch_directory(directory)
+        return set()
+
+
+class ArtifactWatcher:  # pylint: disable=too-many-instance-attributes
+    """The artifacts below roots, kept current by following inotify events.
+
+    `scan` finds and sizes the artifacts once, watching every directory it
+    walks and every directory inside the artifacts. From then on `run`
+    follows the events: a change in a walked directory re-visits just that
+    directory with the scanners (and the directories below it that produced
+    artifacts, if a file the scanners read changed), a new subdirectory has
+    just its subtree scanned, and a change inside an artifact marks it for
+    re-sizing once it has been quiet for settle seconds; it is sized again
+    the way the scan sized it. Artifacts that cannot be watched completely
+    because fs.inotify.max_user_watches is reached are re-sized every
+    refresh seconds instead. A lost event (queue overflow) triggers a full
+    rescan.
+
+    Scanning and watching happen on the thread that calls `run`; re-sizing
+    on a thread of its own. `artifacts` and `discard` may be called from any
+    thread.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        roots: Sequence[Path],
+        scanners: Sequence[BaseScanner],
+        *,
+        exclude: Sequence[str] = (),
+        one_file_system: bool = False,
+        settle: float = DEFAULT_SETTLE_SECONDS,
+        refresh: float = DEFAULT_REFRESH_SECONDS,
+    ) -> None:
+        self.roots = list(roots)
+        self.watch_limit_reached = False
+        self._scanners = list(scanners)
+        self._exclude = list(exclude)
+        self._one_file_system = one_file_system
+        self._settle = settle
+        self._refresh = refresh
+        self._inotify = Inotify()
+        self._stop = threading.Event()
+        self._watches: Dict[int, _Watch] = {}
+        self._wds: Dict[Path, int] = {}
+        # Guards the artifacts and their re-sizing state, including the sizer
+        self._lock = threading.Lock()
+        self._artifacts: Dict[Path, Artifact] = {}
+        # Artifacts to size again, with the time of their last change
+        self._dirty: Dict[Path, float] = {}
+        self._unwatched: Set[Path] = set()
+        self._last_refresh = time.monotonic()
+        # Sizes every artifact of a scan and sizes them again when they change
+        self._sizer = Sizer(resizable=True)
+
+    def artifacts(self) -> List[Artifact]:
+        """Return the current artifacts, sorted by path."""
+        with self._lock:
+            return sorted(self._artifacts.values(), key=lambda a: a.path)
+
+    def pending(self) -> int:
+        """Return how many artifacts changed since they were last sized."""
+        with self._lock:
+            return len(self._dirty)
+
+    def watch_count(self) -> int:
+        """Return the number of directories watched."""
+        return len(self._wds)
+
+    def discard(self, path: Path) -> Optional[Artifact]:
+        """Forget an artifact that was just removed; return it if known."""
+        with self._lock:
+            self._dirty.pop(path, None)
+            self._unwatched.discard(path)
+            artifact = self._artifacts.pop(path, None)
+            sizer = self._sizer
+        sizer.forget(path)
+        return artifact
+
+    def scan(self, jobs: Optional[int] = None) -> None:
+        """Scan every root from scratch, sizing the artifacts found."""
+        for wd in list(self._watches):
+            self._inotify.rm_watch(wd)
+        self._watches.clear()
+        self._wds.clear()
+        found: List[Artifact] = []
+        for root in self.roots:
+            found.extend(self._scan_subtree(root))
+        sizer = Sizer(resizable=True)
+        sized = size_artifacts(found, jobs, sizer)
+        with self._lock:
+            # Resizes still running finish with the old sizer
+            self._sizer = sizer
+            self._artifacts.clear()
+            self._dirty.clear()
+            self._unwatched.clear()
+            self._last_refresh = time.monotonic()
+        self._add(sized, sized=True)
+
+    def run(self) -> None:
+        """Follow events until `stop` is called."""
+        resizer = threading.Thread(
+            target=self._resize_loop, name="src-clean-resizer", daemon=True
+        )
+        resizer.start()
+        try:
+            while not self._stop.is_set():
+                events = self._inotify.read(timeout=0.5)
+                if events:
+                    self._process(events)
+        finally:
+            self._stop.set()
+            resizer.join()
+
+    def stop(self) -> None:
+        """Make `run` return."""
+        self._stop.set()
+
+    def close(self) -> None:
+        """Drop every watch."""
+        self._inotify.close()
+
+    def watch_directory(self, path: Path, artifact: Optional[Path] = None) -> bool:
+        """Watch a walked directory, or one inside artifact.
+
+        Returns False if the watch limit is reached. Directories that vanished
+        in the meantime are skipped.
+        """
+        try:
+            wd = self._inotify.add_watch(str(path), _MASK)
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                return True
+            self.watch_limit_reached = True
+            return False
+        self._watches[wd] = _Watch(path, artifact)
+        self._wds[path] = wd
+        return True
+
+    def _watch_artifact(self, artifact: Path, top: Path) -> None:
+        """Watch top and every directory below it inside artifact."""
+        with self._lock:
+            if artifact in self._unwatched:
+                return
+        for dirpath, _, _ in os.walk(top):
+            if not self.watch_directory(Path(dirpath), artifact):
+                with self._lock:
+                    self._unwatched.add(artifact)
+                return
+
+    def _unwatch(self, directory: Path) -> None:
+        """Stop watching directory and everything below it."""
+        # Watches are added top-down, so nothing below an unwatched
+        # directory is watched either.
+        if directory not in self._wds:
+            return
+        for path in [p for p in self._wds if _is_below(p, directory)]:
+            wd = self._wds.pop(path)
+            watch = self._watches.get(wd)
+            if watch is not None and watch.path == path:
+                del self._watches[wd]
+                self._inotify.rm_watch(wd)
+
+    def _forget(self, directory: Path) -> None:
+        """Drop the artifacts and watches at or below directory."""
+        with self._lock:
+            gone = [p for p in self._artifacts if _is_below(p, directory)]
+            for path in gone:
+                del self._artifacts[path]
+                self._dirty.pop(path, None)
+                self._unwatched.discard(path)
+            sizer = self._sizer
+        for path in gone:
+            sizer.forget(path)
+        self._unwatch(directory)
+
+    def _add(self, artifacts: Iterable[Artifact], sized: bool) -> None:
+        """Start tracking artifacts; unsized ones are sized as soon as possible."""
+        for artifact in artifacts:
+            # A directory that was walked until now
+            self._unwatch(artifact.path)
+            with self._lock:
+                self._artifacts[artifact.path] = artifact
+                if not sized:
+                    self._dirty[artifact.path] = 0.0
+            self._watch_artifact(artifact.path, artifact.path)
+
+    def _root_of(self, path: Path) -> Path:
+        return max(
+            (root for root in self.roots if _is_below(path, root)),
+            key=lambda root: len(root.parts),
+        )
+
+    def _on_root_device(self, path: Path, root: Path) -> bool:
+        if not self._one_file_system:
+            return True
+        try:
+            return os.lstat(path).st_dev == os.stat(root).st_dev
+        except OSError:
+            return False
+
+    def _scan_subtree(self, directory: Path) -> List[Artifact]:
+        """Walk directory as a scan of its root would, watching what it walks."""
+        root = self._root_of(directory)
+        matcher = IgnoreMatcher.for_directory(root, directory, self._exclude)
+        if directory != root and (
+            directory.name in SKIP_DIRS
+            or matcher.ignores(directory)
+            or not self._on_root_device(directory, root)
+        ):
+            return []
+        return list(
+            iter_artifacts(
+                directory,
+                [_WatchingScanner(self), *self._scanners],
+                one_file_system=self._one_file_system,
+                ignore=matcher,
+            )
+        )
+
+    def _revisit(self, directory: Path) -> List[Path]:
+        """Run the scanners on directory again and apply what changed.
+
+        Returns the former artifacts that are plain directories now.
+        """
+        try:
+            with os.scandir(directory) as entries:
+                listing = [(entry.name, entry.is_dir()) for entry in entries]
+        except OSError:
+            return []
+        filenames = [name for name, is_dir in listing if not is_dir]
+        root = self._root_of(directory)
+        matcher = IgnoreMatcher.for_directory(root, directory, self._exclude)
+        if IGNORE_FILE in filenames:
+            with contextlib.suppress(OSError):
+                matcher = matcher.child(IgnoreRules.from_file(directory / IGNORE_FILE))
+        dirnames = [
+            name
+            for name, is_dir in listing
+            if is_dir
+            and not matcher.ignores(directory / name)
+            and self._on_root_device(directory / name, root)
+        ]
+
+        found: Dict[Path, Artifact] = {}
+        for scanner in self._scanners:
+            for artifact in scanner.visit_directory(directory, dirnames, filenames):
+                found.setdefault(artifact.path, artifact)
+        for scanner in self._scanners:
+            for artifact in scanner.finish_scan():
+                found.setdefault(artifact.path, artifact)
+
+        with self._lock:
+            gone = [
+                path
+                for path, artifact in self._artifacts.items()
+                if _origin(artifact) == directory and path not in found
+            ]
+            new = [a for path, a in found.items() if path not in self._artifacts]
+        for path in gone:
+            self._forget(path)
+        self._add(new, sized=False)
+        return gone
+
+    def _process(self, events: List[Event]) -> None:
+        """Apply a batch of events, re-visiting each directory once."""
+        revisit: Dict[Path, None] = {}
+        subtrees: Dict[Path, None] = {}
+        for event in events:
+            if event.mask & IN_Q_OVERFLOW:
+                self.scan()
+                return
+            watch = self._watches.get(event.wd)
+            if watch is None:
+                continue
+            if event.mask & IN_IGNORED:
+                del self._watches[event.wd]
+                if self._wds.get(watch.path) == event.wd:
+                    del self._wds[watch.path]
+            elif watch.artifact is not None:
+                self._artifact_event(watch, event)
+            else:
+                self._tree_event(watch, event, revisit, subtrees)
+
+        for directory in revisit:
+            subtrees.update(dict.fromkeys(self._revisit(directory)))
+        for directory in subtrees:
+            with self._lock:
+                known = directory in self._artifacts
+            if not known and directory.is_dir() and not directory.is_symlink():
+                self._add(self._scan_subtree(directory), sized=False)
+
+    def _tree_event(
+        self,
+        watch: _Watch,
+        event: Event,
+        revisit: Dict[Path, None],
+        subtrees: Dict[Path, None],
+    ) -> None:
+        """Apply an event in a walked directory, or note what to scan again."""
+        if event.mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            self._forget(watch.path)
+            return
+        path = watch.path / event.name
+        if event.mask & IN_ISDIR and event.mask & (IN_DELETE | IN_MOVED_FROM):
+            self._forget(path)
+            subtrees.pop(path, None)
+            return
+        read = not event.mask & IN_ISDIR and any(
+            scanner.reads_file(event.name) for scanner in self._scanners
+        )
+        if event.mask & IN_CLOSE_WRITE and not read and event.name != IGNORE_FILE:
+            return
+        # An entry appeared, a file disappeared or one the scanners read was
+        # rewritten: a marker may have changed, and a new subdirectory must
+        # be walked.
+        revisit[watch.path] = None
+        if event.mask & IN_ISDIR:
+            subtrees[path] = None
+        elif read and not event.mask & IN_CREATE:
+            # The file may apply to the directories below as well (such as a
+            # Directory.Build.props), so visit those with artifacts again too.
+            # A file just created is still empty; its IN_CLOSE_WRITE follows.
+            with self._lock:
+                origins = {_origin(a) for a in self._artifacts.values()}
+            revisit.update(
+                dict.fromkeys(o for o in origins if _is_below(o, watch.path))
+            )
+
+    def _artifact_event(self, watch: _Watch, event: Event) -> None:
+        assert watch.artifact is not None
+        if event.mask & IN_DELETE_SELF:
+            if watch.path == watch.artifact:
+                self._forget(watch.artifact)
+            return
+        with self._lock:
+            if watch.artifact not in self._artifacts:
+                return
+            self._dirty[watch.artifact] = time.monotonic()
+        if event.mask & IN_ISDIR:
+            path = watch.path / event.name
+            if event.mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_artifact(watch.artifact, path)
+            elif event.mask & IN_MOVED_FROM:
+                self._unwatch(path)
+
+    def _resize_loop(self) -> None:
+        while not self._stop.wait(min(self._settle, 1.0)):
+            self.resize_due()
+
+    def resize_due(self) -> None:
+        """Size the artifacts that settled after a change, and the unwatched.
+
+        Called periodically by `run`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [path for path, t in self._dirty.items() if now - t >= self._settle]
+            if now - self._last_refresh >= self._refresh:
+                self._last_refresh = now
+                due.extend(self._unwatched.difference(due))
+            for path in due:
+                self._dirty.pop(path, None)
+        for path in due:
+            with self._lock:
+                artifact = self._artifacts.get(path)
+                sizer = self._sizer
+            if artifact is None:
+                continue
+            # Sized like the first scan did: leaving out nested artifacts,
+            # and sharing hard links with the others
+            sizer.forget(path)
+            sized = sizer.size(artifact)
+            with self._lock:
+                artifact = self._artifacts.get(path)
+                # Unless a scan replaced the artifacts and the sizer meanwhile
+                if artifact is not None and sizer is self._sizer:
+                    self._artifacts[path] = dataclasses.replace(
+                        artifact,
+                        size_bytes=sized.size_bytes,
+                        reclaimable_bytes=sized.reclaimable_bytes,
+                        size_error=sized.size_error,
+                    )
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON request line with one JSON record per line."""
+
+    server: "WatchServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            # A connection that only checks whether the daemon is running
+            return
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            records: Iterable[Dict[str, Any]] = [
+                {"record": "error", "error": f"Invalid request: {e}"}
+            ]
+        else:
+            records = self.server.answer(request)
+        try:
+            for record in records:
+                line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+                self.wfile.write(line)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away
+
+
+class WatchServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves the artifacts of a watcher on a Unix socket only the user can use.
+
+    Requests are a JSON object on one line: {"command": "list"} answers with
+    an artifact record per artifact and a summary record, like --format
+    ndjson does; {"command": "delete", "paths": [...]} removes the listed
+    artifacts (paths that are no known artifact are refused) and answers
+    with a "removed" or "failed" record per path and a summary record.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, path: Path, watcher: ArtifactWatcher, jobs: Optional[int] = None
+    ) -> None:
+        self.watcher = watcher
+        self._deleter = ParallelDeleter(jobs)
+        # The socket is created with these permissions, so it is never open
+        # to other users, not even briefly.
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(path), _QueryHandler)
+        finally:
+            os.umask(umask)
+
+    def answer(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Return the records that answer request."""
+        command = request.get("command")
+        if command == "list":
+            return self._list()
+        if command == "delete":
+            return self._delete([str(path) for path in request.get("paths", [])])
+        return iter([{"record": "error", "error": f"Unknown command: {command}"}])
+
+    def _list(self) -> Iterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        totals = Totals()
+        for artifact in self.watcher.artifacts():
+            yield artifact_record(artifact, time.perf_counter() - start)
+            totals.add(artifact)
+        summary = summary_record(
+            self.watcher.roots, totals, time.perf_counter() - start
+        )
+        summary["pending"] = self.watcher.pending()
+        summary["watches"] = self.watcher.watch_count()
+        summary["watch_limit_reached"] = self.watcher.watch_limit_reached
+        yield summary
+
+    def _delete(self, paths: List[str]) -> Iterator[Dict[str, Any]]:
+        known = {str(a.path): a for a in self.watcher.artifacts()}
+        pending: List[Any] = []
+        failed = 0
+        for path in paths:
+            artifact = known.get(path)
+            if artifact is None:
+                failed += 1
+                yield {"record": "failed", "path": path, "error": "Unknown artifact"}
+            else:
+                pending.append((artifact, self._deleter.submit(artifact.path)))
+
+        totals = Totals()
+        for artifact, future in pending:
+            try:
+                future.result()
+            except OSError as e:
+                failed += 1
+                yield {"record": "failed", "path": str(artifact.path), "error": str(e)}
+                continue
+            self.watcher.discard(artifact.path)
+            totals.add(artifact)
+            yield {
+                "record": "removed",
+                "path": str(artifact.path),
+                "size_bytes": artifact.size_bytes,
+                "reclaimable_bytes": artifact.reclaimable_bytes,
+            }
+        yield {
+            "record": "summary",
+            "removed": totals.count,
+            "failed": failed,
+            "size_bytes": totals.size_bytes,
+            "reclaimable_bytes": totals.reclaimable_bytes,
+        }
+
+
+def _claim_socket(path: Path) -> None:
+    """Remove a socket left behind by a daemon that is gone.
+
+    Raises OSError (EADDRINUSE) if a daemon is still listening on it.
+    """
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            path.unlink(missing_ok=True)
+            return
+    raise OSError(errno.EADDRINUSE, "A watch daemon is already listening", str(path))
+
+
+def serve(watcher: ArtifactWatcher, path: Path, jobs: Optional[int] = None) -> None:
+    """Answer queries on path while following events, until interrupted."""
+    _claim_socket(path)
+    with WatchServer(path, watcher, jobs) as server:
+        thread = threading.Thread(
+            target=server.serve_forever, name="src-clean-server", daemon=True
+        )
+        thread.start()
+        try:
+            watcher.run()
+        finally:
+            server.shutdown()
+            path.unlink(missing_ok=True)
+
+
+def query(path: Path, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Send request to the daemon listening on path and yield its records.
+
+    Raises OSError if no daemon is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(path))
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with connection.makefile("r", encoding="utf-8") as stream:
+            for line in stream:
+                yield json.loads(line)
+
+
+class DaemonRemover(DirectRemover):
+    """Removes artifacts by asking the watch daemon on socket_path to.
+
+    Confirmation works as for `DirectRemover`; up to jobs requests are in
+    flight at the same time.
+    """
+
+    def __init__(
+        self, socket_path: Path, jobs: Optional[int] = None, confirm: bool = True
+    ) -> None:
+        super().__init__(jobs, confirm)
+        self.socket_path = socket_path
+        self._executor = ThreadPoolExecutor(max_workers=jobs or 4)
+
+    def _dispose(self, artifact: Path) -> "Future[None]":
+        return self._executor.submit(self._request_removal, artifact)
+
+    def _request_removal(self, artifact: Path) -> None:
+        for record in query(
+            self.socket_path, {"command": "delete", "paths": [str(artifact)]}
+        ):
+            if record["record"] in ("failed", "error"):
+                raise OSError(record["error"])